@@ -0,0 +1,110 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+REDIS_RETRY_AFTER = float(os.getenv("REDIS_RETRY_AFTER", "30"))
+
+_redis = None
+_redis_loop = None
+_redis_down_until = 0.0
+
+class LRUCache:
+    """
+    A small thread-safe LRU cache with per-entry expiry.
+
+    Attributes:
+        max_size (int): The maximum number of entries kept.
+        hits (int): The number of lookups answered from the cache.
+        misses (int): The number of lookups that found nothing or an expired entry.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max(1, max_size)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for a key, or ``default`` if missing or expired.
+        """
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value, ttl: float):
+        """
+        Stores a value for ``ttl`` seconds, evicting the least recently used entry if full.
+        """
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Removes a key if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Removes every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+def get_redis():
+    """
+    Returns the shared asyncio Redis client for the running event loop.
+
+    Redis is optional for caching: None is returned when ``REDIS_URL`` is empty
+    or when Redis failed recently, so callers fall back to the upstream source.
+
+    Returns:
+        redis.asyncio.Redis: The client, or None if Redis is unavailable.
+    """
+    global _redis, _redis_loop
+    if not REDIS_URL or time.monotonic() < _redis_down_until:
+        return None
+    loop = asyncio.get_running_loop()
+    if _redis is None or _redis_loop is not loop:
+        _redis = aioredis.Redis.from_url(REDIS_URL, socket_connect_timeout=1, socket_timeout=1)
+        _redis_loop = loop
+    return _redis
+
+def mark_redis_down(exc: Exception):
+    """
+    Records a Redis failure so cache lookups skip Redis for a while.
+
+    Args:
+        exc (Exception): The error raised by the Redis client.
+    """
+    global _redis_down_until
+    logger.warning("Redis unavailable, bypassing cache for %ss: %s", REDIS_RETRY_AFTER, exc)
+    _redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+
+async def close_redis():
+    """Closes the shared Redis client if it belongs to the running event loop."""
+    global _redis, _redis_loop
+    client, loop = _redis, _redis_loop
+    _redis, _redis_loop = None, None
+    if client is not None and loop is asyncio.get_running_loop():
+        await client.aclose()
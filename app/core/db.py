@@ -1,15 +1,31 @@
 import os
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from app.models.weather import Base
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+asyncpg://meteo:meteo_pass@db/meteo_mind")
+# The schema is managed by Alembic (``alembic upgrade head``); creating it at startup is opt-in for local use.
+DB_CREATE_ALL = os.getenv("DB_CREATE_ALL", "0") in ("1", "true", "yes")
 engine = create_async_engine(DATABASE_URL, echo=False, future=True)
 AsyncSessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
 async def init_db():
     """
-    Initializes the database by creating all tables defined in the Base metadata.
+    Creates the tables defined in the Base metadata that do not exist yet.
+
+    Only used with ``DB_CREATE_ALL``; deployments run the Alembic migrations
+    instead.
     """
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+async def ping_db():
+    """
+    Checks that the database accepts queries.
+
+    Raises:
+        Exception: If no connection could be made or the query failed.
+    """
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
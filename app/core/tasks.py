@@ -0,0 +1,36 @@
+import os
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
+
+_client = None
+
+def celery_client():
+    """
+    Returns a Celery app used only to queue tasks, created on first use.
+
+    The API queues worker tasks by name through this client, so neither
+    Celery nor ``app.worker`` and its training dependencies are imported
+    when the web process starts.
+
+    Returns:
+        celery.Celery: The producer app.
+    """
+    global _client
+    if _client is None:
+        from celery import Celery
+        _client = Celery("meteo_mind", broker=CELERY_BROKER_URL, backend=CELERY_BROKER_URL)
+    return _client
+
+def send_task(name: str, args=()):
+    """
+    Queues a worker task by its registered name.
+
+    Args:
+        name (str): The task name, e.g. ``app.worker.train_model_task``.
+        args: Positional arguments of the task.
+
+    Returns:
+        celery.result.AsyncResult: The queued task.
+    """
+    return celery_client().send_task(name, args=list(args))
@@ -0,0 +1,297 @@
+import os
+import json
+import time
+import bisect
+import socket
+import functools
+import threading
+import asyncio
+from contextlib import contextmanager
+from app.core.cache import get_redis, mark_redis_down
+
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "1") not in ("0", "false", "no")
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+def _labels(names: tuple, values: tuple) -> dict:
+    return dict(zip(names, values))
+
+class Counter:
+    """
+    A monotonically increasing counter with optional labels.
+
+    Increments are a dict update under a lock; nothing is formatted until
+    the registry is collected.
+    """
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        """Adds ``amount`` to the series identified by the label values."""
+        if not TELEMETRY_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def collect(self) -> tuple:
+        with self._lock:
+            samples = [(self.name, _labels(self.labelnames, k), v) for k, v in self._values.items()]
+        return self.name, "counter", self.help, samples
+
+class Histogram:
+    """
+    A latency histogram with fixed buckets and optional labels.
+
+    Each observation is one bisect and three additions under a lock.
+    """
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        """Records one observation in the series identified by the label values."""
+        if not TELEMETRY_ENABLED:
+            return
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        """Observes the wall-clock duration of the ``with`` block."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, *labels)
+
+    def collect(self) -> tuple:
+        samples = []
+        with self._lock:
+            items = [(k, list(v[0]), v[1], v[2]) for k, v in self._series.items()]
+        for key, counts, total, count in items:
+            labels = _labels(self.labelnames, key)
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                samples.append((f"{self.name}_bucket", {**labels, "le": le}, cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, count))
+        return self.name, "histogram", self.help, samples
+
+class Registry:
+    """
+    Holds the metrics of this process and renders them in the Prometheus text format.
+
+    Collectors are callables evaluated only at scrape time, for values that
+    already live elsewhere such as cache counters.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+
+    def counter(self, name: str, help: str, labelnames=()) -> Counter:
+        """Returns the counter ``name``, creating it on first use."""
+        return self._metrics.setdefault(name, Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        """Returns the histogram ``name``, creating it on first use."""
+        return self._metrics.setdefault(name, Histogram(name, help, labelnames, buckets))
+
+    def register_collector(self, fn):
+        """
+        Adds a scrape-time collector.
+
+        Args:
+            fn: A callable returning ``(name, type, help, samples)`` tuples,
+                where samples are ``(sample_name, labels, value)``.
+        """
+        self._collectors.append(fn)
+
+    def collect(self) -> list:
+        """Returns every metric family of this process."""
+        families = [m.collect() for m in self._metrics.values()]
+        for fn in self._collectors:
+            try:
+                families.extend(fn())
+            except Exception:
+                continue
+        return families
+
+registry = Registry()
+PROCESS = f"{socket.gethostname()}:{os.getpid()}"
+TELEMETRY_SNAPSHOT_TTL = int(os.getenv("TELEMETRY_SNAPSHOT_TTL", "900"))
+SNAPSHOT_INDEX = "telemetry:processes"
+_caches = {}
+_gauges = {}
+
+def register_cache(name: str, stats):
+    """
+    Exposes a cache's counters at scrape time.
+
+    Args:
+        name (str): The ``cache`` label.
+        stats: A callable returning ``(hits, misses, entries)``.
+    """
+    _caches[name] = stats
+
+def register_gauge(name: str, help: str, value):
+    """
+    Exposes a value read at scrape time.
+
+    Args:
+        name (str): The metric name.
+        help (str): The metric description.
+        value: A callable returning the current value.
+    """
+    _gauges[name] = (help, value)
+
+def _collect_registered() -> list:
+    hits, misses, ratio, entries = [], [], [], []
+    for name, stats in list(_caches.items()):
+        h, m, n = stats()
+        labels = {"cache": name}
+        hits.append(("meteomind_cache_hits_total", labels, h))
+        misses.append(("meteomind_cache_misses_total", labels, m))
+        ratio.append(("meteomind_cache_hit_ratio", labels, round(h / (h + m), 4) if h + m else 0.0))
+        entries.append(("meteomind_cache_entries", labels, n))
+    families = [
+        ("meteomind_cache_hits_total", "counter", "Cache lookups answered from the cache.", hits),
+        ("meteomind_cache_misses_total", "counter", "Cache lookups that missed.", misses),
+        ("meteomind_cache_hit_ratio", "gauge", "Share of cache lookups that hit.", ratio),
+        ("meteomind_cache_entries", "gauge", "Entries held by the cache.", entries),
+    ] if _caches else []
+    for name, (help_text, value) in list(_gauges.items()):
+        families.append((name, "gauge", help_text, [(name, {}, value())]))
+    return families
+
+registry.register_collector(_collect_registered)
+
+STAGE_SECONDS = registry.histogram(
+    "meteomind_stage_seconds", "Duration of pipeline stages in seconds.", ("stage",))
+TASK_SECONDS = registry.histogram(
+    "meteomind_celery_task_seconds", "Duration of Celery tasks in seconds.", ("task", "state"))
+UPSTREAM_REQUESTS = registry.counter(
+    "meteomind_upstream_requests_total", "Outbound HTTP requests by host and status code or error.",
+    ("host", "status"))
+UPSTREAM_RETRIES = registry.counter(
+    "meteomind_upstream_retries_total", "Outbound HTTP requests that were retried.", ("host",))
+
+def timed(stage: str):
+    """
+    Decorates a sync or async function to record its duration as a pipeline stage.
+
+    Args:
+        stage (str): The ``stage`` label of ``meteomind_stage_seconds``.
+    """
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                t0 = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    STAGE_SECONDS.observe(time.perf_counter() - t0, stage)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - t0, stage)
+        return wrapper
+    return decorator
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not float(value).is_integer() else str(int(value))
+
+def render(snapshots: dict = None) -> str:
+    """
+    Renders this process's metrics, and optionally other processes', as Prometheus text.
+
+    Every sample gets a ``process`` label so the series of API and worker
+    processes stay apart.
+
+    Args:
+        snapshots (dict): ``collect()`` results of other processes keyed by process name.
+
+    Returns:
+        str: The exposition in text format 0.0.4.
+    """
+    sources = {PROCESS: registry.collect(), **(snapshots or {})}
+    merged = {}
+    for process, families in sources.items():
+        for name, kind, help_text, samples in families:
+            family = merged.setdefault(name, (kind, help_text, []))
+            family[2].extend((s, {**labels, "process": process}, v) for s, labels, v in samples)
+    lines = []
+    for name, (kind, help_text, samples) in merged.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for sample, labels, value in samples:
+            label_str = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f"{sample}{{{label_str}}} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+async def push_snapshot():
+    """
+    Stores this process's metrics in Redis for the API's `/ops/metrics` to merge.
+
+    Used by worker processes, which are not scraped directly.
+    """
+    r = get_redis()
+    if r is None:
+        return
+    try:
+        pipe = r.pipeline(transaction=False)
+        pipe.set(f"telemetry:{PROCESS}", json.dumps(registry.collect()), ex=TELEMETRY_SNAPSHOT_TTL)
+        pipe.zadd(SNAPSHOT_INDEX, {PROCESS: time.time()})
+        await pipe.execute()
+    except Exception as e:
+        mark_redis_down(e)
+
+async def load_snapshots() -> dict:
+    """
+    Reads the metrics other processes pushed within ``TELEMETRY_SNAPSHOT_TTL``.
+
+    Returns:
+        dict: ``collect()`` results keyed by process name.
+    """
+    r = get_redis()
+    if r is None:
+        return {}
+    try:
+        pipe = r.pipeline(transaction=False)
+        pipe.zremrangebyscore(SNAPSHOT_INDEX, "-inf", time.time() - TELEMETRY_SNAPSHOT_TTL)
+        pipe.zrange(SNAPSHOT_INDEX, 0, -1)
+        _, members = await pipe.execute()
+        names = [m.decode() for m in members if m.decode() != PROCESS]
+        raws = await r.mget([f"telemetry:{n}" for n in names]) if names else []
+    except Exception as e:
+        mark_redis_down(e)
+        return {}
+    return {n: json.loads(raw) for n, raw in zip(names, raws) if raw}
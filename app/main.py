@@ -1,12 +1,34 @@
-from fastapi import FastAPI, HTTPException
-from app.core.db import init_db
-from app.worker import train_model_task
+from datetime import datetime, timezone
+from typing import List, Optional
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.core.db import DB_CREATE_ALL, init_db, ping_db
 import os
 import json
+import math
 import time
+import asyncio
 import httpx
-from app.services.weather_service import get_coordinates, fetch_current_weather, fetch_historical_training_data
-from app.services.ml_service import train_model_for_city, load_model_for_city, predict_temp
+from app.services.weather_service import (
+    get_coordinates,
+    fetch_current_weather,
+    fetch_current_weather_batch,
+    init_client,
+    close_client,
+    geocode_cache_stats,
+)
+from app.core.cache import close_redis, get_redis, REDIS_URL
+from app.core import tasks, telemetry
+from app.services.ingest_service import measurement_buffer, current_row
+from app.services import analytics_service, forecast_cache, live_updates, ml_service, training_jobs
+from app.services.ml_service import load_model_for_city
+from app.services.model_registry import registry
+from app.services.inference import inference_executor
+
+TRAIN_JOB_MAX_WAIT = float(os.getenv("TRAIN_JOB_MAX_WAIT", "30"))
+ANALYZE_BATCH_MAX = int(os.getenv("ANALYZE_BATCH_MAX", "1000"))
+ANALYZE_BATCH_CONCURRENCY = int(os.getenv("ANALYZE_BATCH_CONCURRENCY", "16"))
+READY_TIMEOUT = float(os.getenv("READY_TIMEOUT", "2"))
 
 app = FastAPI(
     title="MeteoMind API",
@@ -16,8 +38,20 @@ app = FastAPI(
 
 @app.on_event("startup")
 async def on_startup():
-    """Initializes the database connection on application startup."""
-    await init_db()
+    """Initializes the shared HTTP client on application startup, and the schema if ``DB_CREATE_ALL`` is set."""
+    if DB_CREATE_ALL:
+        await init_db()
+    await init_client()
+    measurement_buffer.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Flushes buffered measurements and closes pooled connections on application shutdown."""
+    await measurement_buffer.stop()
+    await training_jobs.close_jobs()
+    await close_client()
+    await close_redis()
+    inference_executor.close()
 
 @app.get("/")
 def root():
@@ -26,9 +60,37 @@ def root():
 
 @app.get("/health")
 def health():
-    """Returns the health status of the application."""
+    """Returns the liveness of the process; dependencies are checked by `/ready`."""
     return {"status": "ok"}
 
+async def _check(probe) -> str:
+    try:
+        await asyncio.wait_for(probe(), READY_TIMEOUT)
+        return "ok"
+    except Exception as e:
+        return f"error: {type(e).__name__}"
+
+@app.get("/ready")
+async def ready():
+    """
+    Reports whether the process can serve traffic.
+
+    The database must answer a query. Redis is checked and reported but does
+    not fail readiness, since every Redis-backed path falls back without it.
+
+    Returns:
+        JSONResponse: ``{"status": "ready" | "not ready", "checks": {...}}``
+                      with status 200, or 503 if the database is unavailable.
+    """
+    checks = {"database": await _check(ping_db)}
+    r = get_redis()
+    if r is not None:
+        checks["redis"] = await _check(r.ping)
+    else:
+        checks["redis"] = "unavailable" if REDIS_URL else "disabled"
+    ok = checks["database"] == "ok"
+    return JSONResponse({"status": "ready" if ok else "not ready", "checks": checks}, status_code=200 if ok else 503)
+
 @app.post("/trigger-train")
 def trigger_train():
     """
@@ -41,7 +103,7 @@ def trigger_train():
         HTTPException: If the training task could not be scheduled.
     """
     try:
-        train_model_task.delay()
+        tasks.send_task("app.worker.train_model_task")
         return {"status": "scheduled"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -57,60 +119,405 @@ def get_metrics():
     Raises:
         HTTPException: If the metrics file is not found.
     """
-    path = os.path.join("weather_models", "global.metrics.json")
+    path = ml_service._paths("global")[1]
     if os.path.exists(path):
         with open(path, "r") as f:
             return json.load(f)
     raise HTTPException(status_code=404, detail="metrics not found")
 
-@app.post("/analyze")
-async def analyze(payload: dict):
+@app.get("/cache-stats")
+def cache_stats():
     """
-    Analyzes weather data for a specific city, returning current weather,
-    temperature predictions, and model metrics.
+    Returns hit/miss counters of the in-process caches.
+
+    Returns:
+        dict: Statistics of the geocoding cache.
+    """
+    return {"geocoding": geocode_cache_stats()}
+
+@app.get("/inference-stats")
+def inference_stats():
+    """
+    Returns statistics of the prediction path.
+
+    Returns:
+        dict: Queue depth and batch sizes of the micro-batching inference
+              executor, the size and hit counts of the model registry, and
+              the live-update subscribers.
+    """
+    return {"executor": inference_executor.stats(), "models": registry.stats(), "live": live_updates.hub.stats()}
+
+@app.get("/ops/metrics")
+async def ops_metrics():
+    """
+    Returns operational metrics in the Prometheus text format.
+
+    Covers per-stage latency histograms, upstream request and retry
+    counters, cache hit ratios, model-registry size and inference queue
+    depth. Metrics pushed by Celery worker processes, including task
+    durations, are merged in with their own ``process`` label. Model
+    quality metrics stay at `/metrics`.
+
+    Returns:
+        Response: The ``text/plain; version=0.0.4`` exposition.
+    """
+    body = telemetry.render(await telemetry.load_snapshots())
+    return Response(content=body, media_type="text/plain; version=0.0.4")
 
-    If no model exists for the city, a new one will be trained.
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = Query(default=0, ge=0)):
+    """
+    Returns the status of a training job started by `/analyze`.
 
     Args:
-        payload (dict): A dictionary containing the city name.
-            Example: {"city_name": "London"}
+        job_id (str): The job id.
+        wait (float): Seconds to wait for the job to finish before answering,
+            capped at ``TRAIN_JOB_MAX_WAIT``.
 
     Returns:
-        dict: A dictionary containing the city's coordinates, current weather,
-              temperature predictions for the next 24 hours, and model metrics.
+        dict: The job record with its ``status``: ``queued``, ``running``,
+              ``succeeded`` or ``failed``.
 
     Raises:
-        HTTPException: If the city name is not provided, if the city is not found,
-                       if weather data cannot be fetched, or if the model training fails.
+        HTTPException: If the job is unknown or expired.
     """
-    city_name = (payload or {}).get("city_name")
-    if not city_name:
-        raise HTTPException(status_code=422, detail="city_name required")
-    coords = await get_coordinates(city_name)
+    job = await training_jobs.wait(job_id, min(wait, TRAIN_JOB_MAX_WAIT))
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
+@app.get("/monitor")
+async def monitor(field: List[str] = Query(default=[])):
+    """
+    Returns the cached forecasts of every monitored city.
+
+    All payloads are read with one index lookup and one MGET, so the cost
+    does not grow with the Redis keyspace.
+
+    Args:
+        field (list): Top-level payload fields to return, e.g. ``predictions``;
+            repeat the parameter for several. ``city`` is always included.
+            Empty means the full `/analyze` payloads.
+
+    Returns:
+        Response: JSON ``{"count": n, "cities": [...]}`` sorted by city name.
+    """
+    return Response(content=await forecast_cache.list_forecasts(field), media_type="application/json")
+
+@app.get("/stream")
+async def stream(city: List[str] = Query(default=[])):
+    """
+    Streams forecast updates as Server-Sent Events.
+
+    Each update is a ``forecast`` event carrying the `/analyze` payload. When
+    cities are given, their cached payloads are sent first. Slow clients
+    only receive the newest pending update per city, and a comment line is
+    sent after ``LIVE_HEARTBEAT`` seconds of silence.
+
+    Args:
+        city (list): Cities to follow; repeat the parameter for several. Empty means all.
+
+    Returns:
+        StreamingResponse: The ``text/event-stream`` response.
+    """
+    async def snapshot():
+        entries = [await forecast_cache.get_forecast(c) for c in city]
+        return [e["body"] for e in entries if e is not None]
+
+    return StreamingResponse(
+        live_updates.sse_stream(city, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _naive_utc(value: datetime) -> datetime:
+    """Converts an offset-aware time to naive UTC, as stored; naive times are taken as UTC."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+@app.get("/analytics")
+async def analytics(
+    city: List[str] = Query(default=[]),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = Query(default=500, ge=2),
+    method: str = Query(default="bucket", pattern="^(bucket|lttb)$"),
+):
+    """
+    Returns downsampled per-city measurement series for charts.
+
+    Aggregation happens in SQL on the finest table (raw, hourly or daily
+    rollup) that still satisfies the requested resolution. Responses are
+    cached per query.
+
+    Args:
+        city (list): Cities to include; repeat the parameter for several. Empty means all.
+        start (datetime): The inclusive start (UTC); defaults to 30 days before ``end``.
+        end (datetime): The exclusive end (UTC); defaults to the next full hour.
+        points (int): The target number of points per city.
+        method (str): ``bucket`` for time-bucket averages or ``lttb`` for
+            Largest-Triangle-Three-Buckets point selection.
+
+    Returns:
+        Response: JSON with the chosen source table and columnar ``series`` per city.
+
+    Raises:
+        HTTPException: If the time range is empty.
+    """
+    default_start, default_end = analytics_service.default_range()
+    end = _naive_utc(end or default_end)
+    start = _naive_utc(start) if start else end - (default_end - default_start)
+    if start >= end:
+        raise HTTPException(status_code=422, detail="start must be before end")
+    body = await analytics_service.get_series(city, start, end, points, method)
+    return Response(content=body, media_type="application/json")
+
+@app.get("/analytics/cities")
+async def analytics_cities():
+    """
+    Returns the cities that have analytics data.
+
+    Returns:
+        dict: The sorted city names.
+    """
+    return {"cities": await analytics_service.list_cities()}
+
+async def _compute_analysis(city_name: str, wait: float = 0, coords: dict = None, current: dict = None):
+    """
+    Runs the `/analyze` pipeline for a city.
+
+    If no model exists for the city, a training job is started off the
+    request path; concurrent requests for the same city share one job.
+
+    Args:
+        city_name (str): The name of the city.
+        wait (float): Seconds to wait for a training job, capped at ``TRAIN_JOB_MAX_WAIT``.
+        coords (dict): The city's coordinates, if already geocoded.
+        current (dict): The city's current weather, if already fetched.
+
+    Returns:
+        The payload dict, or a 202 JSONResponse with the training job if it is still running.
+
+    Raises:
+        HTTPException: If the city is not found, if weather data cannot be
+                       fetched, or if the model training fails.
+    """
+    coords = coords or await get_coordinates(city_name)
     if not coords:
         raise HTTPException(status_code=504, detail="geocoding timeout or city not found")
-    current = await fetch_current_weather(coords["lat"], coords["lon"])
+    current = current or await fetch_current_weather(coords["lat"], coords["lon"])
     if not current:
         raise HTTPException(status_code=504, detail="current weather fetch timeout")
-    hist_df = await fetch_historical_training_data(coords["lat"], coords["lon"])
-    model, metrics = load_model_for_city(city_name)
+    measurement_buffer.add(current_row(city_name, current))
+    model, metrics = await asyncio.to_thread(load_model_for_city, city_name)
     if model is None:
-        ok = train_model_for_city(city_name, hist_df)
-        if not ok:
-            raise HTTPException(status_code=500, detail="training failed")
-        model, metrics = load_model_for_city(city_name)
-    preds = []
+        job = await training_jobs.submit(city_name, coords)
+        job = await training_jobs.wait(job["id"], min(max(wait, 0), TRAIN_JOB_MAX_WAIT)) or job
+        if job["status"] == "failed":
+            raise HTTPException(status_code=500, detail=f"training failed: {job['error']}")
+        model, metrics = await asyncio.to_thread(load_model_for_city, city_name)
+        if model is None:
+            return JSONResponse(
+                status_code=202,
+                content={"city": city_name, "job": job, "status_url": f"/jobs/{job['id']}"},
+                headers={"Location": f"/jobs/{job['id']}"},
+            )
     now = int(time.time())
     humidity = float(current.get("humidity") or 50)
     wind = float(current.get("wind_speed") or 5)
-    for h in range(1, 25):
-        ts = now + h * 3600
-        y = predict_temp(ts, humidity, wind, city_name)
-        preds.append({"timestamp": ts, "hour": h, "temperature": y})
+    preds = await inference_executor.predict_horizon(city_name, now, 24, humidity, wind)
     return {
         "city": city_name,
         "coords": coords,
         "current": current,
         "predictions": preds,
         "metrics": metrics or {},
+        "generated_at": time.time(),
     }
+
+async def _refresh_analysis(city_name: str):
+    """Recomputes a cached payload in the background; a pending training job leaves the old one."""
+    payload = await _compute_analysis(city_name)
+    return payload if isinstance(payload, dict) else None
+
+def _cached_response(entry: dict, status: str, if_none_match: Optional[str]) -> Response:
+    """Builds a response for a forecast cache entry, answering 304 if the client's ETag matches."""
+    headers = {"ETag": entry["etag"], "Cache-Control": forecast_cache.cache_control(entry), "X-Cache": status}
+    if if_none_match and entry["etag"] in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+def _wait_seconds(payload: dict) -> float:
+    """
+    Reads the optional ``wait`` of a request body.
+
+    Raises:
+        HTTPException: 422 if it is not a finite number of seconds.
+    """
+    try:
+        wait = float(payload.get("wait") or 0)
+    except (TypeError, ValueError):
+        wait = math.nan
+    if not math.isfinite(wait):
+        raise HTTPException(status_code=422, detail="wait must be a number of seconds")
+    return wait
+
+@app.post("/analyze")
+@telemetry.timed("analyze")
+async def analyze(payload: dict, if_none_match: Optional[str] = Header(default=None)):
+    """
+    Analyzes weather data for a specific city, returning current weather,
+    temperature predictions, and model metrics.
+
+    Payloads are served from the forecast cache, which the global monitor
+    also fills. Within ``FORECAST_SOFT_TTL`` an entry is served as is; past
+    it, the stale entry is served and one background refresh is started.
+    Responses carry an ``ETag``, and a matching ``If-None-Match`` gets 304.
+
+    If no model exists for the city, a training job is started off the
+    request path; concurrent requests for the same city share one job. The
+    request waits up to ``wait`` seconds for it and otherwise answers 202
+    with the job id, to be polled at `/jobs/{id}`.
+
+    Args:
+        payload (dict): A dictionary containing the city name and optionally
+            the number of seconds to wait for training.
+            Example: {"city_name": "London", "wait": 10}
+        if_none_match (str): The ETag(s) of the payload the client already has.
+
+    Returns:
+        Response: The city's coordinates, current weather, temperature
+                  predictions for the next 24 hours, model metrics and
+                  generation time, or a 202 response with the training job.
+
+    Raises:
+        HTTPException: If the city name is not provided, if the city is not found,
+                       if weather data cannot be fetched, or if the model training fails.
+    """
+    payload = payload or {}
+    city_name = payload.get("city_name")
+    if not city_name:
+        raise HTTPException(status_code=422, detail="city_name required")
+    wait = _wait_seconds(payload)
+    entry = await forecast_cache.get_forecast(city_name)
+    if entry is not None:
+        if forecast_cache.is_fresh(entry):
+            return _cached_response(entry, "HIT", if_none_match)
+        await forecast_cache.refresh_in_background(city_name, _refresh_analysis)
+        return _cached_response(entry, "STALE", if_none_match)
+    result = await _compute_analysis(city_name, wait)
+    if not isinstance(result, dict):
+        return result
+    return _cached_response(await forecast_cache.store_forecast(result), "MISS", if_none_match)
+
+def _batch_line(city: str, status: int, **fields) -> str:
+    """Serializes one NDJSON line of a batch response."""
+    return json.dumps({"city": city, "status": status, **fields}) + "\n"
+
+async def _analyze_batch(cities: list, wait: float):
+    """
+    Yields one NDJSON line per city as soon as its analysis is ready.
+
+    Cached payloads are streamed first, stale ones triggering a background
+    refresh. Every other city runs its own pipeline with bounded
+    concurrency: geocoding, current weather and prediction. A line is
+    emitted when that city's pipeline ends, without waiting for the rest of
+    the batch. Current-weather lookups of cities geocoded in the same event
+    loop tick share one multi-location request.
+
+    Args:
+        cities (list): Unique city names.
+        wait (float): Seconds each city may wait for a training job.
+
+    Yields:
+        str: ``{"city", "status", ...}`` lines with a ``result``, ``job`` or ``error``.
+    """
+    sem = asyncio.Semaphore(max(1, ANALYZE_BATCH_CONCURRENCY))
+    entries = await asyncio.gather(*(forecast_cache.get_forecast(c) for c in cities))
+    todo = []
+    for city, entry in zip(cities, entries):
+        if entry is None:
+            todo.append(city)
+            continue
+        status = "HIT" if forecast_cache.is_fresh(entry) else "STALE"
+        if status == "STALE":
+            await forecast_cache.refresh_in_background(city, _refresh_analysis)
+        yield _batch_line(city, 200, cache=status, result=json.loads(entry["body"]))
+
+    pending, fetches = [], set()
+
+    async def fetch_pending():
+        await asyncio.sleep(0)
+        batch = pending[:]
+        pending.clear()
+        try:
+            currents = await fetch_current_weather_batch([location for location, _ in batch])
+        except Exception:
+            currents = [None] * len(batch)
+        for (_, future), current in zip(batch, currents):
+            future.set_result(current)
+
+    async def current_weather(coords):
+        """Queues a lookup; the first one of a tick schedules the shared request."""
+        future = asyncio.get_running_loop().create_future()
+        pending.append(((coords["lat"], coords["lon"]), future))
+        if len(pending) == 1:
+            task = asyncio.create_task(fetch_pending())
+            fetches.add(task)
+            task.add_done_callback(fetches.discard)
+        return await future
+
+    async def run(city):
+        async with sem:
+            try:
+                coords = await get_coordinates(city)
+            except Exception:
+                coords = None
+            if not coords:
+                return _batch_line(city, 504, error="geocoding timeout or city not found")
+            try:
+                result = await _compute_analysis(city, wait, coords, await current_weather(coords))
+            except HTTPException as e:
+                return _batch_line(city, e.status_code, error=e.detail)
+            except Exception as e:
+                return _batch_line(city, 500, error=str(e))
+        if not isinstance(result, dict):
+            body = json.loads(result.body)
+            return _batch_line(city, result.status_code, job=body["job"], status_url=body["status_url"])
+        entry = await forecast_cache.store_forecast(result)
+        return _batch_line(city, 200, cache="MISS", result=json.loads(entry["body"]))
+
+    for line in asyncio.as_completed([run(c) for c in todo]):
+        yield await line
+
+@app.post("/analyze/batch")
+async def analyze_batch(payload: dict):
+    """
+    Analyzes many cities in one request, streaming results as NDJSON.
+
+    Each line is ``{"city", "status", ...}`` with the `/analyze` payload
+    under ``result`` (status 200), the training ``job`` (202) or an ``error``
+    (4xx/5xx), so one failing city does not fail the batch. Lines arrive in
+    completion order, cached cities first.
+
+    Args:
+        payload (dict): The city names and optionally the number of seconds
+            each city may wait for training.
+            Example: {"cities": ["London", "Paris"], "wait": 0}
+
+    Returns:
+        StreamingResponse: The ``application/x-ndjson`` response.
+
+    Raises:
+        HTTPException: If the body is not an object, if no cities or more
+                       than ``ANALYZE_BATCH_MAX`` are given, or if ``wait`` is not a number.
+    """
+    payload = payload or {}
+    cities = list(dict.fromkeys(c for c in payload.get("cities") or [] if isinstance(c, str) and c))
+    if not cities:
+        raise HTTPException(status_code=422, detail="cities required")
+    if len(cities) > ANALYZE_BATCH_MAX:
+        raise HTTPException(status_code=422, detail=f"at most {ANALYZE_BATCH_MAX} cities per batch")
+    wait = _wait_seconds(payload)
+    return StreamingResponse(_analyze_batch(cities, wait), media_type="application/x-ndjson")
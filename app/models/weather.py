@@ -1,6 +1,6 @@
 from datetime import datetime
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Integer, Float, DateTime
+from sqlalchemy import String, Integer, Float, DateTime, UniqueConstraint, Index
 
 class Base(DeclarativeBase):
     """Base class for SQLAlchemy declarative models."""
@@ -17,11 +17,68 @@ class WeatherMeasurement(Base):
         temperature (float): The temperature in degrees Celsius.
         humidity (float): The humidity as a percentage.
         wind_speed (float): The wind speed in km/h.
+
+    A city has at most one measurement per timestamp, which lets ingestion
+    skip duplicates with ``ON CONFLICT DO NOTHING``. The unique constraint's
+    ``(city, timestamp)`` index serves city and time-range queries; a BRIN
+    index on ``timestamp`` keeps whole-table time scans cheap as rows arrive
+    roughly in time order.
     """
     __tablename__ = "weather_measurements"
+    __table_args__ = (
+        UniqueConstraint("city", "timestamp", name="uq_weather_measurements_city_timestamp"),
+        Index("ix_weather_measurements_timestamp_brin", "timestamp", postgresql_using="brin"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     city: Mapped[str] = mapped_column(String(100), nullable=False)
     timestamp: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     temperature: Mapped[float] = mapped_column(Float)
     humidity: Mapped[float] = mapped_column(Float)
     wind_speed: Mapped[float] = mapped_column(Float)
+
+class RollupColumns:
+    """
+    Columns shared by the rollup tables.
+
+    Attributes:
+        city (str): The name of the city.
+        bucket (datetime): The start of the aggregated period.
+        samples (int): The number of raw measurements in the period.
+        temperature_avg (float): The mean temperature.
+        temperature_min (float): The lowest temperature.
+        temperature_max (float): The highest temperature.
+        humidity_avg (float): The mean humidity.
+        wind_speed_avg (float): The mean wind speed.
+    """
+    city: Mapped[str] = mapped_column(String(100), primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    samples: Mapped[int] = mapped_column(Integer, nullable=False)
+    temperature_avg: Mapped[float] = mapped_column(Float)
+    temperature_min: Mapped[float] = mapped_column(Float)
+    temperature_max: Mapped[float] = mapped_column(Float)
+    humidity_avg: Mapped[float] = mapped_column(Float)
+    wind_speed_avg: Mapped[float] = mapped_column(Float)
+
+class WeatherRollupHourly(RollupColumns, Base):
+    """Hourly aggregates of ``weather_measurements`` per city."""
+    __tablename__ = "weather_rollup_hourly"
+    __table_args__ = (Index("ix_weather_rollup_hourly_bucket", "bucket"),)
+
+class WeatherRollupDaily(RollupColumns, Base):
+    """Daily aggregates of ``weather_measurements`` per city."""
+    __tablename__ = "weather_rollup_daily"
+    __table_args__ = (Index("ix_weather_rollup_daily_bucket", "bucket"),)
+
+class RollupState(Base):
+    """
+    Tracks how far each rollup has consumed ``weather_measurements``.
+
+    Attributes:
+        name (str): The rollup name, e.g. ``hourly``.
+        last_id (int): The highest measurement id already aggregated.
+        updated_at (datetime): When the rollup was last refreshed.
+    """
+    __tablename__ = "rollup_state"
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)
+    last_id: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime)
@@ -0,0 +1,239 @@
+import os
+import json
+import hashlib
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import bindparam, text
+from app.core.db import AsyncSessionLocal
+from app.core import telemetry
+from app.core.cache import LRUCache, get_redis, mark_redis_down
+
+ANALYTICS_CACHE_TTL = int(os.getenv("ANALYTICS_CACHE_TTL", "60"))
+ANALYTICS_MAX_POINTS = int(os.getenv("ANALYTICS_MAX_POINTS", "5000"))
+# LTTB picks from at most this many source rows per requested point.
+LTTB_OVERSAMPLE = int(os.getenv("LTTB_OVERSAMPLE", "8"))
+SOURCES = [
+    ("raw", "weather_measurements", "timestamp", "temperature", "humidity", "wind_speed", 0),
+    ("hourly", "weather_rollup_hourly", "bucket", "temperature_avg", "humidity_avg", "wind_speed_avg", 3600),
+    ("daily", "weather_rollup_daily", "bucket", "temperature_avg", "humidity_avg", "wind_speed_avg", 86400),
+]
+SERIES_FIELDS = ["timestamp", "temperature", "temperature_min", "temperature_max", "humidity", "wind_speed"]
+
+_cache = LRUCache(256)
+telemetry.register_cache("analytics", lambda: (_cache.hits, _cache.misses, len(_cache)))
+
+def _pick_source(step: float):
+    """
+    Returns the coarsest table whose resolution is still finer than ``step`` seconds.
+
+    Args:
+        step (float): The desired seconds per output point.
+
+    Returns:
+        tuple: An entry of ``SOURCES``.
+    """
+    chosen = SOURCES[0]
+    for source in SOURCES:
+        if source[-1] <= step:
+            chosen = source
+    return chosen
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Selects points with the Largest-Triangle-Three-Buckets algorithm.
+
+    Args:
+        x (np.ndarray): Sorted x values.
+        y (np.ndarray): The y values.
+        threshold (int): The number of points to keep.
+
+    Returns:
+        np.ndarray: The indices of the kept points, including the first and last.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nxt_lo:nxt_hi].mean() if nxt_hi > nxt_lo else x[-1]
+        avg_y = y[nxt_lo:nxt_hi].mean() if nxt_hi > nxt_lo else y[-1]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+def _bucket_sql(source: tuple, with_cities: bool):
+    """
+    Builds the SQL aggregating rows into fixed-width time buckets per city.
+
+    Args:
+        source (tuple): An entry of ``SOURCES``.
+        with_cities (bool): Whether to filter by the ``cities`` parameter.
+
+    Returns:
+        TextClause: The query with ``start``, ``end``, ``width`` and optionally ``cities`` parameters.
+    """
+    _, table, ts, temp, hum, wind, _ = source
+    where = "AND city IN :cities" if with_cities else ""
+    if source[0] == "raw":
+        t_min, t_max = f"min({temp})", f"max({temp})"
+    else:
+        t_min, t_max = "min(temperature_min)", "max(temperature_max)"
+    stmt = text(f"""
+        SELECT city,
+               extract(epoch FROM min({ts}))::float8 AS timestamp,
+               avg({temp}) AS temperature, {t_min} AS temperature_min, {t_max} AS temperature_max,
+               avg({hum}) AS humidity, avg({wind}) AS wind_speed
+        FROM {table}
+        WHERE {ts} >= :start AND {ts} < :end {where}
+        GROUP BY city, floor(extract(epoch FROM {ts})::float8 / CAST(:width AS float8))
+        ORDER BY city, timestamp
+    """)
+    return stmt.bindparams(bindparam("cities", expanding=True)) if with_cities else stmt
+
+def _raw_sql(source: tuple, with_cities: bool):
+    """Builds the SQL returning every row of a source in a time range, for LTTB."""
+    _, table, ts, temp, hum, wind, _ = source
+    where = "AND city IN :cities" if with_cities else ""
+    stmt = text(f"""
+        SELECT city, extract(epoch FROM {ts})::float8 AS timestamp,
+               {temp} AS temperature, {temp} AS temperature_min, {temp} AS temperature_max,
+               {hum} AS humidity, {wind} AS wind_speed
+        FROM {table}
+        WHERE {ts} >= :start AND {ts} < :end {where}
+        ORDER BY city, {ts}
+    """)
+    return stmt.bindparams(bindparam("cities", expanding=True)) if with_cities else stmt
+
+def _group(rows) -> dict:
+    """Splits ``(city, *SERIES_FIELDS)`` rows into columnar per-city series."""
+    series = {}
+    for row in rows:
+        cols = series.setdefault(row[0], {f: [] for f in SERIES_FIELDS})
+        for field, value in zip(SERIES_FIELDS, row[1:]):
+            cols[field].append(value)
+    return series
+
+async def fetch_series(cities: list, start: datetime, end: datetime, points: int, method: str) -> dict:
+    """
+    Reads downsampled per-city series from the database.
+
+    ``bucket`` averages fixed-width time buckets in SQL. ``lttb`` reads the
+    finest source that stays under ``LTTB_OVERSAMPLE`` rows per point and keeps
+    the visually significant temperature points.
+
+    Args:
+        cities (list): Cities to include; empty for all.
+        start (datetime): The inclusive start (UTC).
+        end (datetime): The exclusive end (UTC).
+        points (int): The target number of points per city.
+        method (str): ``bucket`` or ``lttb``.
+
+    Returns:
+        dict: The response body.
+    """
+    span = max((end - start).total_seconds(), 1.0)
+    step = span / points
+    params = {"start": start, "end": end}
+    if cities:
+        params["cities"] = list(cities)
+    async with AsyncSessionLocal() as session:
+        if method == "lttb":
+            source = _pick_source(step / LTTB_OVERSAMPLE)
+            rows = (await session.execute(_raw_sql(source, bool(cities)), params)).all()
+        else:
+            source = _pick_source(step)
+            params["width"] = max(step, source[-1] or 1)
+            rows = (await session.execute(_bucket_sql(source, bool(cities)), params)).all()
+    series = _group(rows)
+    if method == "lttb":
+        for city, cols in series.items():
+            idx = lttb(np.asarray(cols["timestamp"]), np.asarray(cols["temperature"], dtype=float), points)
+            series[city] = {f: [cols[f][i] for i in idx] for f in SERIES_FIELDS}
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "points": points,
+        "method": method,
+        "source": source[0],
+        "series": series,
+    }
+
+def cache_key(cities: list, start: datetime, end: datetime, points: int, method: str) -> str:
+    """
+    Builds a stable cache key for an analytics query.
+
+    Args:
+        cities (list): The requested cities.
+        start (datetime): The start of the range.
+        end (datetime): The end of the range.
+        points (int): The target number of points.
+        method (str): The downsampling method.
+
+    Returns:
+        str: ``analytics:`` followed by a digest of the normalized query.
+    """
+    query = json.dumps([sorted(set(cities)), start.isoformat(), end.isoformat(), points, method])
+    return "analytics:" + hashlib.sha1(query.encode()).hexdigest()
+
+async def get_series(cities: list, start: datetime, end: datetime, points: int, method: str = "bucket") -> str:
+    """
+    Returns a downsampled analytics response, cached in process and in Redis.
+
+    Args:
+        cities (list): Cities to include; empty for all.
+        start (datetime): The inclusive start (UTC).
+        end (datetime): The exclusive end (UTC).
+        points (int): The target number of points per city, capped at ``ANALYTICS_MAX_POINTS``.
+        method (str): ``bucket`` or ``lttb``.
+
+    Returns:
+        str: The JSON-encoded response body.
+    """
+    points = max(2, min(points, ANALYTICS_MAX_POINTS))
+    key = cache_key(cities, start, end, points, method)
+    body = _cache.get(key)
+    if body is not None:
+        return body
+    r = get_redis()
+    if r is not None:
+        try:
+            raw = await r.get(key)
+        except Exception as e:
+            mark_redis_down(e)
+            r, raw = None, None
+        if raw:
+            body = raw.decode()
+            _cache.set(key, body, ANALYTICS_CACHE_TTL)
+            return body
+    body = json.dumps(await fetch_series(cities, start, end, points, method))
+    _cache.set(key, body, ANALYTICS_CACHE_TTL)
+    if r is not None:
+        try:
+            await r.set(key, body, ex=ANALYTICS_CACHE_TTL)
+        except Exception as e:
+            mark_redis_down(e)
+    return body
+
+async def list_cities() -> list:
+    """
+    Returns the cities that have analytics data.
+
+    Returns:
+        list: City names from the daily rollup, sorted.
+    """
+    async with AsyncSessionLocal() as session:
+        rows = await session.execute(text("SELECT DISTINCT city FROM weather_rollup_daily ORDER BY city"))
+        return [r[0] for r in rows]
+
+def default_range(days: int = 30) -> tuple:
+    """Returns the ``(start, end)`` of the last ``days`` days, ending at the next full hour (UTC)."""
+    end = datetime.utcnow().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    return end - timedelta(days=days), end
@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from app.core import telemetry
+from app.core.cache import LRUCache, get_redis, mark_redis_down
+from app.services import live_updates
+from app.services.weather_service import _geo_key
+
+logger = logging.getLogger(__name__)
+
+FORECAST_SOFT_TTL = int(os.getenv("FORECAST_SOFT_TTL", "900"))
+FORECAST_HARD_TTL = int(os.getenv("FORECAST_HARD_TTL", "3600"))
+FORECAST_LOCAL_TTL = float(os.getenv("FORECAST_LOCAL_TTL", "5"))
+REFRESH_LOCK_TTL = int(os.getenv("FORECAST_REFRESH_LOCK_TTL", "60"))
+# Sorted set of tracked cities, by normalized name, scored by the generation time of their payload.
+INDEX_KEY = "monitor:cities"
+
+_local = LRUCache(int(os.getenv("FORECAST_CACHE_SIZE", "1024")))
+_refreshing = set()
+_tasks = set()
+telemetry.register_cache("forecast", lambda: (_local.hits, _local.misses, len(_local)))
+
+def forecast_key(city: str) -> str:
+    """Returns the Redis key of a city's cached `/analyze` payload, the same for any spelling of its name."""
+    return f"city_intel:{_geo_key(city)}"
+
+def _entry(body: str) -> dict:
+    """Builds a cache entry with the body's ETag and generation time."""
+    generated_at = json.loads(body).get("generated_at") or 0.0
+    etag = '"' + hashlib.sha1(body.encode()).hexdigest()[:20] + '"'
+    return {"body": body, "etag": etag, "generated_at": generated_at}
+
+def age(entry: dict) -> float:
+    """Returns the age of a cache entry in seconds."""
+    return max(time.time() - entry["generated_at"], 0.0)
+
+def is_fresh(entry: dict, soft_ttl: int = FORECAST_SOFT_TTL) -> bool:
+    """Returns whether a cache entry is younger than the soft TTL."""
+    return age(entry) < soft_ttl
+
+def cache_control(entry: dict, soft_ttl: int = FORECAST_SOFT_TTL, hard_ttl: int = FORECAST_HARD_TTL) -> str:
+    """
+    Builds the ``Cache-Control`` header for a cached payload.
+
+    Args:
+        entry (dict): The cache entry.
+        soft_ttl (int): Seconds a payload is served as fresh.
+        hard_ttl (int): Seconds a payload may be served at all.
+
+    Returns:
+        str: ``max-age`` for the remaining freshness and ``stale-while-revalidate`` for the rest.
+    """
+    remaining = int(max(soft_ttl - age(entry), 0))
+    return f"public, max-age={remaining}, stale-while-revalidate={max(hard_ttl - soft_ttl, 0)}"
+
+async def get_forecast(city: str):
+    """
+    Returns the cached `/analyze` payload of a city.
+
+    The in-process cache answers repeated requests without a Redis round
+    trip for up to ``FORECAST_LOCAL_TTL`` seconds.
+
+    Args:
+        city (str): The name of the city, in any spelling.
+
+    Returns:
+        dict: The entry with the JSON ``body``, its ``etag`` and ``generated_at``, or None.
+    """
+    entry = _local.get(_geo_key(city))
+    if entry is not None:
+        return entry
+    r = get_redis()
+    if r is None:
+        return None
+    try:
+        raw = await r.get(forecast_key(city))
+    except Exception as e:
+        mark_redis_down(e)
+        return None
+    if not raw:
+        return None
+    entry = _entry(raw.decode())
+    _local.set(_geo_key(city), entry, FORECAST_LOCAL_TTL)
+    return entry
+
+async def store_forecast(payload: dict) -> dict:
+    """
+    Caches a city's `/analyze` payload for ``FORECAST_HARD_TTL`` seconds.
+
+    A ``generated_at`` timestamp is added if missing; freshness is measured
+    from it. The city is tracked in ``INDEX_KEY`` so ``list_forecasts`` can
+    read every payload without scanning the keyspace, and the payload is
+    published to live subscribers.
+
+    Args:
+        payload (dict): The payload, with a ``city`` key.
+
+    Returns:
+        dict: The new cache entry.
+    """
+    payload.setdefault("generated_at", time.time())
+    entry = _entry(json.dumps(payload))
+    city = _geo_key(payload["city"])
+    _local.set(city, entry, FORECAST_LOCAL_TTL)
+    r = get_redis()
+    if r is not None:
+        try:
+            pipe = r.pipeline(transaction=False)
+            pipe.set(forecast_key(city), entry["body"], ex=FORECAST_HARD_TTL)
+            pipe.zadd(INDEX_KEY, {city: entry["generated_at"]})
+            pipe.publish(live_updates.UPDATES_CHANNEL, entry["body"])
+            await pipe.execute()
+            return entry
+        except Exception as e:
+            mark_redis_down(e)
+    live_updates.hub.dispatch(entry["body"])
+    return entry
+
+def _project(body: bytes, fields: list) -> str:
+    """Returns a payload reduced to the given top-level fields, always keeping ``city``."""
+    data = json.loads(body)
+    return json.dumps({k: data[k] for k in ["city", *fields] if k in data})
+
+async def list_forecasts(fields: list = None) -> str:
+    """
+    Returns the cached payloads of every tracked city in two round trips.
+
+    The first pipeline drops index entries past ``FORECAST_HARD_TTL`` and
+    reads the index; one MGET then fetches all payloads. Cities whose payload
+    has expired are removed from the index. Without a projection the stored
+    JSON is spliced into the response without being parsed.
+
+    Args:
+        fields (list): Top-level payload fields to keep; all fields if empty.
+
+    Returns:
+        str: A JSON object ``{"count": n, "cities": [...]}`` sorted by city name.
+    """
+    r = get_redis()
+    bodies = []
+    if r is not None:
+        try:
+            pipe = r.pipeline(transaction=False)
+            pipe.zremrangebyscore(INDEX_KEY, "-inf", time.time() - FORECAST_HARD_TTL)
+            pipe.zrange(INDEX_KEY, 0, -1)
+            _, members = await pipe.execute()
+            cities = sorted(m.decode() for m in members)
+            raws = await r.mget([forecast_key(c) for c in cities]) if cities else []
+            gone = [c for c, raw in zip(cities, raws) if raw is None]
+            if gone:
+                await r.zrem(INDEX_KEY, *gone)
+            bodies = [raw for raw in raws if raw is not None]
+        except Exception as e:
+            mark_redis_down(e)
+            bodies = []
+    items = [_project(b, fields) for b in bodies] if fields else [b.decode() for b in bodies]
+    return f'{{"count": {len(items)}, "cities": [{", ".join(items)}]}}'
+
+async def _acquire_refresh(city: str) -> bool:
+    """Takes the cross-node refresh lock of a city; without Redis only this process is guarded."""
+    city = _geo_key(city)
+    if city in _refreshing:
+        return False
+    r = get_redis()
+    if r is not None:
+        try:
+            if not await r.set(f"{forecast_key(city)}:refresh", "1", nx=True, ex=REFRESH_LOCK_TTL):
+                return False
+        except Exception as e:
+            mark_redis_down(e)
+    _refreshing.add(city)
+    return True
+
+async def _refresh(city: str, compute):
+    """Recomputes and stores a payload, then releases the refresh lock."""
+    try:
+        payload = await compute(city)
+        if payload is not None:
+            await store_forecast(payload)
+    except Exception:
+        logger.exception("refreshing the forecast of %s failed", city)
+    finally:
+        _refreshing.discard(_geo_key(city))
+        r = get_redis()
+        if r is not None:
+            try:
+                await r.delete(f"{forecast_key(city)}:refresh")
+            except Exception as e:
+                mark_redis_down(e)
+
+async def refresh_in_background(city: str, compute) -> bool:
+    """
+    Starts one background recomputation of a stale payload.
+
+    Args:
+        city (str): The name of the city.
+        compute: An async callable ``compute(city)`` returning the new payload, or None to keep the old one.
+
+    Returns:
+        bool: True if a refresh was started, False if one is already running.
+    """
+    if not await _acquire_refresh(city):
+        return False
+    task = asyncio.create_task(_refresh(city, compute))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return True
+
+def clear_local():
+    """Drops the in-process copies, e.g. in tests."""
+    _local.clear()
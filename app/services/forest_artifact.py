@@ -0,0 +1,168 @@
+import os
+import json
+import struct
+import numpy as np
+
+MAGIC = b"MMFRST01"
+ALIGN = 64
+
+def _flatten(model) -> tuple:
+    """
+    Concatenates the trees of a fitted ensemble into flat node arrays.
+
+    Child indices are made global so all trees share one set of arrays.
+    Thresholds are rounded down to float32, which is exact: sklearn compares
+    float32 inputs against them, and ``x <= t`` holds for a float32 ``x``
+    exactly when ``x`` is at most the largest float32 not above ``t``.
+
+    Args:
+        model: A fitted ``RandomForestRegressor`` or ``ExtraTreesRegressor``.
+
+    Returns:
+        tuple: The arrays by name and the maximum tree depth.
+    """
+    trees = [est.tree_ for est in model.estimators_]
+    sizes = np.array([t.node_count for t in trees], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    left, right, feature, threshold, value, missing = [], [], [], [], [], []
+    for tree, offset in zip(trees, offsets):
+        is_leaf = tree.children_left < 0
+        left.append(np.where(is_leaf, -1, tree.children_left + offset))
+        right.append(np.where(is_leaf, -1, tree.children_right + offset))
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        value.append(tree.value[:, 0, 0])
+        missing.append(getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=np.uint8)))
+    thr64 = np.concatenate(threshold)
+    thr32 = thr64.astype(np.float32)
+    above = thr32.astype(np.float64) > thr64
+    thr32[above] = np.nextafter(thr32[above], np.float32(-np.inf))
+    arrays = {
+        "roots": offsets.astype(np.int32),
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int16),
+        "threshold": thr32,
+        "value": np.concatenate(value).astype(np.float32),
+        "missing_left": np.concatenate(missing).astype(np.bool_),
+    }
+    return arrays, max(t.max_depth for t in trees)
+
+def export_forest(model, path: str) -> bool:
+    """
+    Writes a tree ensemble as a flat, memory-mappable artifact.
+
+    The file holds a small JSON header followed by 64-byte aligned raw arrays.
+    It is written to a temporary file and renamed, so readers never see a
+    partial artifact.
+
+    Args:
+        model: The fitted estimator.
+        path (str): The destination path.
+
+    Returns:
+        bool: True if written, False if the estimator is not a supported tree ensemble.
+    """
+    estimators = getattr(model, "estimators_", None)
+    if not estimators or not all(hasattr(e, "tree_") for e in estimators) or getattr(model, "n_outputs_", 1) != 1:
+        return False
+    arrays, max_depth = _flatten(model)
+    header = {
+        "estimator": type(model).__name__,
+        "n_trees": len(estimators),
+        "n_features": int(model.n_features_in_),
+        "feature_names": [str(f) for f in getattr(model, "feature_names_in_", [])],
+        "max_depth": int(max_depth),
+        "arrays": {},
+    }
+    offset = 0
+    for name, arr in arrays.items():
+        offset = -(-offset // ALIGN) * ALIGN
+        header["arrays"][name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset += arr.nbytes
+    blob = json.dumps(header).encode()
+    data_start = -(-(len(MAGIC) + 4 + len(blob)) // ALIGN) * ALIGN
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(blob)) + blob)
+        for name, arr in arrays.items():
+            f.seek(data_start + header["arrays"][name]["offset"])
+            f.write(np.ascontiguousarray(arr).tobytes())
+    os.replace(tmp, path)
+    return True
+
+class ForestPredictor:
+    """
+    Predicts with a flattened tree ensemble using vectorized NumPy traversal.
+
+    All samples descend all trees together, one tree level per step, and the
+    leaf values are averaged like ``RandomForestRegressor.predict``. The node
+    arrays are memory-mapped read-only, so processes loading the same
+    artifact share its pages.
+
+    Attributes:
+        n_features_in_ (int): The number of input features.
+        feature_names_in_ (np.ndarray): The feature names seen during fit, if any.
+    """
+
+    def __init__(self, header: dict, arrays: dict):
+        self.header = header
+        self.n_features_in_ = header["n_features"]
+        if header["feature_names"]:
+            self.feature_names_in_ = np.array(header["feature_names"], dtype=object)
+        self._a = arrays
+
+    def predict(self, X) -> np.ndarray:
+        """
+        Predicts targets for a batch of samples.
+
+        Args:
+            X: An array-like of shape ``(n_samples, n_features)``.
+
+        Returns:
+            np.ndarray: The predictions as float64.
+
+        Raises:
+            ValueError: If the number of features does not match the model.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[-1]} features, but the model expects {self.n_features_in_}")
+        a = self._a
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(a["roots"], (len(X), len(a["roots"]))).copy()
+        for _ in range(self.header["max_depth"]):
+            left = a["left"][node]
+            leaf = left < 0
+            if leaf.all():
+                break
+            x = X[rows, a["feature"][node]]
+            go_left = (x <= a["threshold"][node]) | (np.isnan(x) & a["missing_left"][node])
+            node = np.where(leaf, node, np.where(go_left, left, a["right"][node]))
+        return a["value"][node].astype(np.float64).mean(axis=1)
+
+def load_forest(path: str) -> ForestPredictor:
+    """
+    Memory-maps a flattened forest artifact.
+
+    Args:
+        path (str): The artifact path.
+
+    Returns:
+        ForestPredictor: The predictor.
+
+    Raises:
+        ValueError: If the file is not a forest artifact.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a forest artifact")
+        (size,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(size))
+    data_start = -(-(len(MAGIC) + 4 + size) // ALIGN) * ALIGN
+    arrays = {
+        name: np.memmap(path, dtype=np.dtype(spec["dtype"]), mode="r",
+                        offset=data_start + spec["offset"], shape=tuple(spec["shape"]))
+        for name, spec in header["arrays"].items()
+    }
+    return ForestPredictor(header, arrays)
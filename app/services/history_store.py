@@ -0,0 +1,223 @@
+import os
+import math
+import time
+import fcntl
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+import numpy as np
+from app.core import telemetry
+from app.services import weather_service
+from app.services.ml_service import _slug
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+HISTORY_STORE = os.getenv("HISTORY_STORE", "1") not in ("0", "false", "no")
+HISTORY_DIR = os.getenv("HISTORY_DIR", "weather_history")
+HISTORY_RETENTION_DAYS = int(os.getenv("HISTORY_RETENTION_DAYS", "400"))
+# The forecast API serves at most this many past days; longer windows fill up through later appends.
+MAX_PAST_DAYS = 92
+# Stale hours tolerated past the retention before the columns are rewritten.
+COMPACT_SLACK_HOURS = 24 * 7
+COLUMNS = {"timestamp": np.int64, "temperature": np.float32, "humidity": np.float32, "wind_speed": np.float32}
+VALUES = ("temperature", "humidity", "wind_speed")
+
+def _dir(city: str) -> str:
+    return os.path.join(HISTORY_DIR, _slug(city))
+
+def _path(city: str, column: str) -> str:
+    return os.path.join(_dir(city), f"{column}.bin")
+
+@contextmanager
+def _locked(city: str, exclusive: bool):
+    """Holds the city's file lock, shared for readers and exclusive for writers, across processes."""
+    os.makedirs(_dir(city), exist_ok=True)
+    with open(os.path.join(_dir(city), ".lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def _rows(city: str) -> int:
+    """Returns the number of complete rows, i.e. the length of the shortest column."""
+    sizes = []
+    for column, dtype in COLUMNS.items():
+        path = _path(city, column)
+        sizes.append(os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0)
+    return min(sizes)
+
+def _map(city: str, column: str, rows: int) -> np.ndarray:
+    """Maps the first ``rows`` values of a column read-only."""
+    if rows == 0:
+        return np.empty(0, dtype=COLUMNS[column])
+    return np.asarray(np.memmap(_path(city, column), dtype=COLUMNS[column], mode="r", shape=(rows,)))
+
+def high_water_mark(city: str):
+    """
+    Returns the newest stored hour of a city.
+
+    Returns:
+        int: A Unix timestamp, or None if nothing is stored.
+    """
+    if not os.path.isdir(_dir(city)):
+        return None
+    with _locked(city, exclusive=False):
+        rows = _rows(city)
+        return int(_map(city, "timestamp", rows)[-1]) if rows else None
+
+def read(city: str, days: int = weather_service.HISTORY_PAST_DAYS, until: float = None) -> "pd.DataFrame":
+    """
+    Returns the stored hours of a city within a window, without copying them.
+
+    The measurement columns of the DataFrame are views of the memory-mapped
+    column files; only the ``hour`` column is computed.
+
+    Args:
+        city (str): The name of the city.
+        days (int): The length of the window in days.
+        until (float): The end of the window as a Unix timestamp; defaults to now.
+
+    Returns:
+        pd.DataFrame: The columns of ``weather_service.parse_hourly``, oldest first.
+    """
+    import pandas as pd
+
+    columns = {column: np.empty(0, dtype=dtype) for column, dtype in COLUMNS.items()}
+    if os.path.isdir(_dir(city)):
+        with _locked(city, exclusive=False):
+            rows = _rows(city)
+            columns = {column: _map(city, column, rows) for column in COLUMNS}
+    until = time.time() if until is None else until
+    ts = columns["timestamp"]
+    lo, hi = np.searchsorted(ts, until - days * 86400), np.searchsorted(ts, until, side="right")
+    ts = ts[lo:hi]
+    return pd.DataFrame({
+        "timestamp": ts,
+        "hour": ((ts // 3600) % 24).astype(np.int32),
+        "humidity": columns["humidity"][lo:hi],
+        "wind_speed": columns["wind_speed"][lo:hi],
+        "temperature": columns["temperature"][lo:hi],
+    }, copy=False)
+
+def _repair(city: str) -> int:
+    """Truncates every column to the complete rows, dropping a torn append."""
+    rows = _rows(city)
+    for column, dtype in COLUMNS.items():
+        path = _path(city, column)
+        if os.path.exists(path) and os.path.getsize(path) != rows * np.dtype(dtype).itemsize:
+            os.truncate(path, rows * np.dtype(dtype).itemsize)
+    return rows
+
+def _compact(city: str, rows: int, until: float) -> int:
+    """Rewrites the columns without hours past the retention once enough of them piled up."""
+    retention = max(HISTORY_RETENTION_DAYS, weather_service.HISTORY_PAST_DAYS)
+    stale = int(np.searchsorted(_map(city, "timestamp", rows), until - retention * 86400))
+    if stale <= COMPACT_SLACK_HOURS:
+        return rows
+    for column in COLUMNS:
+        kept = np.array(_map(city, column, rows)[stale:])
+        tmp = _path(city, column) + ".tmp"
+        kept.tofile(tmp)
+        os.replace(tmp, _path(city, column))
+    return rows - stale
+
+def append(city: str, df, until: float = None) -> "pd.DataFrame":
+    """
+    Appends the observed hours of a fetched history that are newer than the stored ones.
+
+    Forecast hours after ``until`` and hours with a missing value are not
+    stored. Each column is appended to its own file under an exclusive lock.
+
+    Args:
+        city (str): The name of the city.
+        df (pd.DataFrame): Data as returned by ``fetch_historical_training_data``.
+        until (float): The latest Unix timestamp to keep; defaults to now.
+
+    Returns:
+        pd.DataFrame: The appended rows.
+    """
+    if df is None or df.empty:
+        import pandas as pd
+        return pd.DataFrame(columns=list(COLUMNS))
+    until = time.time() if until is None else until
+    with _locked(city, exclusive=True):
+        rows = _repair(city)
+        new = df[(df["timestamp"] <= until) & df[list(VALUES)].notna().all(axis=1)]
+        if rows:
+            new = new[new["timestamp"] > int(_map(city, "timestamp", rows)[-1])]
+        new = new.sort_values("timestamp").drop_duplicates("timestamp")
+        for column, dtype in COLUMNS.items():
+            with open(_path(city, column), "ab") as f:
+                new[column].to_numpy(dtype=dtype).tofile(f)
+        _compact(city, rows + len(new), until)
+    return new
+
+def _past_days(mark, days: int, now: float) -> int:
+    """Returns the ``past_days`` that cover every hour after ``mark`` within the window."""
+    window = min(max(days, 0), MAX_PAST_DAYS)
+    if mark is None:
+        return window
+    return min(max(math.ceil((now // 86400 * 86400 - mark) / 86400), 0), window)
+
+@telemetry.timed("history_sync")
+async def sync_histories(located: dict, days: int = weather_service.HISTORY_PAST_DAYS) -> dict:
+    """
+    Brings the stored history of many cities up to date and returns their training windows.
+
+    Only the days after each city's newest stored hour are fetched, with
+    today's hours and no further forecast days. Cities needing the same
+    number of past days share multi-location requests. If a fetch fails, the
+    stored window is still returned. With ``HISTORY_STORE=0`` the full window
+    is fetched instead and nothing is stored.
+
+    Args:
+        located (dict): Coordinates (``lat``, ``lon``) keyed by city name.
+        days (int): The length of the training window in days.
+
+    Returns:
+        dict: ``(window, appended)`` DataFrames keyed by city name, where
+              ``appended`` holds the hours stored by this call.
+    """
+    if not located:
+        return {}
+    if not HISTORY_STORE:
+        frames = await weather_service.fetch_historical_training_data_batch(
+            [(c["lat"], c["lon"]) for c in located.values()], days)
+        return {city: (df, df) for city, df in zip(located, frames)}
+    now = time.time()
+    marks = await asyncio.to_thread(lambda: {city: high_water_mark(city) for city in located})
+    groups = {}
+    for city, mark in marks.items():
+        groups.setdefault(_past_days(mark, days, now), []).append(city)
+    fetched = {}
+    for past_days, cities in groups.items():
+        frames = await weather_service.fetch_historical_training_data_batch(
+            [(located[c]["lat"], located[c]["lon"]) for c in cities], past_days, forecast_days=1)
+        fetched.update(zip(cities, frames))
+
+    def persist():
+        out = {}
+        for city in located:
+            try:
+                appended = append(city, fetched.get(city), now)
+            except OSError:
+                logger.exception("storing the history of %s failed", city)
+                appended = None
+            out[city] = (read(city, days, now), appended)
+        return out
+
+    return await asyncio.to_thread(persist)
+
+async def load_history(city: str, lat: float, lon: float, days: int = weather_service.HISTORY_PAST_DAYS):
+    """
+    Updates and returns the training window of one city.
+
+    Returns:
+        pd.DataFrame: The stored hours within the last ``days`` days.
+    """
+    return (await sync_histories({city: {"lat": lat, "lon": lon}}, days))[city][0]
@@ -0,0 +1,136 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from app.core import telemetry
+from app.services.ml_service import predict_horizons
+
+INFERENCE_WINDOW_MS = float(os.getenv("INFERENCE_WINDOW_MS", "2"))
+INFERENCE_MAX_ROWS = int(os.getenv("INFERENCE_MAX_ROWS", "256"))
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "4"))
+
+class InferenceExecutor:
+    """
+    Runs predictions off the event loop, coalescing concurrent requests per city.
+
+    Requests for the same city that arrive within ``window_ms`` of the first
+    one are answered by a single ``predict`` call on a worker thread. A batch
+    is flushed early once it holds ``max_rows`` rows. Model loading also
+    happens on the worker thread, so the event loop only queues and
+    distributes results.
+
+    Attributes:
+        window_ms (float): How long a batch stays open after its first request.
+        max_rows (int): The number of rows that flushes a batch immediately.
+    """
+
+    def __init__(self, window_ms: float = INFERENCE_WINDOW_MS, max_rows: int = INFERENCE_MAX_ROWS,
+                 workers: int = INFERENCE_WORKERS):
+        self.window_ms = window_ms
+        self.max_rows = max(1, max_rows)
+        self._workers = max(1, workers)
+        self._pool = None
+        self._loop = None
+        self._pending = {}
+        self._depth = 0
+        self.requests = 0
+        self.batches = 0
+        self.batched = 0
+        self.rows = 0
+        self.max_batch = 0
+
+    def _state(self):
+        """Returns the pending batches, resetting them when called from a new event loop."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop, self._pending, self._depth = loop, {}, 0
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="inference")
+        return self._pending
+
+    async def predict_horizon(self, city: str, start_ts: int, hours: int, humidity: float, wind_speed: float) -> list:
+        """
+        Predicts a city's hourly horizon, sharing the model call with concurrent requests.
+
+        Args:
+            city (str): The name of the city.
+            start_ts (int): The Unix timestamp the horizon starts from.
+            hours (int): The number of hourly steps to predict.
+            humidity (float): The humidity value.
+            wind_speed (float): The wind speed value.
+
+        Returns:
+            list: The same result as ``ml_service.predict_horizon``.
+
+        Raises:
+            FileNotFoundError: If a trained model for the city does not exist.
+        """
+        pending = self._state()
+        future = self._loop.create_future()
+        batch = pending.get(city)
+        if batch is None:
+            batch = pending[city] = {"requests": [], "futures": [], "rows": 0}
+            batch["timer"] = self._loop.call_later(self.window_ms / 1000, self._flush, city, batch)
+        batch["requests"].append((start_ts, hours, humidity, wind_speed))
+        batch["futures"].append(future)
+        batch["rows"] += hours
+        self._depth += 1
+        self.requests += 1
+        if batch["rows"] >= self.max_rows:
+            self._flush(city, batch)
+        return await future
+
+    def _flush(self, city: str, batch: dict):
+        """Closes a batch and schedules its model call on the pool."""
+        if self._pending.get(city) is not batch:
+            return
+        del self._pending[city]
+        batch["timer"].cancel()
+        self.batches += 1
+        self.batched += len(batch["requests"])
+        self.rows += batch["rows"]
+        self.max_batch = max(self.max_batch, len(batch["requests"]))
+        task = self._loop.run_in_executor(self._pool, predict_horizons, city, batch["requests"])
+        task.add_done_callback(lambda t: self._resolve(batch, t))
+
+    def _resolve(self, batch: dict, task):
+        """Hands each waiting request its slice of the batch result."""
+        self._depth -= len(batch["futures"])
+        error = task.exception()
+        results = task.result() if error is None else [None] * len(batch["futures"])
+        for future, result in zip(batch["futures"], results):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        """
+        Returns queue and batching statistics.
+
+        Returns:
+            dict: Requests waiting or in flight, batch counts and average and maximum batch sizes.
+        """
+        return {
+            "queue_depth": self._depth,
+            "requests": self.requests,
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch": round(self.batched / self.batches, 2) if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "window_ms": self.window_ms,
+            "max_rows": self.max_rows,
+        }
+
+    def close(self):
+        """Shuts down the worker threads."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+inference_executor = InferenceExecutor()
+telemetry.register_gauge("meteomind_inference_queue_depth", "Predictions waiting or in flight.",
+                         lambda: inference_executor.stats()["queue_depth"])
+telemetry.register_gauge("meteomind_inference_avg_batch", "Average requests per batched predict call.",
+                         lambda: inference_executor.stats()["avg_batch"])
@@ -0,0 +1,182 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+import numpy as np
+from sqlalchemy.dialects.postgresql import insert
+from app.core.db import AsyncSessionLocal
+from app.models.weather import WeatherMeasurement
+
+logger = logging.getLogger(__name__)
+
+# asyncpg allows 32767 bind parameters per statement; five columns per row.
+INGEST_BATCH_ROWS = int(os.getenv("INGEST_BATCH_ROWS", "5000"))
+INGEST_FLUSH_ROWS = int(os.getenv("INGEST_FLUSH_ROWS", "500"))
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", "5"))
+# Open-Meteo reports every measurement to one decimal.
+MEASUREMENT_DECIMALS = 1
+
+async def insert_measurements(rows: list) -> int:
+    """
+    Inserts measurement rows in multi-row batches, skipping existing ``(city, timestamp)`` pairs.
+
+    Args:
+        rows (list): Dicts with the keys ``city``, ``timestamp``, ``temperature``,
+            ``humidity`` and ``wind_speed``.
+
+    Returns:
+        int: The number of rows actually inserted.
+    """
+    if not rows:
+        return 0
+    stmt = insert(WeatherMeasurement).on_conflict_do_nothing(index_elements=["city", "timestamp"])
+    inserted = 0
+    async with AsyncSessionLocal() as session:
+        for i in range(0, len(rows), INGEST_BATCH_ROWS):
+            result = await session.execute(stmt.values(rows[i:i + INGEST_BATCH_ROWS]))
+            inserted += max(result.rowcount, 0)
+        await session.commit()
+    return inserted
+
+def history_rows(city: str, df, until: float = None) -> list:
+    """
+    Converts a training DataFrame into measurement rows.
+
+    Hours after ``until`` are dropped, so forecast values returned alongside
+    the history are never stored as measurements. Hours with a missing value
+    are skipped because the measurement columns are not nullable. Values are
+    rounded to ``MEASUREMENT_DECIMALS`` so that widening the float32 columns
+    does not store artifacts such as 12.300000190734863.
+
+    Args:
+        city (str): The name of the city.
+        df (pd.DataFrame): Data as returned by ``fetch_historical_training_data``.
+        until (float): The latest Unix timestamp to keep; defaults to now.
+
+    Returns:
+        list: Rows for ``insert_measurements``.
+    """
+    if df is None or df.empty:
+        return []
+    until = time.time() if until is None else until
+    values = ["temperature", "humidity", "wind_speed"]
+    df = df[(df["timestamp"] <= until) & df[values].notna().all(axis=1)]
+    stamps = df["timestamp"].to_numpy(dtype=np.int64).astype("datetime64[s]").astype(object)
+    return [
+        {"city": city, "timestamp": ts, "temperature": t, "humidity": h, "wind_speed": w}
+        for ts, (t, h, w) in zip(stamps, df[values].to_numpy(dtype=np.float64).round(MEASUREMENT_DECIMALS).tolist())
+    ]
+
+def current_row(city: str, current: dict):
+    """
+    Converts a ``fetch_current_weather`` result into a measurement row.
+
+    Args:
+        city (str): The name of the city.
+        current (dict): The current weather.
+
+    Returns:
+        dict: The row, or None if the reading is incomplete.
+    """
+    keys = ("time", "temperature", "humidity", "wind_speed")
+    if not current or any(current.get(k) is None for k in keys):
+        return None
+    return {
+        "city": city,
+        "timestamp": datetime.fromisoformat(current["time"]).replace(tzinfo=None),
+        "temperature": current.get("temperature"),
+        "humidity": current.get("humidity"),
+        "wind_speed": current.get("wind_speed"),
+    }
+
+async def ingest_history(city: str, df) -> int:
+    """
+    Persists the observed part of a city's hourly history.
+
+    Args:
+        city (str): The name of the city.
+        df (pd.DataFrame): Data as returned by ``fetch_historical_training_data``.
+
+    Returns:
+        int: The number of new rows stored.
+    """
+    return await insert_measurements(history_rows(city, df))
+
+class MeasurementBuffer:
+    """
+    Write-behind buffer for single readings produced on the request path.
+
+    ``add`` only appends to memory. Rows are written with
+    ``insert_measurements`` once ``flush_rows`` are pending or every
+    ``flush_interval`` seconds, whichever comes first.
+    """
+
+    def __init__(self, flush_rows: int = INGEST_FLUSH_ROWS, flush_interval: float = INGEST_FLUSH_INTERVAL):
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._rows = []
+        self._task = None
+        self._flushing = None
+        self.flushed = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, row: dict):
+        """
+        Queues a row without waiting for the database.
+
+        Args:
+            row (dict): A measurement row; None is ignored.
+        """
+        if row is None:
+            return
+        self._rows.append(row)
+        if len(self._rows) >= self.flush_rows and (self._flushing is None or self._flushing.done()):
+            self._flushing = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self) -> int:
+        """
+        Writes all pending rows.
+
+        Returns:
+            int: The number of rows inserted. Rows of a failed write are dropped and counted.
+        """
+        rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+        try:
+            inserted = await insert_measurements(rows)
+        except Exception:
+            logger.exception("dropping %d buffered measurements", len(rows))
+            self.dropped += len(rows)
+            return 0
+        self.flushed += len(rows)
+        return inserted
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        """Starts the periodic flush on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stops the periodic flush and writes what is left."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flushing is not None:
+            await asyncio.gather(self._flushing, return_exceptions=True)
+        await self.flush()
+
+measurement_buffer = MeasurementBuffer()
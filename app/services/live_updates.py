@@ -0,0 +1,185 @@
+import os
+import json
+import asyncio
+import logging
+from collections import OrderedDict
+from app.core import telemetry
+from app.core.cache import get_redis, mark_redis_down
+
+logger = logging.getLogger(__name__)
+
+UPDATES_CHANNEL = os.getenv("UPDATES_CHANNEL", "forecast-updates")
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+LIVE_HEARTBEAT = float(os.getenv("LIVE_HEARTBEAT", "15"))
+
+class Subscriber:
+    """
+    A bounded, conflating queue of forecast updates for one client.
+
+    Only the newest pending update per city is kept, so a slow consumer
+    skips intermediate versions instead of falling behind. Past ``max_size``
+    pending cities the oldest one is dropped.
+
+    Attributes:
+        cities (set): The cities this client follows, or None for all.
+        dropped (int): Updates discarded because the queue was full.
+        conflated (int): Updates replaced by a newer one for the same city.
+    """
+
+    def __init__(self, cities=None, max_size: int = LIVE_QUEUE_SIZE):
+        self.cities = set(cities) if cities else None
+        self.max_size = max(1, max_size)
+        self._pending = OrderedDict()
+        self._ready = asyncio.Event()
+        self.dropped = 0
+        self.conflated = 0
+
+    def offer(self, city: str, body: str):
+        """Queues an update without blocking the publisher."""
+        if self.cities is not None and city not in self.cities:
+            return
+        if city in self._pending:
+            del self._pending[city]
+            self.conflated += 1
+        elif len(self._pending) >= self.max_size:
+            self._pending.popitem(last=False)
+            self.dropped += 1
+        self._pending[city] = body
+        self._ready.set()
+
+    async def get(self, timeout: float):
+        """
+        Waits for the next update.
+
+        Args:
+            timeout (float): Seconds to wait.
+
+        Returns:
+            tuple: ``(city, body)``, or None if nothing arrived in time.
+        """
+        if not self._pending:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._pending.popitem(last=False)
+
+class UpdateHub:
+    """
+    Fans forecast updates out to the clients connected to this process.
+
+    One Redis pub/sub subscription per process is shared by all clients and
+    is only held while at least one client is connected. Without Redis,
+    updates stored by this process are delivered locally.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._listener = None
+
+    def subscribe(self, cities=None) -> Subscriber:
+        """
+        Registers a client.
+
+        Args:
+            cities (list): Cities to receive updates for; empty for all.
+
+        Returns:
+            Subscriber: The client's queue; pass it to ``unsubscribe`` when done.
+        """
+        sub = Subscriber(cities)
+        self._subscribers.add(sub)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        """Removes a client; the Redis subscription ends with the last one."""
+        self._subscribers.discard(sub)
+
+    def dispatch(self, body: str):
+        """Hands one serialized payload to every interested client."""
+        if not self._subscribers:
+            return
+        try:
+            city = json.loads(body)["city"]
+        except (ValueError, KeyError, TypeError):
+            return
+        for sub in list(self._subscribers):
+            sub.offer(city, body)
+
+    def stats(self) -> dict:
+        """Returns the number of connected clients and their pending, dropped and conflated updates."""
+        subs = list(self._subscribers)
+        return {
+            "subscribers": len(subs),
+            "pending": sum(len(s._pending) for s in subs),
+            "dropped": sum(s.dropped for s in subs),
+            "conflated": sum(s.conflated for s in subs),
+        }
+
+    async def _listen(self):
+        """Relays Redis pub/sub messages while clients are connected, resubscribing after errors."""
+        while self._subscribers:
+            r = get_redis()
+            if r is None:
+                await asyncio.sleep(1)
+                continue
+            pubsub = r.pubsub()
+            try:
+                await pubsub.subscribe(UPDATES_CHANNEL)
+                while self._subscribers:
+                    msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if msg and msg.get("type") == "message":
+                        data = msg["data"]
+                        self.dispatch(data.decode() if isinstance(data, bytes) else data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                mark_redis_down(e)
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+hub = UpdateHub()
+telemetry.register_gauge(
+    "meteomind_live_subscribers", "Connected `/stream` clients.", lambda: hub.stats()["subscribers"])
+telemetry.register_gauge(
+    "meteomind_live_dropped", "Updates dropped for slow `/stream` clients.", lambda: hub.stats()["dropped"])
+
+async def _no_snapshot() -> list:
+    return []
+
+async def sse_stream(cities=None, snapshot=_no_snapshot, heartbeat: float = LIVE_HEARTBEAT):
+    """
+    Yields Server-Sent Events for a new subscriber until the client disconnects.
+
+    The client is subscribed when the stream starts and unsubscribed when it
+    ends, so a response that is never iterated holds no subscription. The
+    snapshot is loaded after subscribing, so no update falls in between.
+
+    Args:
+        cities (list): Cities to receive updates for; empty for all.
+        snapshot: An async callable returning payload bodies sent first, e.g. the cached forecasts.
+        heartbeat (float): Seconds of silence after which a comment line keeps the connection open.
+
+    Yields:
+        str: ``forecast`` events with the payload as data, or ``: keepalive`` comments.
+    """
+    sub = hub.subscribe(cities)
+    try:
+        yield "retry: 3000\n\n"
+        for body in await snapshot():
+            yield f"event: forecast\ndata: {body}\n\n"
+        while True:
+            item = await sub.get(heartbeat)
+            if item is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: forecast\ndata: {item[1]}\n\n"
+    finally:
+        hub.unsubscribe(sub)
@@ -1,19 +1,52 @@
 import os
-import time
 import json
-import pandas as pd
-from sqlalchemy import select
+import time
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+import numpy as np
+from sqlalchemy import Float, case, cast, extract, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.db import AsyncSessionLocal
-from app.models.weather import WeatherMeasurement
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_absolute_error, r2_score
-from sklearn.model_selection import train_test_split
-import joblib
+from app.models.weather import WeatherMeasurement, WeatherRollupHourly, WeatherRollupDaily
+from app.core import telemetry
+from app.services.model_registry import registry
+from app.services.forest_artifact import export_forest
+from app.services.training_engine import (
+    TRAIN_CPU_BUDGET,
+    estimator_params,
+    fit_and_evaluate,
+    plan_pool,
+    pool_executor,
+    resolve_engine,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
 
 MODELS_DIR = os.getenv("MODELS_DIR", "weather_models")
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "forest")
 os.makedirs(MODELS_DIR, exist_ok=True)
 CITY_MAP = {"Warsaw": 0, "Berlin": 1, "London": 2}
+FEATURES = ["timestamp", "hour", "humidity", "wind_speed"]
+GLOBAL_FEATURES = FEATURES + ["city_code"]
+TRAIN_WINDOW_DAYS = int(os.getenv("TRAIN_WINDOW_DAYS", "0"))
+TRAIN_MAX_ROWS = int(os.getenv("TRAIN_MAX_ROWS", "0"))
+TRAIN_CHUNK_ROWS = int(os.getenv("TRAIN_CHUNK_ROWS", "50000"))
+TRAIN_SOURCE = os.getenv("TRAIN_SOURCE", "raw")
+TRAINING_SOURCES = {"hourly": WeatherRollupHourly, "daily": WeatherRollupDaily}
+RETRAIN_INCREMENTAL = os.getenv("RETRAIN_INCREMENTAL", "1") not in ("0", "false", "no")
+RETRAIN_FULL_EVERY_HOURS = float(os.getenv("RETRAIN_FULL_EVERY_HOURS", "24"))
+RETRAIN_MIN_NEW_ROWS = int(os.getenv("RETRAIN_MIN_NEW_ROWS", "6"))
+RETRAIN_WARM_TREES = int(os.getenv("RETRAIN_WARM_TREES", "10"))
+RETRAIN_MAX_TREES = int(os.getenv("RETRAIN_MAX_TREES", "400"))
+# Engines whose ensembles can grow by fitting extra trees on new rows.
+WARM_START_ENGINES = ("random_forest", "extra_trees")
+RETRAINS = telemetry.registry.counter(
+    "meteomind_retrain_total", "Per-city model refreshes by outcome: skip, warm, full or failed.", ("outcome",))
 
 def _paths(city_slug: str):
     """
@@ -30,6 +63,58 @@ def _paths(city_slug: str):
         os.path.join(MODELS_DIR, f"{city_slug}.metrics.json"),
     )
 
+def _forest_path(city_slug: str) -> str:
+    """
+    Returns the path of a city's flattened forest artifact.
+
+    Args:
+        city_slug (str): The slug of the city.
+
+    Returns:
+        str: The ``.forest`` path next to the joblib model.
+    """
+    return os.path.join(MODELS_DIR, f"{city_slug}.forest")
+
+def _artifact_path(city_slug: str) -> str:
+    """
+    Returns the model artifact to serve predictions from.
+
+    Args:
+        city_slug (str): The slug of the city.
+
+    Returns:
+        str: The forest artifact if ``MODEL_FORMAT`` is ``forest`` and it exists,
+             otherwise the joblib model path.
+    """
+    forest_path = _forest_path(city_slug)
+    if MODEL_FORMAT == "forest" and os.path.exists(forest_path):
+        return forest_path
+    return _paths(city_slug)[0]
+
+def _save_model(model, city_slug: str, metrics: dict):
+    """
+    Writes a trained model, its forest export and its metrics.
+
+    The joblib pickle is always written. Tree ensembles are also exported as
+    a flat forest artifact; a stale one is removed for other estimators.
+
+    Args:
+        model: The fitted estimator.
+        city_slug (str): The slug of the city, or ``global``.
+        metrics (dict): The training metrics.
+    """
+    import joblib
+
+    model_path, metrics_path = _paths(city_slug)
+    forest_path = _forest_path(city_slug)
+    with open(metrics_path, "w") as f:
+        json.dump(metrics, f)
+    joblib.dump(model, model_path)
+    if not export_forest(model, forest_path) and os.path.exists(forest_path):
+        os.remove(forest_path)
+    registry.evict(model_path)
+    registry.evict(forest_path)
+
 def _slug(name: str) -> str:
     """
     Converts a city name to a URL-friendly slug.
@@ -42,55 +127,163 @@ def _slug(name: str) -> str:
     """
     return name.lower().replace(" ", "-")
 
+def _training_query(since=None, max_rows: int = 0, source: str = "raw"):
+    """
+    Builds the column-only query that feeds the global model.
+
+    Epoch seconds, hour and city code are computed in SQL, so every row is
+    purely numeric. Only known cities with a temperature are selected.
+
+    Args:
+        since (datetime): Only rows at or after this time, if given.
+        max_rows (int): Keep only the newest ``max_rows`` rows if positive.
+        source (str): ``raw`` for ``weather_measurements`` or ``hourly``/``daily``
+            for the rollup tables, which use the period averages.
+
+    Returns:
+        Select: The query, with columns in ``GLOBAL_FEATURES`` order followed by the temperature.
+    """
+    if source == "raw":
+        m = WeatherMeasurement
+        ts, humidity, wind, temp = m.timestamp, m.humidity, m.wind_speed, m.temperature
+    else:
+        m = TRAINING_SOURCES[source]
+        ts, humidity, wind, temp = m.bucket, m.humidity_avg, m.wind_speed_avg, m.temperature_avg
+    stmt = select(
+        cast(extract("epoch", ts), Float),
+        cast(extract("hour", ts), Float),
+        humidity,
+        wind,
+        case(CITY_MAP, value=m.city, else_=-1),
+        temp,
+    ).where(m.city.in_(list(CITY_MAP)), temp.is_not(None))
+    if since is not None:
+        stmt = stmt.where(ts >= since)
+    if max_rows > 0:
+        stmt = stmt.order_by(ts.desc()).limit(max_rows)
+    return stmt
+
+def _chunk_arrays(rows):
+    """
+    Converts one chunk of driver rows into feature and target arrays.
+
+    The features are float32, the dtype tree ensembles convert their input to
+    anyway, so no further copy is made during fitting.
+
+    Args:
+        rows: A list of numeric row tuples as produced by ``_training_query``.
+
+    Returns:
+        tuple: ``(X, y)`` with shapes ``(n, 5)`` and ``(n,)``.
+    """
+    block = np.array(rows, dtype=np.float64).reshape(-1, len(GLOBAL_FEATURES) + 1)
+    return block[:, :-1].astype(np.float32), block[:, -1].copy()
+
+def _arrays_from_chunks(chunks):
+    """
+    Concatenates converted chunks into one feature matrix and target vector.
+
+    Args:
+        chunks (list): ``(X, y)`` pairs as returned by ``_chunk_arrays``.
+
+    Returns:
+        tuple: ``(X, y)`` covering every row.
+    """
+    if not chunks:
+        return np.empty((0, len(GLOBAL_FEATURES)), dtype=np.float32), np.empty(0)
+    return np.concatenate([c[0] for c in chunks]), np.concatenate([c[1] for c in chunks])
+
+async def load_training_arrays(window_days: int = TRAIN_WINDOW_DAYS, max_rows: int = TRAIN_MAX_ROWS,
+                               chunk_rows: int = TRAIN_CHUNK_ROWS, source: str = TRAIN_SOURCE):
+    """
+    Streams the global training set from the database in chunks.
+
+    A server-side cursor is used, so ORM objects are never materialized and
+    at most ``chunk_rows`` driver rows are held at a time.
+
+    Args:
+        window_days (int): Only use the last ``window_days`` days if positive.
+        max_rows (int): Only use the newest ``max_rows`` rows if positive.
+        chunk_rows (int): The number of rows fetched per round trip.
+        source (str): ``raw``, ``hourly`` or ``daily``; see ``_training_query``.
+
+    Returns:
+        tuple: ``(X, y)`` as returned by ``_arrays_from_chunks``.
+    """
+    since = datetime.utcnow() - timedelta(days=window_days) if window_days > 0 else None
+    stmt = _training_query(since, max_rows, source).execution_options(yield_per=chunk_rows)
+    chunks = []
+    async with AsyncSessionLocal() as session:  # type: AsyncSession
+        result = await session.stream(stmt)
+        async for partition in result.partitions(chunk_rows):
+            chunks.append(_chunk_arrays(partition))
+    return _arrays_from_chunks(chunks)
+
+@telemetry.timed("train_global")
 async def train_model():
     """
     Trains a global machine learning model using weather data from the database.
 
-    The trained model and its metrics are saved to the file system.
+    The training window is bounded by ``TRAIN_WINDOW_DAYS`` and
+    ``TRAIN_MAX_ROWS``, and the estimator is chosen by ``TRAIN_ENGINE``. The
+    trained model and its metrics are saved to the file system.
 
     Returns:
         bool: True if the model was trained successfully, False otherwise.
     """
-    async with AsyncSessionLocal() as session:  # type: AsyncSession
-        result = await session.execute(select(WeatherMeasurement))
-        rows = result.scalars().all()
-    if not rows:
+    X_all, y_all = await load_training_arrays()
+    if len(X_all) < 10:
         return False
-    df = pd.DataFrame([
-        {
-            "timestamp": int(time.mktime(r.timestamp.timetuple())),
-            "hour": r.timestamp.hour,
-            "humidity": r.humidity,
-            "wind_speed": r.wind_speed,
-            "temperature": r.temperature,
-            "city_code": CITY_MAP.get(r.city, -1),
-        }
-        for r in rows
-        if r.temperature is not None and r.city in CITY_MAP
-    ])
-    if len(df) < 10:
-        return False
-    X = df[["timestamp", "hour", "humidity", "wind_speed", "city_code"]]
-    y = df["temperature"]
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    model = RandomForestRegressor(n_estimators=200, random_state=42)
-    model.fit(X_train, y_train)
-    preds = model.predict(X_test)
-    mae = mean_absolute_error(y_test, preds)
-    r2 = r2_score(y_test, preds)
-    metrics = {
-        "mae": round(mae, 4),
-        "r2": round(r2, 4),
-        "last_trained": time.strftime("%Y-%m-%d %H:%M:%S"),
-        "feature_importance": dict(zip(X.columns, model.feature_importances_)),
-        "features": list(X.columns),
-    }
-    model_path, metrics_path = _paths("global")
-    with open(metrics_path, "w") as f:
-        json.dump(metrics, f)
-    joblib.dump(model, model_path)
+    import pandas as pd
+
+    X = pd.DataFrame(X_all, columns=GLOBAL_FEATURES, copy=False)
+    model, metrics = fit_and_evaluate(X, y_all)
+    _save_model(model, "global", metrics)
     return True
 
+def _features(timestamps, humidity: float, wind_speed: float) -> "pd.DataFrame":
+    """
+    Builds the per-city feature matrix for a batch of timestamps.
+
+    The hour is taken in UTC, matching the training data which is fetched with
+    ``timezone=UTC``.
+
+    Args:
+        timestamps: A sequence of Unix timestamps.
+        humidity (float): The humidity value used for every row.
+        wind_speed (float): The wind speed value used for every row.
+
+    Returns:
+        pd.DataFrame: A DataFrame with the columns listed in ``FEATURES``.
+    """
+    import pandas as pd
+
+    ts = np.asarray(timestamps, dtype=np.int64)
+    return pd.DataFrame({
+        "timestamp": ts,
+        "hour": (ts // 3600) % 24,
+        "humidity": np.full(len(ts), humidity, dtype=float),
+        "wind_speed": np.full(len(ts), wind_speed, dtype=float),
+    }, columns=FEATURES)
+
+def _get_model(city: str):
+    """
+    Returns the cached model for a city.
+
+    Args:
+        city (str): The name of the city.
+
+    Returns:
+        The fitted model.
+
+    Raises:
+        FileNotFoundError: If a trained model for the city does not exist.
+    """
+    model, _ = registry.get(_artifact_path(_slug(city)), _paths(_slug(city))[1])
+    if model is None:
+        raise FileNotFoundError("Model not trained")
+    return model
+
 def predict_temp(timestamp: float, humidity: float, wind_speed: float, city: str) -> float:
     """
     Predicts the temperature for a given city at a specific time.
@@ -107,27 +300,103 @@ def predict_temp(timestamp: float, humidity: float, wind_speed: float, city: str
     Raises:
         FileNotFoundError: If a trained model for the city does not exist.
     """
-    slug = _slug(city)
-    model_path, _ = _paths(slug)
-    if not os.path.exists(model_path):
-        raise FileNotFoundError("Model not trained")
-    model = joblib.load(model_path)
-    dt_struct = time.localtime(timestamp)
-    hour = dt_struct.tm_hour
-    X = pd.DataFrame([[timestamp, hour, humidity, wind_speed]], columns=["timestamp", "hour", "humidity", "wind_speed"])
+    model = _get_model(city)
     try:
-        pred = model.predict(X)[0]
+        pred = model.predict(_features([timestamp], humidity, wind_speed))[0]
     except ValueError:
         return None
     return float(pred)
 
-def train_model_for_city(city_name: str, df: pd.DataFrame):
+def predict_horizon(city: str, start_ts: int, hours: int, humidity: float, wind_speed: float) -> list:
+    """
+    Predicts hourly temperatures for the next ``hours`` hours in one model call.
+
+    Args:
+        city (str): The name of the city.
+        start_ts (int): The Unix timestamp the horizon starts from.
+        hours (int): The number of hourly steps to predict.
+        humidity (float): The humidity value.
+        wind_speed (float): The wind speed value.
+
+    Returns:
+        list: One dict per hour with the keys ``timestamp``, ``hour`` and
+              ``temperature``. Temperatures are None if prediction fails.
+
+    Raises:
+        FileNotFoundError: If a trained model for the city does not exist.
+    """
+    return predict_horizons(city, [(start_ts, hours, humidity, wind_speed)])[0]
+
+@telemetry.timed("predict")
+def predict_horizons(city: str, requests: list) -> list:
+    """
+    Predicts several horizons for one city with a single model call.
+
+    Args:
+        city (str): The name of the city.
+        requests (list): ``(start_ts, hours, humidity, wind_speed)`` tuples.
+
+    Returns:
+        list: One ``predict_horizon`` result per request, in order.
+
+    Raises:
+        FileNotFoundError: If a trained model for the city does not exist.
+    """
+    model = _get_model(city)
+    parts = []
+    for start_ts, hours, humidity, wind_speed in requests:
+        steps = np.arange(1, hours + 1)
+        parts.append((steps, int(start_ts) + steps * 3600, humidity, wind_speed))
+    import pandas as pd
+
+    X = pd.concat([_features(ts, hum, wind) for _, ts, hum, wind in parts], ignore_index=True)
+    try:
+        temps = [float(y) for y in model.predict(X)]
+    except ValueError:
+        temps = [None] * len(X)
+    results, offset = [], 0
+    for steps, timestamps, _, _ in parts:
+        chunk = temps[offset:offset + len(steps)]
+        offset += len(steps)
+        results.append([
+            {"timestamp": int(ts), "hour": int(h), "temperature": y}
+            for ts, h, y in zip(timestamps, steps, chunk)
+        ])
+    return results
+
+def _read_metrics(city_slug: str):
+    """Returns the stored training metrics of a model, or None."""
+    path = _paths(city_slug)[1]
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+def _data_stamp(df: "pd.DataFrame", engine: str, params: dict) -> dict:
+    """
+    Fingerprints a training set together with the engine fitting it.
+
+    Returns:
+        dict: The ``fingerprint``, the newest trained hour as ``trained_until``
+              and the requested ``engine_params``, to be stored with the metrics.
+    """
+    h = hashlib.blake2b(json.dumps([engine, params], sort_keys=True).encode(), digest_size=16)
+    for column in [*FEATURES, "temperature"]:
+        h.update(np.ascontiguousarray(df[column].to_numpy()).tobytes())
+    return {"fingerprint": h.hexdigest(), "trained_until": int(df["timestamp"].max()), "engine_params": params}
+
+@telemetry.timed("train")
+def train_model_for_city(city_name: str, df: "pd.DataFrame", engine: str = None, params: dict = None,
+                         n_jobs: int = -1):
     """
     Trains a machine learning model for a specific city.
 
     Args:
         city_name (str): The name of the city.
         df (pd.DataFrame): A DataFrame containing historical weather data for the city.
+        engine (str): The training engine; defaults to ``TRAIN_ENGINE``.
+        params (dict): Hyperparameter overrides for the engine.
+        n_jobs (int): Cores used by the fit; -1 for all.
 
     Returns:
         bool: True if the model was trained successfully, False otherwise.
@@ -136,32 +405,161 @@ def train_model_for_city(city_name: str, df: pd.DataFrame):
         return False
     if len(df) < 10:
         return False
-    X = df[["timestamp", "hour", "humidity", "wind_speed"]]
-    y = df["temperature"]
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    model = RandomForestRegressor(n_estimators=200, random_state=42)
-    model.fit(X_train, y_train)
-    preds = model.predict(X_test)
-    mae = mean_absolute_error(y_test, preds)
-    r2 = r2_score(y_test, preds)
+    engine, params = resolve_engine(engine, params)
+    model, metrics = fit_and_evaluate(df[FEATURES], df["temperature"], engine, params, n_jobs)
+    metrics.update(_data_stamp(df, engine, params), mode="full", full_fit_at=time.time())
+    _save_model(model, _slug(city_name), metrics)
+    return True
+
+def plan_retrain(city_name: str, df: "pd.DataFrame", engine: str = None, params: dict = None,
+                 now: float = None) -> str:
+    """
+    Decides how to bring a city's model up to date with a training set.
+
+    Args:
+        city_name (str): The name of the city.
+        df (pd.DataFrame): The training set.
+        engine (str): The training engine; defaults to ``TRAIN_ENGINE``.
+        params (dict): Hyperparameter overrides for the engine.
+        now (float): The current Unix time.
+
+    Returns:
+        str: ``full`` if there is no model or the last full fit is older than
+             ``RETRAIN_FULL_EVERY_HOURS``; otherwise ``skip`` if the
+             fingerprint matches the trained model or fewer than
+             ``RETRAIN_MIN_NEW_ROWS`` new hours arrived, whatever the engine;
+             ``full`` if the engine cannot warm-start, incremental training is
+             off, the engine or its parameters changed or the forest would
+             exceed ``RETRAIN_MAX_TREES``; ``warm`` otherwise.
+    """
+    engine, params = resolve_engine(engine, params)
+    slug = _slug(city_name)
+    previous = _read_metrics(slug)
+    if previous is None or not os.path.exists(_paths(slug)[0]):
+        return "full"
+    now = time.time() if now is None else now
+    if now - previous.get("full_fit_at", 0) >= RETRAIN_FULL_EVERY_HOURS * 3600:
+        return "full"
+    if previous.get("fingerprint") == _data_stamp(df, engine, params)["fingerprint"]:
+        return "skip"
+    if int((df["timestamp"] > previous.get("trained_until", 0)).sum()) < RETRAIN_MIN_NEW_ROWS:
+        return "skip"
+    if (
+        not RETRAIN_INCREMENTAL
+        or engine not in WARM_START_ENGINES
+        or previous.get("engine") != engine
+        or previous.get("engine_params") != params
+        or previous.get("params", {}).get("n_estimators", 0) + RETRAIN_WARM_TREES > RETRAIN_MAX_TREES
+    ):
+        return "full"
+    return "warm"
+
+@telemetry.timed("train_warm")
+def warm_start_model_for_city(city_name: str, df: "pd.DataFrame", engine: str = None, params: dict = None,
+                              n_jobs: int = -1) -> bool:
+    """
+    Grows a city's forest by ``RETRAIN_WARM_TREES`` trees fitted on the hours it has not seen.
+
+    The new hours are unseen by the current model, so MAE and R² are measured
+    on them before they are learned.
+
+    Args:
+        city_name (str): The name of the city.
+        df (pd.DataFrame): The training set; only hours after the model's ``trained_until`` are used.
+        engine (str): The training engine; defaults to ``TRAIN_ENGINE``.
+        params (dict): Hyperparameter overrides for the engine.
+        n_jobs (int): Cores used by the fit; -1 for all.
+
+    Returns:
+        bool: True if the model was updated, False otherwise.
+    """
+    import joblib
+    from sklearn.metrics import mean_absolute_error, r2_score
+
+    engine, params = resolve_engine(engine, params)
+    slug = _slug(city_name)
+    previous = _read_metrics(slug)
+    new = df[df["timestamp"] > previous["trained_until"]]
+    if len(new) < 2:
+        return False
+    model = joblib.load(_paths(slug)[0])
+    X, y = new[FEATURES], new["temperature"]
+    preds = model.predict(X)
+    t0 = time.perf_counter()
+    model.set_params(warm_start=True, n_estimators=model.n_estimators + RETRAIN_WARM_TREES, n_jobs=n_jobs)
+    model.fit(X, y)
+    model.set_params(warm_start=False)
     metrics = {
-        "mae": round(mae, 4),
-        "r2": round(r2, 4),
+        **previous,
+        "mae": round(mean_absolute_error(y, preds), 4),
+        "r2": round(r2_score(y, preds), 4),
         "last_trained": time.strftime("%Y-%m-%d %H:%M:%S"),
-        "feature_importance": dict(zip(X.columns, model.feature_importances_)),
-        "features": list(X.columns),
+        "feature_importance": dict(zip(FEATURES, model.feature_importances_)),
+        "params": estimator_params(model),
+        "fit_seconds": round(time.perf_counter() - t0, 4),
+        "rows": len(new),
+        "mode": "warm",
+        **_data_stamp(df, engine, params),
     }
-    slug = _slug(city_name)
-    model_path, metrics_path = _paths(slug)
-    with open(metrics_path, "w") as f:
-        json.dump(metrics, f)
-    joblib.dump(model, model_path)
+    _save_model(model, slug, metrics)
     return True
 
+def train_cities(frames: dict, engine: str = None, params: dict = None, cpu_budget: int = TRAIN_CPU_BUDGET,
+                 incremental: bool = False) -> dict:
+    """
+    Trains per-city models concurrently within a CPU budget.
+
+    The budget is split between concurrent fits so that the number of fits
+    times the cores per fit never exceeds it. See ``pool_executor`` for how
+    the fits are run. In incremental mode each city is first planned with
+    ``plan_retrain``: unchanged cities are skipped without starting a fit and
+    the others are warm-started or fully refit.
+
+    Args:
+        frames (dict): Historical DataFrames keyed by city name.
+        engine (str): The training engine; defaults to ``TRAIN_ENGINE``.
+        params (dict): Hyperparameter overrides for the engine.
+        cpu_budget (int): The total number of cores to use.
+        incremental (bool): Skip or warm-start where possible instead of always refitting.
+
+    Returns:
+        dict: Whether each city has a model for its data, keyed by city name.
+    """
+    results = {city: False for city, df in frames.items() if df is None or len(df) < 10}
+    frames = {city: df for city, df in frames.items() if city not in results}
+    modes = {city: plan_retrain(city, df, engine, params) if incremental else "full" for city, df in frames.items()}
+    for city in [c for c, mode in modes.items() if mode == "skip"]:
+        RETRAINS.inc("skip")
+        results[city] = True
+        del frames[city]
+    if not frames:
+        return results
+    workers, n_jobs = plan_pool(len(frames), cpu_budget)
+    with pool_executor(workers) as pool:
+        futures = {
+            city: pool.submit(
+                warm_start_model_for_city if modes[city] == "warm" else train_model_for_city,
+                city, df, engine, params, n_jobs,
+            )
+            for city, df in frames.items()
+        }
+        for city, future in futures.items():
+            try:
+                results[city] = future.result()
+            except Exception:
+                logger.exception("training failed for %s", city)
+                results[city] = False
+            RETRAINS.inc(modes[city] if results[city] else "failed")
+    return results
+
 def load_model_for_city(city_name: str):
     """
     Loads a trained machine learning model and its metrics for a specific city.
 
+    Models are served from the in-process registry and only read from disk
+    when the artifact changed since it was last loaded. The memory-mapped
+    forest artifact is preferred over the joblib pickle when present.
+
     Args:
         city_name (str): The name of the city.
 
@@ -170,12 +568,4 @@ def load_model_for_city(city_name: str):
                if the model is not found.
     """
     slug = _slug(city_name)
-    model_path, metrics_path = _paths(slug)
-    if not os.path.exists(model_path):
-        return None, None
-    model = joblib.load(model_path)
-    metrics = None
-    if os.path.exists(metrics_path):
-        with open(metrics_path, "r") as f:
-            metrics = json.load(f)
-    return model, metrics
+    return registry.get(_artifact_path(slug), _paths(slug)[1])
@@ -0,0 +1,105 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+from app.core import telemetry
+from app.services.forest_artifact import load_forest
+
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "16"))
+
+class ModelRegistry:
+    """
+    In-process cache of trained models keyed by artifact path.
+
+    Entries are evicted least-recently-used once more than ``max_size`` models
+    are held. Each lookup stats the artifact, and a model is reloaded from disk
+    only when the artifact's mtime or size changed since it was cached.
+    """
+
+    def __init__(self, max_size: int = MODEL_CACHE_SIZE):
+        self.max_size = max(1, max_size)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _version(path: str):
+        """
+        Returns the version signature of an artifact on disk.
+
+        Args:
+            path (str): The artifact path.
+
+        Returns:
+            tuple: ``(mtime_ns, size)``, or None if the file does not exist.
+        """
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def get(self, model_path: str, metrics_path: str):
+        """
+        Returns the cached model and metrics, loading them if needed.
+
+        Args:
+            model_path (str): Path to the model artifact, a ``.forest`` file or a joblib pickle.
+            metrics_path (str): Path to the metrics JSON file.
+
+        Returns:
+            tuple: A tuple containing the model and its metrics, or (None, None)
+                   if the model artifact does not exist.
+        """
+        version = self._version(model_path)
+        if version is None:
+            self.evict(model_path)
+            return None, None
+        with self._lock:
+            entry = self._entries.get(model_path)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(model_path)
+                self.hits += 1
+                return entry[1], entry[2]
+        self.misses += 1
+        with telemetry.STAGE_SECONDS.time("model_load"):
+            if model_path.endswith(".forest"):
+                model = load_forest(model_path)
+            else:
+                import joblib
+                model = joblib.load(model_path)
+        metrics = None
+        if os.path.exists(metrics_path):
+            with open(metrics_path, "r") as f:
+                metrics = json.load(f)
+        with self._lock:
+            self._entries[model_path] = (version, model, metrics)
+            self._entries.move_to_end(model_path)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return model, metrics
+
+    def evict(self, model_path: str):
+        """Drops a cached model, e.g. after its artifact was removed or rewritten."""
+        with self._lock:
+            self._entries.pop(model_path, None)
+
+    def clear(self):
+        """Drops every cached model."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns cache statistics.
+
+        Returns:
+            dict: The number of cached models, the size bound and hit/miss counts.
+        """
+        with self._lock:
+            size = len(self._entries)
+        return {"size": size, "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+registry = ModelRegistry()
+telemetry.register_cache("model_registry", lambda: (registry.hits, registry.misses, len(registry._entries)))
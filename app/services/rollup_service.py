@@ -0,0 +1,162 @@
+import os
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import insert
+from app.core.db import AsyncSessionLocal
+from app.models.weather import WeatherMeasurement, WeatherRollupHourly, WeatherRollupDaily, RollupState
+
+logger = logging.getLogger(__name__)
+
+RAW_RETENTION_DAYS = int(os.getenv("RAW_RETENTION_DAYS", "0"))
+ROLLUP_BATCH_IDS = int(os.getenv("ROLLUP_BATCH_IDS", "500000"))
+# Ids below the high-water mark re-scanned on every refresh. Concurrent writers commit out of id
+# order, so a row can become visible after a higher id was already rolled up.
+ROLLUP_LAG_IDS = int(os.getenv("ROLLUP_LAG_IDS", "50000"))
+ROLLUPS = {
+    "hourly": (WeatherRollupHourly, "hour"),
+    "daily": (WeatherRollupDaily, "day"),
+}
+
+def _rollup_sql(resolution: str):
+    """
+    Builds the statement that re-aggregates every bucket touched by new raw rows.
+
+    Buckets are found from measurements with ``:low < id <= :high`` and are
+    recomputed from all of their raw rows, so late-arriving data is merged
+    correctly. Existing buckets older than ``:horizon`` are left alone: their
+    raw rows may already be purged, so re-aggregating them would overwrite
+    the rollup with partial counts.
+
+    Args:
+        resolution (str): A key of ``ROLLUPS``.
+
+    Returns:
+        TextClause: The upsert statement.
+    """
+    model, unit = ROLLUPS[resolution]
+    raw = WeatherMeasurement.__tablename__
+    return text(f"""
+        WITH touched AS (
+            SELECT DISTINCT city, date_trunc('{unit}', timestamp) AS bucket
+            FROM {raw} WHERE id > :low AND id <= :high
+        )
+        INSERT INTO {model.__tablename__} (
+            city, bucket, samples, temperature_avg, temperature_min, temperature_max, humidity_avg, wind_speed_avg
+        )
+        SELECT m.city, t.bucket, count(*), avg(m.temperature), min(m.temperature), max(m.temperature),
+               avg(m.humidity), avg(m.wind_speed)
+        FROM touched t
+        JOIN {raw} m ON m.city = t.city
+            AND m.timestamp >= t.bucket AND m.timestamp < t.bucket + interval '1 {unit}'
+        GROUP BY m.city, t.bucket
+        ON CONFLICT (city, bucket) DO UPDATE SET
+            samples = excluded.samples,
+            temperature_avg = excluded.temperature_avg,
+            temperature_min = excluded.temperature_min,
+            temperature_max = excluded.temperature_max,
+            humidity_avg = excluded.humidity_avg,
+            wind_speed_avg = excluded.wind_speed_avg
+        WHERE excluded.bucket >= :horizon
+    """)
+
+def purge_horizon(retention_days: int = RAW_RETENTION_DAYS) -> datetime:
+    """
+    Returns the start of the oldest day whose raw measurements are kept.
+
+    The horizon is aligned to day buckets so that purging never leaves a
+    partial hourly or daily bucket behind. Without retention it is
+    ``datetime.min``.
+    """
+    if retention_days <= 0:
+        return datetime.min
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    return cutoff.replace(hour=0, minute=0, second=0, microsecond=0)
+
+async def refresh_rollup(resolution: str) -> int:
+    """
+    Incrementally brings one rollup table up to date.
+
+    Measurement ids past the stored high-water mark, less ``ROLLUP_LAG_IDS``,
+    are processed in ranges of ``ROLLUP_BATCH_IDS``; the mark advances after
+    each committed range. Re-scanning the lag window picks up rows whose
+    transaction committed after a higher id was rolled up.
+
+    Args:
+        resolution (str): ``hourly`` or ``daily``.
+
+    Returns:
+        int: The number of buckets written.
+    """
+    sql = _rollup_sql(resolution)
+    horizon = purge_horizon()
+    written = 0
+    async with AsyncSessionLocal() as session:
+        state = await session.get(RollupState, resolution)
+        mark = state.last_id if state else 0
+        low = max(mark - ROLLUP_LAG_IDS, 0)
+        top = (await session.execute(select(func.max(WeatherMeasurement.id)))).scalar() or 0
+        while low < top:
+            high = min(low + ROLLUP_BATCH_IDS, top)
+            result = await session.execute(sql, {"low": low, "high": high, "horizon": horizon})
+            written += max(result.rowcount, 0)
+            mark = max(mark, high)
+            await session.execute(
+                insert(RollupState)
+                .values(name=resolution, last_id=mark, updated_at=datetime.utcnow())
+                .on_conflict_do_update(index_elements=["name"], set_={"last_id": mark, "updated_at": datetime.utcnow()})
+            )
+            await session.commit()
+            low = high
+    return written
+
+async def refresh_rollups() -> dict:
+    """
+    Refreshes every rollup table.
+
+    Returns:
+        dict: The number of buckets written per resolution.
+    """
+    return {resolution: await refresh_rollup(resolution) for resolution in ROLLUPS}
+
+def _purge_statement(horizon: datetime, safe_id: int):
+    """
+    Builds the delete of whole day buckets older than ``horizon``.
+
+    A ``(city, day)`` bucket is deleted only if none of its rows is newer
+    than ``safe_id``, i.e. possibly not rolled up yet.
+    """
+    m, n = WeatherMeasurement, aliased(WeatherMeasurement)
+    day = func.date_trunc("day", m.timestamp)
+    unrolled = select(n.id).where(
+        n.city == m.city, n.timestamp >= day, n.timestamp < day + timedelta(days=1), n.id > safe_id,
+    )
+    return delete(m).where(m.timestamp < horizon, ~unrolled.exists())
+
+async def purge_raw_measurements(retention_days: int = RAW_RETENTION_DAYS) -> int:
+    """
+    Deletes raw measurements of the days older than the retention window.
+
+    Only whole day buckets whose rows every rollup has already aggregated,
+    below the high-water marks less ``ROLLUP_LAG_IDS``, are removed, so the
+    rollups keep the full history. A non-positive window disables purging.
+
+    Args:
+        retention_days (int): The number of days of raw data to keep.
+
+    Returns:
+        int: The number of deleted rows.
+    """
+    if retention_days <= 0:
+        return 0
+    async with AsyncSessionLocal() as session:
+        states = (await session.execute(select(RollupState).where(RollupState.name.in_(list(ROLLUPS))))).scalars().all()
+        if len(states) < len(ROLLUPS):
+            return 0
+        safe_id = min(s.last_id for s in states) - ROLLUP_LAG_IDS
+        horizon = purge_horizon(retention_days)
+        result = await session.execute(_purge_statement(horizon, safe_id))
+        await session.commit()
+    logger.info("purged %d raw measurements older than %s", result.rowcount, horizon)
+    return result.rowcount
@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+TRAIN_ENGINE = os.getenv("TRAIN_ENGINE", "random_forest")
+TRAIN_ENGINE_PARAMS = json.loads(os.getenv("TRAIN_ENGINE_PARAMS", "{}"))
+TRAIN_CPU_BUDGET = int(os.getenv("TRAIN_CPU_BUDGET", str(os.cpu_count() or 1)))
+
+# Estimators are named rather than imported so scikit-learn only loads when a model is trained.
+ENGINES = {
+    "random_forest": ("RandomForestRegressor", {"n_estimators": 200, "random_state": 42}),
+    "extra_trees": ("ExtraTreesRegressor", {"n_estimators": 200, "random_state": 42}),
+    "hist_gradient_boosting": (
+        "HistGradientBoostingRegressor",
+        {"max_iter": 300, "learning_rate": 0.1, "early_stopping": False, "random_state": 42},
+    ),
+}
+
+def resolve_engine(engine: str = None, params: dict = None) -> tuple:
+    """
+    Applies the configured defaults to an engine choice.
+
+    Args:
+        engine (str): A key of ``ENGINES``; defaults to ``TRAIN_ENGINE``.
+        params (dict): Hyperparameter overrides; defaults to ``TRAIN_ENGINE_PARAMS``
+            for the configured engine.
+
+    Returns:
+        tuple: ``(engine, params)``.
+
+    Raises:
+        ValueError: If the engine is unknown.
+    """
+    engine = engine or TRAIN_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"unknown training engine {engine!r}, expected one of {sorted(ENGINES)}")
+    if params is None:
+        params = TRAIN_ENGINE_PARAMS if engine == TRAIN_ENGINE else {}
+    return engine, params
+
+def build_estimator(engine: str = None, params: dict = None, n_jobs: int = -1):
+    """
+    Creates an unfitted estimator for a training engine.
+
+    Args:
+        engine (str): A key of ``ENGINES``; defaults to ``TRAIN_ENGINE``.
+        params (dict): Hyperparameters overriding the engine defaults;
+            defaults to ``TRAIN_ENGINE_PARAMS`` for the configured engine.
+        n_jobs (int): Cores used by one fit for estimators that take ``n_jobs``.
+
+    Returns:
+        The estimator.
+
+    Raises:
+        ValueError: If the engine is unknown.
+    """
+    engine, params = resolve_engine(engine, params)
+    from sklearn import ensemble
+
+    name, defaults = ENGINES[engine]
+    cls = getattr(ensemble, name)
+    kwargs = {**defaults, **params}
+    if "n_jobs" in cls().get_params():
+        kwargs.setdefault("n_jobs", n_jobs)
+    return cls(**kwargs)
+
+def estimator_params(model) -> dict:
+    """Returns the scalar hyperparameters of an estimator, for the training metrics."""
+    return {k: v for k, v in model.get_params().items() if isinstance(v, (int, float, str, bool, type(None)))}
+
+def fit_and_evaluate(X, y, engine: str = None, params: dict = None, n_jobs: int = -1):
+    """
+    Fits an engine on a train split and scores it on a held-out 20%.
+
+    Args:
+        X (pd.DataFrame): The features.
+        y: The target.
+        engine (str): A key of ``ENGINES``; defaults to ``TRAIN_ENGINE``.
+        params (dict): Hyperparameter overrides.
+        n_jobs (int): Cores used by the fit; -1 for all. OpenMP-based engines
+            are limited through threadpoolctl.
+
+    Returns:
+        tuple: The fitted model and its metrics, including the engine, its
+               parameters and the fit time.
+    """
+    from sklearn.metrics import mean_absolute_error, r2_score
+    from sklearn.model_selection import train_test_split
+    from threadpoolctl import threadpool_limits
+
+    engine = engine or TRAIN_ENGINE
+    model = build_estimator(engine, params, n_jobs)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    t0 = time.perf_counter()
+    with threadpool_limits(limits=n_jobs if n_jobs > 0 else None, user_api="openmp"):
+        model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - t0
+    preds = model.predict(X_test)
+    importances = getattr(model, "feature_importances_", None)
+    metrics = {
+        "mae": round(mean_absolute_error(y_test, preds), 4),
+        "r2": round(r2_score(y_test, preds), 4),
+        "last_trained": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "feature_importance": dict(zip(X.columns, importances)) if importances is not None else {},
+        "features": list(X.columns),
+        "engine": engine,
+        "params": estimator_params(model),
+        "fit_seconds": round(fit_seconds, 4),
+        "rows": len(X),
+    }
+    return model, metrics
+
+def compare_engines(X, y, engines=None, n_jobs: int = -1) -> list:
+    """
+    Fits and scores several engines on the same data.
+
+    Args:
+        X (pd.DataFrame): The features.
+        y: The target.
+        engines (list): Engine names; defaults to all of ``ENGINES``.
+        n_jobs (int): Cores used per fit.
+
+    Returns:
+        list: One dict per engine with its MAE, R², fit time and parameters.
+    """
+    report = []
+    for engine in engines or list(ENGINES):
+        _, metrics = fit_and_evaluate(X, y, engine, {}, n_jobs)
+        report.append({k: metrics[k] for k in ("engine", "mae", "r2", "fit_seconds", "rows", "params")})
+    return report
+
+def plan_pool(tasks: int, cpu_budget: int = TRAIN_CPU_BUDGET) -> tuple:
+    """
+    Splits a CPU budget between concurrent fits.
+
+    Args:
+        tasks (int): The number of models to train.
+        cpu_budget (int): The total number of cores to use.
+
+    Returns:
+        tuple: ``(workers, n_jobs)`` with ``workers * n_jobs <= cpu_budget``.
+    """
+    cpu_budget = max(1, cpu_budget)
+    workers = max(1, min(tasks, cpu_budget))
+    return workers, max(1, cpu_budget // workers)
+
+def pool_executor(workers: int):
+    """
+    Returns an executor for concurrent fits.
+
+    A process pool is used where possible. Daemonic processes, such as Celery
+    prefork children, cannot start children of their own, so they get a
+    thread pool; tree fitting releases the GIL, so threads still run fits
+    in parallel.
+
+    Pool processes are spawned rather than forked: the API process runs
+    other threads (inference, registry) and forking it could copy a lock
+    held by one of them into a child, which would then deadlock. Spawned
+    children import the app afresh and read their configuration from the
+    environment.
+
+    Args:
+        workers (int): The number of concurrent fits.
+
+    Returns:
+        concurrent.futures.Executor: The executor.
+    """
+    if multiprocessing.current_process().daemon:
+        return ThreadPoolExecutor(max_workers=workers)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from app.core import tasks, telemetry
+from app.core.cache import LRUCache, get_redis, mark_redis_down
+from app.services import history_store
+from app.services.ml_service import _slug, train_model_for_city
+from app.services.training_engine import pool_executor
+
+logger = logging.getLogger(__name__)
+
+TRAIN_JOB_BACKEND = os.getenv("TRAIN_JOB_BACKEND", "local")
+TRAIN_JOB_WORKERS = int(os.getenv("TRAIN_JOB_WORKERS", "2"))
+TRAIN_LOCK_TTL = int(os.getenv("TRAIN_LOCK_TTL", "900"))
+JOB_TTL = int(os.getenv("JOB_TTL", "3600"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.2"))
+TERMINAL_STATES = ("succeeded", "failed")
+# Deletes the lock only if it still belongs to the releasing job.
+RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+_jobs = LRUCache(4096)
+_locks = {}
+_tasks = set()
+_pool = None
+
+def job_key(job_id: str) -> str:
+    """Returns the Redis key of a job record."""
+    return f"job:{job_id}"
+
+def lock_key(city: str) -> str:
+    """Returns the Redis key of a city's training lock."""
+    return f"train-lock:{_slug(city)}"
+
+async def save_job(job: dict, **changes) -> dict:
+    """
+    Updates and stores a job record in process and, if available, in Redis.
+
+    Args:
+        job (dict): The job record.
+        **changes: Fields to update, e.g. ``status`` or ``error``.
+
+    Returns:
+        dict: The updated record.
+    """
+    job.update(changes, updated_at=time.time())
+    _jobs.set(job["id"], dict(job), JOB_TTL)
+    r = get_redis()
+    if r is not None:
+        try:
+            await r.set(job_key(job["id"]), json.dumps(job), ex=JOB_TTL)
+        except Exception as e:
+            mark_redis_down(e)
+    return job
+
+async def _discard_job(job_id: str):
+    """Deletes the record of a job that never started."""
+    _jobs.delete(job_id)
+    r = get_redis()
+    if r is not None:
+        try:
+            await r.delete(job_key(job_id))
+        except Exception as e:
+            mark_redis_down(e)
+
+async def get_job(job_id: str):
+    """
+    Returns a job record.
+
+    Redis is authoritative because jobs may run on other nodes; the in-process
+    copy is used when Redis is unavailable.
+
+    Args:
+        job_id (str): The job id.
+
+    Returns:
+        dict: The record, or None if the job is unknown or expired.
+    """
+    r = get_redis()
+    if r is not None:
+        try:
+            raw = await r.get(job_key(job_id))
+        except Exception as e:
+            mark_redis_down(e)
+            raw = None
+        if raw:
+            return json.loads(raw)
+    return _jobs.get(job_id)
+
+async def _acquire(city: str, job_id: str):
+    """
+    Takes a city's training lock for a job.
+
+    If the Redis lock expires between a failed ``SET NX`` and reading its
+    holder, the ``SET NX`` is retried, so the lock is never assumed without
+    owning the key.
+
+    Returns:
+        str: None if acquired, otherwise the id of the job holding the lock.
+    """
+    slug = _slug(city)
+    holder = _locks.get(slug)
+    if holder is not None:
+        return holder
+    r = get_redis()
+    if r is not None:
+        try:
+            while not await r.set(lock_key(city), job_id, nx=True, ex=TRAIN_LOCK_TTL):
+                holder = await r.get(lock_key(city))
+                if holder:
+                    return holder.decode()
+        except Exception as e:
+            mark_redis_down(e)
+    _locks[slug] = job_id
+    return None
+
+async def release_lock(city: str, job_id: str):
+    """Releases a city's training lock if it is still held by ``job_id``."""
+    slug = _slug(city)
+    if _locks.get(slug) == job_id:
+        del _locks[slug]
+    r = get_redis()
+    if r is not None:
+        try:
+            await r.eval(RELEASE_SCRIPT, 1, lock_key(city), job_id)
+        except Exception as e:
+            mark_redis_down(e)
+
+async def run_job(job: dict, lat: float, lon: float, fit):
+    """
+    Fetches a city's history, trains its model and records the outcome.
+
+    The city lock is released when the job ends, whatever the outcome.
+
+    Args:
+        job (dict): The job record.
+        lat (float): The city's latitude.
+        lon (float): The city's longitude.
+        fit: An async callable ``fit(city, df) -> bool`` that runs the fit off the event loop.
+
+    Returns:
+        dict: The final job record.
+    """
+    city = job["city"]
+    try:
+        await save_job(job, status="running")
+        df = await history_store.load_history(city, lat, lon)
+        if df is None or df.empty:
+            return await save_job(job, status="failed", error="history unavailable")
+        if not await fit(city, df):
+            return await save_job(job, status="failed", error="training failed")
+        return await save_job(job, status="succeeded")
+    except Exception as e:
+        logger.exception("training job %s for %s failed", job["id"], city)
+        return await save_job(job, status="failed", error=str(e))
+    finally:
+        await release_lock(city, job["id"])
+
+def _timed_fit(city: str, df) -> tuple:
+    """Trains a city's model and returns the outcome with the fit duration in seconds."""
+    t0 = time.perf_counter()
+    ok = train_model_for_city(city, df)
+    return ok, time.perf_counter() - t0
+
+async def _fit_in_pool(city: str, df) -> bool:
+    """
+    Runs a fit in the local training pool.
+
+    Stage timings recorded in a pool process never reach this process's
+    metrics, so the ``train`` duration is returned and recorded here.
+    """
+    global _pool
+    if _pool is None:
+        _pool = pool_executor(TRAIN_JOB_WORKERS)
+    ok, seconds = await asyncio.get_running_loop().run_in_executor(_pool, _timed_fit, city, df)
+    if isinstance(_pool, ProcessPoolExecutor):
+        telemetry.STAGE_SECONDS.observe(seconds, "train")
+    return ok
+
+def _dispatch_celery(job: dict, coords: dict):
+    """Queues a job on the Celery worker by task name, keeping the worker out of the API import graph."""
+    tasks.send_task("app.worker.train_city_task", [job["id"], job["city"], coords["lat"], coords["lon"]])
+
+async def submit(city: str, coords: dict) -> dict:
+    """
+    Starts training a city's model unless a training for it is already running.
+
+    A per-city lock, shared across nodes through Redis, makes concurrent
+    callers join the running job instead of training the city again. The
+    job record is written before the lock is taken, so whoever holds the
+    lock always has a record to join. A lock is only ever released by its
+    own job, or expires after ``TRAIN_LOCK_TTL``. Jobs run in a local
+    process pool or, with ``TRAIN_JOB_BACKEND=celery`` and Redis available,
+    on the Celery worker.
+
+    Args:
+        city (str): The name of the city.
+        coords (dict): The city's ``lat`` and ``lon``.
+
+    Returns:
+        dict: The job record, new or already running.
+    """
+    job = {"id": uuid.uuid4().hex, "city": city, "status": "queued", "error": None, "created_at": time.time()}
+    await save_job(job)
+    holder = await _acquire(city, job["id"])
+    if holder is not None:
+        await _discard_job(job["id"])
+        existing = await get_job(holder)
+        return existing or {**job, "id": holder}
+    if TRAIN_JOB_BACKEND == "celery" and get_redis() is not None:
+        try:
+            _dispatch_celery(job, coords)
+            return job
+        except Exception:
+            logger.exception("queueing training of %s on the worker failed, training locally", city)
+    task = asyncio.create_task(run_job(job, coords["lat"], coords["lon"], _fit_in_pool))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+async def wait(job_id: str, timeout: float):
+    """
+    Polls a job until it finishes or the deadline passes.
+
+    Args:
+        job_id (str): The job id.
+        timeout (float): The maximum number of seconds to wait.
+
+    Returns:
+        dict: The latest job record, or None if the job is unknown.
+    """
+    deadline = time.monotonic() + max(timeout, 0)
+    while True:
+        job = await get_job(job_id)
+        if job is None or job["status"] in TERMINAL_STATES or time.monotonic() >= deadline:
+            return job
+        await asyncio.sleep(min(JOB_POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+
+async def close_jobs():
+    """Waits for local jobs and shuts down the training pool."""
+    global _pool
+    if _tasks:
+        await asyncio.gather(*list(_tasks), return_exceptions=True)
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
@@ -1,44 +1,260 @@
 import logging
-from datetime import datetime
+import os
+import json
+import random
 import time
 import asyncio
+from typing import TYPE_CHECKING
 import httpx
-import pandas as pd
+import numpy as np
+from app.core.cache import LRUCache, get_redis, mark_redis_down
+from app.core import telemetry
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-async def _get_json(url: str, params: dict, retries: int = 3):
+GEOCODING_URL = os.getenv("OPEN_METEO_GEOCODING_URL", "https://geocoding-api.open-meteo.com/v1/search")
+FORECAST_URL = os.getenv("OPEN_METEO_FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+OPEN_METEO_BATCH_SIZE = int(os.getenv("OPEN_METEO_BATCH_SIZE", "50"))
+CURRENT_VARIABLES = "temperature_2m,relative_humidity_2m,wind_speed_10m"
+HOURLY_VARIABLES = "temperature_2m,relative_humidity_2m,wind_speed_10m"
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_HTTP2 = os.getenv("HTTP_HTTP2", "0") == "1"
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "8"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+GEOCODE_TTL = int(os.getenv("GEOCODE_TTL", str(30 * 24 * 3600)))
+GEOCODE_NEGATIVE_TTL = int(os.getenv("GEOCODE_NEGATIVE_TTL", "3600"))
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", "4096"))
+GEO_NOT_FOUND = object()
+HISTORY_CACHE_TTL = int(os.getenv("HISTORY_CACHE_TTL", "3600"))
+HISTORY_PAST_DAYS = int(os.getenv("HISTORY_PAST_DAYS", "30"))
+
+_geo_cache = LRUCache(GEOCODE_CACHE_SIZE)
+_geo_stats = {"memory_hits": 0, "redis_hits": 0, "negative_hits": 0, "misses": 0}
+
+_client = None
+_client_loop = None
+
+def _http2_available() -> bool:
+    """Returns True if HTTP/2 was requested and the optional ``h2`` package is installed."""
+    if not HTTP_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("HTTP_HTTP2=1 but the h2 package is not installed, falling back to HTTP/1.1")
+        return False
+    return True
+
+async def init_client(transport=None):
+    """
+    Creates the shared HTTP client for the running event loop.
+
+    Any previous client is closed first. The client keeps connections alive
+    between requests so repeated Open-Meteo calls skip the TCP/TLS handshake.
+
+    Args:
+        transport: An optional httpx transport, e.g. for tests.
+
+    Returns:
+        httpx.AsyncClient: The shared client.
+    """
+    global _client, _client_loop
+    await close_client()
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(10.0, connect=5.0, read=10.0)
+    kwargs = {"timeout": timeout, "limits": limits, "http2": _http2_available()}
+    if transport is not None:
+        kwargs["transport"] = transport
+    _client = httpx.AsyncClient(**kwargs)
+    _client_loop = asyncio.get_running_loop()
+    return _client
+
+async def get_client():
+    """
+    Returns the shared HTTP client, creating it on first use.
+
+    Connections are bound to the event loop that opened them, so a new client
+    is created if the caller runs on a different loop than the current one;
+    the old client is closed as described in ``close_client``.
+
+    Returns:
+        httpx.AsyncClient: The shared client.
+    """
+    if _client is None or _client.is_closed or _client_loop is not asyncio.get_running_loop():
+        return await init_client()
+    return _client
+
+async def close_client():
+    """
+    Closes the shared HTTP client.
+
+    A client is closed on the event loop that opened it. If that loop still
+    runs in another thread, ``aclose`` is scheduled there and awaited. A
+    closed or stopped loop can no longer run it, so the client is dropped
+    and its sockets are closed when it is garbage collected.
+    """
+    global _client, _client_loop
+    client, loop = _client, _client_loop
+    _client, _client_loop = None, None
+    if client is None or client.is_closed:
+        return
+    if loop is asyncio.get_running_loop():
+        await client.aclose()
+    elif loop is not None and loop.is_running():
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
+
+def _retry_delay(attempt: int, response=None) -> float:
+    """
+    Computes the backoff before the next retry.
+
+    A numeric ``Retry-After`` header wins; otherwise the delay grows
+    exponentially with full jitter.
+
+    Args:
+        attempt (int): The zero-based attempt that just failed.
+        response (httpx.Response): The failed response, if any.
+
+    Returns:
+        float: The delay in seconds.
+    """
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), HTTP_BACKOFF_MAX)
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF * 2 ** attempt))
+
+async def _get_json(url: str, params: dict, retries: int = HTTP_RETRIES):
     """
     Asynchronously fetches JSON data from a URL with retries.
 
+    Timeouts, connection errors and 429/5xx responses are retried with
+    exponential backoff; other errors fail immediately.
+
     Args:
         url (str): The URL to fetch data from.
         params (dict): A dictionary of query parameters.
-        retries (int): The number of times to retry the request.
+        retries (int): The number of times to try the request.
 
     Returns:
         dict: The JSON response as a dictionary, or None if the request fails.
     """
-    timeout = httpx.Timeout(10.0, connect=5.0, read=10.0)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        for i in range(retries):
-            try:
-                r = await client.get(url, params=params)
-                r.raise_for_status()
-                return r.json()
-            except httpx.TimeoutException:
-                if i < retries - 1:
-                    await asyncio.sleep(0.5 * (i + 1))
-                else:
-                    return None
-            except Exception:
+    client = await get_client()
+    host = httpx.URL(url).host
+    for i in range(retries):
+        last = i == retries - 1
+        try:
+            r = await client.get(url, params=params)
+        except httpx.TransportError as e:
+            telemetry.UPSTREAM_REQUESTS.inc(host, "error")
+            if last:
+                logger.warning("GET %s failed: %s", url, e)
                 return None
+            telemetry.UPSTREAM_RETRIES.inc(host)
+            await asyncio.sleep(_retry_delay(i))
+            continue
+        telemetry.UPSTREAM_REQUESTS.inc(host, str(r.status_code))
+        if r.status_code in RETRY_STATUSES and not last:
+            telemetry.UPSTREAM_RETRIES.inc(host)
+            await asyncio.sleep(_retry_delay(i, r))
+            continue
+        try:
+            r.raise_for_status()
+            return r.json()
+        except Exception:
+            return None
 
+def _geo_key(city_name: str) -> str:
+    """
+    Normalizes a city name into a geocoding cache key.
+
+    Args:
+        city_name (str): The name of the city as entered by the user.
+
+    Returns:
+        str: The case-folded name with collapsed whitespace.
+    """
+    return " ".join(city_name.split()).casefold()
+
+def geocode_cache_stats() -> dict:
+    """
+    Returns the geocoding cache counters.
+
+    Returns:
+        dict: Memory and Redis hits, negative (not found) hits, upstream misses,
+              the hit ratio and the in-process cache size.
+    """
+    stats = dict(_geo_stats)
+    lookups = stats["memory_hits"] + stats["redis_hits"] + stats["misses"]
+    stats["hit_ratio"] = round((lookups - stats["misses"]) / lookups, 4) if lookups else 0.0
+    stats["memory_size"] = len(_geo_cache)
+    return stats
+
+telemetry.register_cache("geocode", lambda: (
+    _geo_stats["memory_hits"] + _geo_stats["redis_hits"], _geo_stats["misses"], len(_geo_cache)))
+
+async def _geo_cache_get(key: str):
+    """
+    Looks up a geocoding result in memory, then in Redis.
+
+    Returns:
+        The cached coordinates dict, ``GEO_NOT_FOUND`` for a cached miss,
+        or None if nothing is cached.
+    """
+    value = _geo_cache.get(key)
+    if value is not None:
+        _geo_stats["memory_hits"] += 1
+    else:
+        r = get_redis()
+        if r is None:
+            return None
+        try:
+            raw, ttl = await r.pipeline(transaction=False).get(f"geo:{key}").ttl(f"geo:{key}").execute()
+        except Exception as e:
+            mark_redis_down(e)
+            return None
+        if not raw:
+            return None
+        value = json.loads(raw) or GEO_NOT_FOUND
+        _geo_cache.set(key, value, ttl if ttl > 0 else GEOCODE_NEGATIVE_TTL)
+        _geo_stats["redis_hits"] += 1
+    if value is GEO_NOT_FOUND:
+        _geo_stats["negative_hits"] += 1
+    return value
+
+async def _geo_cache_set(key: str, value, ttl: int):
+    """Stores a geocoding result in memory and in Redis."""
+    _geo_cache.set(key, value, ttl)
+    r = get_redis()
+    if r is None:
+        return
+    payload = json.dumps(None if value is GEO_NOT_FOUND else value)
+    try:
+        await r.set(f"geo:{key}", payload, ex=ttl)
+    except Exception as e:
+        mark_redis_down(e)
+
+@telemetry.timed("geocode")
 async def get_coordinates(city_name: str):
     """
     Fetches the geographical coordinates (latitude and longitude) for a city.
 
+    Results are cached in process and in Redis. Cities the geocoder does not
+    know are cached for ``GEOCODE_NEGATIVE_TTL`` seconds; failed requests are
+    not cached.
+
     Args:
         city_name (str): The name of the city.
 
@@ -46,39 +262,78 @@ async def get_coordinates(city_name: str):
         dict: A dictionary containing the latitude, longitude, and name of the city,
               or None if the city is not found.
     """
+    key = _geo_key(city_name)
+    cached = await _geo_cache_get(key)
+    if cached is GEO_NOT_FOUND:
+        return None
+    if cached is not None:
+        return dict(cached)
+    _geo_stats["misses"] += 1
     js = await _get_json(
-        "https://geocoding-api.open-meteo.com/v1/search",
+        GEOCODING_URL,
         {"name": city_name, "count": 1, "language": "en"},
     )
-    if not js:
+    if js is None:
         return None
     results = js.get("results") or []
     if not results:
+        await _geo_cache_set(key, GEO_NOT_FOUND, GEOCODE_NEGATIVE_TTL)
         return None
     item = results[0]
-    return {"lat": item["latitude"], "lon": item["longitude"], "name": item.get("name", city_name)}
+    coords = {"lat": item["latitude"], "lon": item["longitude"], "name": item.get("name", city_name)}
+    await _geo_cache_set(key, coords, GEOCODE_TTL)
+    return dict(coords)
 
-async def fetch_current_weather(lat: float, lon: float):
+def _chunks(items: list, size: int):
+    """Yields consecutive slices of ``items`` with at most ``size`` elements."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _coord_params(locations: list) -> dict:
     """
-    Fetches the current weather for a given latitude and longitude.
+    Builds the comma-separated ``latitude``/``longitude`` parameters for a batch of points.
 
     Args:
-        lat (float): The latitude.
-        lon (float): The longitude.
+        locations (list): ``(lat, lon)`` pairs.
 
     Returns:
-        dict: A dictionary containing the current weather data (time, temperature,
-              humidity, and wind speed), or None if the request fails.
+        dict: The query parameters.
     """
-    js = await _get_json(
-        "https://api.open-meteo.com/v1/forecast",
-        {
-            "latitude": lat,
-            "longitude": lon,
-            "current": "temperature_2m,relative_humidity_2m,wind_speed_10m",
-            "timezone": "UTC",
-        },
-    )
+    return {
+        "latitude": ",".join(str(lat) for lat, _ in locations),
+        "longitude": ",".join(str(lon) for _, lon in locations),
+    }
+
+async def _get_json_batch(url: str, locations: list, params: dict) -> list:
+    """
+    Requests several locations from a multi-location Open-Meteo endpoint.
+
+    Open-Meteo answers a list of per-location objects when several coordinates
+    are given and a single object for one. Chunks of ``OPEN_METEO_BATCH_SIZE``
+    locations are requested concurrently.
+
+    Args:
+        url (str): The endpoint URL.
+        locations (list): ``(lat, lon)`` pairs.
+        params (dict): The remaining query parameters.
+
+    Returns:
+        list: One JSON object per location in input order, None where a chunk failed.
+    """
+    chunks = list(_chunks(list(locations), OPEN_METEO_BATCH_SIZE))
+    responses = await asyncio.gather(*(_get_json(url, {**_coord_params(c), **params}) for c in chunks))
+    out = []
+    for chunk, js in zip(chunks, responses):
+        if isinstance(js, dict):
+            js = [js]
+        if not isinstance(js, list) or len(js) != len(chunk):
+            out.extend([None] * len(chunk))
+        else:
+            out.extend(js)
+    return out
+
+def _parse_current(js: dict):
+    """Extracts the current conditions from a forecast response."""
     if not js:
         return None
     cur = js.get("current", {})
@@ -89,45 +344,187 @@ async def fetch_current_weather(lat: float, lon: float):
         "wind_speed": cur.get("wind_speed_10m"),
     }
 
-async def fetch_historical_training_data(lat: float, lon: float):
+@telemetry.timed("current_fetch")
+async def fetch_current_weather(lat: float, lon: float):
     """
-    Fetches historical weather data for the past 30 days for training purposes.
+    Fetches the current weather for a given latitude and longitude.
 
     Args:
         lat (float): The latitude.
         lon (float): The longitude.
 
     Returns:
-        pd.DataFrame: A pandas DataFrame containing the historical weather data,
-                      or an empty DataFrame if the request fails.
+        dict: A dictionary containing the current weather data (time, temperature,
+              humidity, and wind speed), or None if the request fails.
     """
     js = await _get_json(
-        "https://api.open-meteo.com/v1/forecast",
+        FORECAST_URL,
         {
             "latitude": lat,
             "longitude": lon,
-            "hourly": "temperature_2m,relative_humidity_2m,wind_speed_10m",
-            "past_days": 30,
+            "current": CURRENT_VARIABLES,
             "timezone": "UTC",
         },
     )
-    if not js:
+    return _parse_current(js)
+
+@telemetry.timed("current_fetch_batch")
+async def fetch_current_weather_batch(locations: list) -> list:
+    """
+    Fetches the current weather for many locations with one request per chunk.
+
+    Args:
+        locations (list): ``(lat, lon)`` pairs.
+
+    Returns:
+        list: One current-weather dict (as returned by ``fetch_current_weather``)
+              per location, or None where the request failed.
+    """
+    if not locations:
+        return []
+    results = await _get_json_batch(FORECAST_URL, locations, {"current": CURRENT_VARIABLES, "timezone": "UTC"})
+    return [_parse_current(js) for js in results]
+
+def _history_key(lat: float, lon: float, past_days: int, forecast_days: int = None) -> str:
+    """
+    Builds the history cache key for a location and the current UTC hour.
+
+    Args:
+        lat (float): The latitude.
+        lon (float): The longitude.
+        past_days (int): The number of past days requested.
+        forecast_days (int): The number of forecast days requested, or None for the upstream default.
+
+    Returns:
+        str: The Redis key, e.g. ``hist:52.23:21.01:30:2025120315``.
+    """
+    days = past_days if forecast_days is None else f"{past_days}+{forecast_days}"
+    return f"hist:{lat:.2f}:{lon:.2f}:{days}:{time.strftime('%Y%m%d%H', time.gmtime())}"
+
+async def _fetch_hourly_histories(locations: list, past_days: int, forecast_days: int = None) -> list:
+    """
+    Returns the raw ``hourly`` payloads for many locations, cached for the current UTC hour.
+
+    Cached payloads are read with one MGET; the remaining locations are fetched
+    in multi-location requests and written back to the cache.
+
+    Args:
+        locations (list): ``(lat, lon)`` pairs.
+        past_days (int): The number of past days to fetch.
+        forecast_days (int): The number of forecast days to include, or None for the upstream default.
+
+    Returns:
+        list: The ``hourly`` section per location, or None where the request failed.
+    """
+    keys = [_history_key(lat, lon, past_days, forecast_days) for lat, lon in locations]
+    out = [None] * len(locations)
+    r = get_redis()
+    if r is not None:
+        try:
+            cached = await r.mget(keys)
+        except Exception as e:
+            mark_redis_down(e)
+            r, cached = None, []
+        for i, raw in enumerate(cached):
+            if raw:
+                out[i] = json.loads(raw)
+    missing = [i for i, hourly in enumerate(out) if hourly is None]
+    if not missing:
+        return out
+    params = {"hourly": HOURLY_VARIABLES, "past_days": past_days, "timezone": "UTC"}
+    if forecast_days is not None:
+        params["forecast_days"] = forecast_days
+    results = await _get_json_batch(FORECAST_URL, [locations[i] for i in missing], params)
+    fresh = {}
+    for i, js in zip(missing, results):
+        hourly = (js or {}).get("hourly") or None
+        out[i] = hourly
+        if hourly:
+            fresh[keys[i]] = json.dumps(hourly)
+    if r is not None and fresh:
+        try:
+            pipe = r.pipeline(transaction=False)
+            for key, value in fresh.items():
+                pipe.set(key, value, ex=HISTORY_CACHE_TTL)
+            await pipe.execute()
+        except Exception as e:
+            mark_redis_down(e)
+    return out
+
+def parse_hourly(hourly: dict) -> "pd.DataFrame":
+    """
+    Converts an Open-Meteo ``hourly`` payload into a typed training DataFrame.
+
+    Times are parsed in one vectorized conversion as UTC. Timestamps are int64
+    epoch seconds, the hour is int32 and the measurements are float32, with
+    missing values as NaN.
+
+    Args:
+        hourly (dict): The ``hourly`` section of an Open-Meteo response.
+
+    Returns:
+        pd.DataFrame: The columns ``timestamp``, ``hour``, ``humidity``,
+                      ``wind_speed`` and ``temperature``.
+    """
+    columns = [
+        hourly.get("time") or [],
+        hourly.get("temperature_2m") or [],
+        hourly.get("relative_humidity_2m") or [],
+        hourly.get("wind_speed_10m") or [],
+    ]
+    n = min(len(c) for c in columns)
+    times, temps, hums, winds = (c[:n] for c in columns)
+    import pandas as pd
+
+    ts = np.array(times, dtype="datetime64[s]").astype(np.int64)
+    return pd.DataFrame({
+        "timestamp": ts,
+        "hour": ((ts // 3600) % 24).astype(np.int32),
+        "humidity": np.array(hums, dtype=np.float32),
+        "wind_speed": np.array(winds, dtype=np.float32),
+        "temperature": np.array(temps, dtype=np.float32),
+    })
+
+@telemetry.timed("history_fetch")
+async def fetch_historical_training_data(lat: float, lon: float, past_days: int = HISTORY_PAST_DAYS):
+    """
+    Fetches historical weather data for the past days for training purposes.
+
+    The payload is cached in Redis per rounded location and UTC hour, so
+    retraining the same city within the hour does not download it again.
+
+    Args:
+        lat (float): The latitude.
+        lon (float): The longitude.
+        past_days (int): The number of past days to fetch.
+
+    Returns:
+        pd.DataFrame: A pandas DataFrame containing the historical weather data,
+                      or an empty DataFrame if the request fails.
+    """
+    hourly = (await _fetch_hourly_histories([(lat, lon)], past_days))[0]
+    if not hourly:
+        import pandas as pd
         return pd.DataFrame()
-    hourly = js.get("hourly", {})
-    times = hourly.get("time") or []
-    temps = hourly.get("temperature_2m") or []
-    hums = hourly.get("relative_humidity_2m") or []
-    winds = hourly.get("wind_speed_10m") or []
-    rows = []
-    for t, temp, h, w in zip(times, temps, hums, winds):
-        dt = datetime.fromisoformat(t)
-        rows.append(
-            {
-                "timestamp": int(time.mktime(dt.timetuple())),
-                "hour": dt.hour,
-                "humidity": h,
-                "wind_speed": w,
-                "temperature": temp,
-            }
-        )
-    return pd.DataFrame(rows)
+    return parse_hourly(hourly)
+
+@telemetry.timed("history_fetch_batch")
+async def fetch_historical_training_data_batch(locations: list, past_days: int = HISTORY_PAST_DAYS,
+                                               forecast_days: int = None) -> list:
+    """
+    Fetches training history for many locations with one request per chunk.
+
+    Args:
+        locations (list): ``(lat, lon)`` pairs.
+        past_days (int): The number of past days to fetch.
+        forecast_days (int): The number of forecast days to include, or None for the upstream default.
+
+    Returns:
+        list: One DataFrame per location, empty where the request failed.
+    """
+    if not locations:
+        return []
+    import pandas as pd
+
+    payloads = await _fetch_hourly_histories(list(locations), past_days, forecast_days)
+    return [parse_hourly(hourly) if hourly else pd.DataFrame() for hourly in payloads]
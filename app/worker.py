@@ -2,22 +2,215 @@ import os
 import asyncio
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import task_postrun, task_prerun, worker_process_shutdown
+from app.core import telemetry
+from app.core.tasks import CELERY_BROKER_URL
 from app.services.ml_service import train_model
-from app.services.weather_service import get_coordinates, fetch_current_weather, fetch_historical_training_data
-from app.services.ml_service import train_model_for_city, load_model_for_city, predict_temp
+from app.services.weather_service import (
+    get_coordinates,
+    fetch_current_weather_batch,
+    close_client,
+)
+from app.services.ml_service import train_cities, train_model_for_city, load_model_for_city
+from app.services.inference import inference_executor
+from app.services import forecast_cache, history_store, training_jobs
+from app.services.ingest_service import insert_measurements, history_rows, current_row
+from app.services.rollup_service import refresh_rollups, purge_raw_measurements
 import time
-import json
-import redis
-import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+MONITOR_CONCURRENCY = int(os.getenv("MONITOR_CONCURRENCY", "16"))
+DEFAULT_GLOBAL_CITIES = ["London", "New York", "Tokyo", "Warsaw", "Berlin"]
+DEFAULT_POPULAR_CITIES = ["London", "Warsaw", "Berlin", "Paris", "New York"]
+celery_app = Celery("meteo_mind", broker=CELERY_BROKER_URL, backend=CELERY_BROKER_URL)
+_loop = None
+
+def _run(coro):
+    """
+    Runs a coroutine on this worker process's long-lived event loop.
+
+    Reusing one loop per process lets the pooled HTTP client keep its
+    connections alive across tasks instead of reconnecting on every call.
+    """
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop.run_until_complete(coro)
 
-REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
-celery_app = Celery("meteo_mind", broker=REDIS_URL, backend=REDIS_URL)
-REDIS_CACHE = redis.Redis.from_url(REDIS_URL)
+@worker_process_shutdown.connect
+def _close_loop(**kwargs):
+    """Closes the pooled HTTP client and the event loop when a worker process exits."""
+    global _loop
+    if _loop is not None and not _loop.is_closed():
+        _loop.run_until_complete(close_client())
+        _loop.close()
+    _loop = None
+
+_task_started = {}
+
+@task_prerun.connect
+def _start_task_timer(task_id=None, **kwargs):
+    """Remembers when a task started."""
+    _task_started[task_id] = time.perf_counter()
+
+@task_postrun.connect
+def _record_task(task_id=None, task=None, state=None, **kwargs):
+    """Records a task's duration and pushes this process's metrics to Redis for `/ops/metrics`."""
+    started = _task_started.pop(task_id, None)
+    if started is None:
+        return
+    telemetry.TASK_SECONDS.observe(time.perf_counter() - started, task.name, state or "UNKNOWN")
+    try:
+        _run(telemetry.push_snapshot())
+    except Exception:
+        logger.exception("pushing worker metrics failed")
 
 @celery_app.task
 def train_model_task():
     """Celery task to train the global machine learning model."""
-    asyncio.run(train_model())
+    _run(train_model())
+
+def _load_cities(name: str, default: list) -> list:
+    """
+    Reads a monitored city list from configuration.
+
+    ``{name}_FILE`` points to a file with one city per line; otherwise ``{name}``
+    holds a comma-separated list. Falls back to ``default``.
+
+    Args:
+        name (str): The environment variable name, e.g. ``GLOBAL_MONITOR_CITIES``.
+        default (list): The cities used when nothing is configured.
+
+    Returns:
+        list: The de-duplicated city names in configured order.
+    """
+    path = os.getenv(f"{name}_FILE")
+    if path:
+        with open(path, "r") as f:
+            raw = f.read().splitlines()
+    elif os.getenv(name):
+        raw = os.getenv(name).split(",")
+    else:
+        raw = default
+    return list(dict.fromkeys(c.strip() for c in raw if c.strip() and not c.strip().startswith("#")))
+
+async def _fan_out(cities: list, fn):
+    """
+    Runs ``fn(city)`` for every city concurrently, at most ``MONITOR_CONCURRENCY`` at a time.
+
+    A failing city is logged and does not affect the others.
+    """
+    sem = asyncio.Semaphore(MONITOR_CONCURRENCY)
+
+    async def guarded(city):
+        async with sem:
+            try:
+                await fn(city)
+            except Exception:
+                logger.exception("monitoring %s failed", city)
+
+    await asyncio.gather(*(guarded(c) for c in cities))
+
+async def _ingest(rows: list):
+    """Stores fetched measurements in bulk; a database outage does not stop monitoring."""
+    try:
+        inserted = await insert_measurements(rows)
+    except Exception:
+        logger.exception("ingesting %d measurements failed", len(rows))
+        return
+    logger.info("ingested %d of %d measurements", inserted, len(rows))
+
+async def _geocode_all(cities: list) -> dict:
+    """
+    Geocodes cities concurrently, at most ``MONITOR_CONCURRENCY`` at a time.
+
+    Returns:
+        dict: Coordinates per city, without the cities that could not be geocoded.
+    """
+    located = {}
+
+    async def locate(city):
+        coords = await get_coordinates(city)
+        if coords:
+            located[city] = coords
+
+    await _fan_out(cities, locate)
+    return {c: located[c] for c in cities if c in located}
+
+async def _monitor_cities(cities: list):
+    """
+    Fetches, forecasts and caches the `/analyze` payload of every city.
+
+    Current weather is fetched with multi-location requests. Cities without
+    a model get their stored history brought up to date and are trained
+    concurrently within ``TRAIN_CPU_BUDGET``; prediction then runs per city.
+    """
+    located = await _geocode_all(cities)
+    names = list(located)
+    currents = await fetch_current_weather_batch([(located[c]["lat"], located[c]["lon"]) for c in names])
+    ready = {c: cur for c, cur in zip(names, currents) if cur}
+    untrained = [c for c in ready if load_model_for_city(c)[0] is None]
+    synced = await history_store.sync_histories({c: located[c] for c in untrained})
+    history_by_city = {c: window for c, (window, _) in synced.items()}
+    rows = [current_row(c, cur) for c, cur in ready.items()]
+    rows += [r for c, (_, appended) in synced.items() for r in history_rows(c, appended)]
+    await _ingest([r for r in rows if r])
+    if history_by_city:
+        await asyncio.to_thread(train_cities, history_by_city)
+
+    async def finish(city):
+        current = ready[city]
+        model, metrics = await asyncio.to_thread(load_model_for_city, city)
+        if model is None:
+            return
+        now = int(time.time())
+        humidity = float(current.get("humidity") or 50)
+        wind = float(current.get("wind_speed") or 5)
+        preds = await inference_executor.predict_horizon(city, now, 24, humidity, wind)
+        payload = {
+            "city": city, "coords": located[city], "current": current, "predictions": preds, "metrics": metrics or {},
+            "generated_at": time.time(),
+        }
+        await forecast_cache.store_forecast(payload)
+
+    await _fan_out(list(ready), finish)
+
+async def _train_cities(cities: list):
+    """
+    Refreshes the model of every city on its stored history, appended with the hours since the last run.
+
+    Cities whose training data did not change are skipped and the others are
+    warm-started, with a full refit every ``RETRAIN_FULL_EVERY_HOURS``; see
+    ``plan_retrain``.
+    """
+    located = await _geocode_all(cities)
+    synced = await history_store.sync_histories(located)
+    await _ingest([r for c, (_, appended) in synced.items() for r in history_rows(c, appended)])
+    frames = {c: window for c, (window, _) in synced.items()}
+    trained = await asyncio.to_thread(train_cities, frames, incremental=True)
+    logger.info("%d of %d city models are up to date", sum(trained.values()), len(located))
+
+async def _train_city_job(job_id: str, city: str, lat: float, lon: float):
+    """Runs an `/analyze` training job queued with ``TRAIN_JOB_BACKEND=celery``."""
+    job = await training_jobs.get_job(job_id) or {"id": job_id, "city": city, "status": "queued", "error": None}
+
+    async def fit(name, df):
+        return await asyncio.to_thread(train_model_for_city, name, df)
+
+    await training_jobs.run_job(job, lat, lon, fit)
+
+@celery_app.task
+def train_city_task(job_id: str, city: str, lat: float, lon: float):
+    """
+    Celery task that trains one city's model for an `/analyze` job.
+
+    The job record is updated in Redis and the city's training lock is
+    released when the task ends.
+    """
+    _run(_train_city_job(job_id, city, lat, lon))
 
 @celery_app.task
 def global_monitor_task():
@@ -25,34 +218,10 @@ def global_monitor_task():
     Celery task that monitors a list of global cities.
 
     For each city, it fetches weather data, makes predictions, and caches
-    the results in Redis.
-    """
-    cities = ["London", "New York", "Tokyo", "Warsaw", "Berlin"]
-    for city in cities:
-        try:
-            coords = asyncio.run(get_coordinates(city))
-            if not coords:
-                continue
-            current = asyncio.run(fetch_current_weather(coords["lat"], coords["lon"]))
-            if not current:
-                continue
-            hist_df = asyncio.run(fetch_historical_training_data(coords["lat"], coords["lon"]))
-            model, metrics = load_model_for_city(city)
-            if model is None:
-                train_model_for_city(city, hist_df)
-                model, metrics = load_model_for_city(city)
-            preds = []
-            now = int(time.time())
-            humidity = float(current.get("humidity") or 50)
-            wind = float(current.get("wind_speed") or 5)
-            for h in range(1, 25):
-                ts = now + h * 3600
-                y = predict_temp(ts, humidity, wind, city)
-                preds.append({"timestamp": ts, "hour": h, "temperature": y})
-            payload = {"city": city, "coords": coords, "current": current, "predictions": preds, "metrics": metrics or {}}
-            REDIS_CACHE.set(f"city_intel:{city}", json.dumps(payload), ex=3600)
-        except Exception:
-            continue
+    the results in Redis. Cities are processed concurrently on one event loop
+    and upstream data is fetched in multi-location batches.
+    """
+    _run(_monitor_cities(_load_cities("GLOBAL_MONITOR_CITIES", DEFAULT_GLOBAL_CITIES)))
 
 @celery_app.task
 def monitor_popular_cities_task():
@@ -60,18 +229,22 @@ def monitor_popular_cities_task():
     Celery task that trains models for a list of popular cities.
 
     This ensures that models for these cities are regularly updated with
-    the latest historical data.
-    """
-    cities = ["London", "Warsaw", "Berlin", "Paris", "New York"]
-    for city in cities:
-        try:
-            coords = asyncio.run(get_coordinates(city))
-            if not coords:
-                continue
-            hist_df = asyncio.run(fetch_historical_training_data(coords["lat"], coords["lon"]))
-            train_model_for_city(city, hist_df)
-        except Exception:
-            continue
+    the latest historical data. Unchanged cities are skipped and the others
+    are warm-started where possible; see ``plan_retrain``.
+    """
+    _run(_train_cities(_load_cities("POPULAR_CITIES", DEFAULT_POPULAR_CITIES)))
+
+@celery_app.task
+def refresh_rollups_task():
+    """Celery task that folds new raw measurements into the hourly and daily rollups."""
+    written = _run(refresh_rollups())
+    logger.info("rollup buckets written: %s", written)
+
+@celery_app.task
+def purge_raw_measurements_task():
+    """Celery task that deletes raw measurements past ``RAW_RETENTION_DAYS`` once rolled up."""
+    _run(refresh_rollups())
+    _run(purge_raw_measurements())
 
 celery_app.conf.beat_schedule = {
     "train-model-daily": {
@@ -86,4 +259,12 @@ celery_app.conf.beat_schedule = {
         "task": "app.worker.monitor_popular_cities_task",
         "schedule": 30 * 60,
     },
+    "refresh-rollups": {
+        "task": "app.worker.refresh_rollups_task",
+        "schedule": 15 * 60,
+    },
+    "purge-raw-measurements-daily": {
+        "task": "app.worker.purge_raw_measurements_task",
+        "schedule": crontab(hour=1, minute=0),
+    },
 }
@@ -0,0 +1,95 @@
+"""
+Micro-benchmark of the Open-Meteo hourly payload parser.
+
+Compares the previous row-by-row parser with ``weather_service.parse_hourly``
+on synthetic payloads of 30, 90 and 365 days.
+
+Usage:
+    python -m benchmarks.bench_hourly_parser [--days 30 90 365] [--repeat 20]
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from app.services.weather_service import parse_hourly
+
+def make_hourly(days: int) -> dict:
+    """
+    Builds a synthetic ``hourly`` payload with one entry per hour.
+
+    Args:
+        days (int): The number of days covered.
+
+    Returns:
+        dict: A payload shaped like the Open-Meteo ``hourly`` section.
+    """
+    n = days * 24
+    start = datetime(2025, 1, 1)
+    rng = np.random.default_rng(42)
+    return {
+        "time": [(start + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M") for i in range(n)],
+        "temperature_2m": rng.normal(10, 5, n).round(1).tolist(),
+        "relative_humidity_2m": rng.integers(20, 100, n).tolist(),
+        "wind_speed_10m": rng.uniform(0, 30, n).round(1).tolist(),
+    }
+
+def parse_rowwise(hourly: dict) -> pd.DataFrame:
+    """The previous parser: one dict per hour with ``fromisoformat`` and ``mktime``."""
+    rows = []
+    columns = zip(
+        hourly["time"], hourly["temperature_2m"], hourly["relative_humidity_2m"], hourly["wind_speed_10m"]
+    )
+    for t, temp, h, w in columns:
+        dt = datetime.fromisoformat(t)
+        rows.append(
+            {
+                "timestamp": int(time.mktime(dt.timetuple())),
+                "hour": dt.hour,
+                "humidity": h,
+                "wind_speed": w,
+                "temperature": temp,
+            }
+        )
+    return pd.DataFrame(rows)
+
+def best_of(fn, arg, repeat: int) -> float:
+    """Returns the fastest of ``repeat`` runs of ``fn(arg)`` in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def run(days_list, repeat: int) -> list:
+    """
+    Runs both parsers for each payload size.
+
+    Returns:
+        list: One result dict per size with timings in milliseconds.
+    """
+    results = []
+    for days in days_list:
+        hourly = make_hourly(days)
+        rowwise = best_of(parse_rowwise, hourly, repeat)
+        columnar = best_of(parse_hourly, hourly, repeat)
+        results.append({
+            "days": days,
+            "rows": days * 24,
+            "rowwise_ms": round(rowwise, 3),
+            "columnar_ms": round(columnar, 3),
+            "speedup": round(rowwise / columnar, 2),
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 90, 365])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.days, args.repeat), indent=2))
+
+if __name__ == "__main__":
+    main()
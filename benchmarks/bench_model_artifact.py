@@ -0,0 +1,82 @@
+"""
+Benchmark of the joblib pickle against the flattened forest artifact.
+
+Trains a ``RandomForestRegressor`` like ``train_model_for_city`` does on a
+synthetic hourly history, then compares file size, load time and the cost
+of one 24-hour prediction for both formats.
+
+Usage:
+    python -m benchmarks.bench_model_artifact [--days 30] [--trees 200]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from app.services.forest_artifact import export_forest, load_forest
+
+def _history(days: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    ts = 1.7e9 + np.arange(days * 24) * 3600
+    return pd.DataFrame({
+        "timestamp": ts,
+        "hour": (ts // 3600) % 24,
+        "humidity": rng.uniform(20, 100, len(ts)),
+        "wind_speed": rng.uniform(0, 30, len(ts)),
+        "temperature": np.sin(ts / 86400 * 2 * np.pi) * 5 + 10 + rng.normal(0, 1, len(ts)),
+    })
+
+def _best(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return round(best * 1000, 3)
+
+def run(days: int, trees: int, repeat: int) -> dict:
+    """
+    Measures both artifact formats for one model.
+
+    Returns:
+        dict: Sizes in bytes, load and 24-row predict times in milliseconds and the max prediction difference.
+    """
+    df = _history(days)
+    X = df[["timestamp", "hour", "humidity", "wind_speed"]]
+    model = RandomForestRegressor(n_estimators=trees, random_state=42).fit(X, df["temperature"])
+    horizon = X.tail(24).assign(timestamp=lambda d: d["timestamp"] + 86400)
+    with tempfile.TemporaryDirectory() as tmp:
+        pickle_path, forest_path = os.path.join(tmp, "m.joblib"), os.path.join(tmp, "m.forest")
+        joblib.dump(model, pickle_path)
+        export_forest(model, forest_path)
+        loaded, forest = joblib.load(pickle_path), load_forest(forest_path)
+        return {
+            "days": days,
+            "trees": trees,
+            "joblib": {
+                "bytes": os.path.getsize(pickle_path),
+                "load_ms": _best(lambda: joblib.load(pickle_path), repeat),
+                "predict_24_ms": _best(lambda: loaded.predict(horizon), repeat),
+            },
+            "forest": {
+                "bytes": os.path.getsize(forest_path),
+                "load_ms": _best(lambda: load_forest(forest_path), repeat),
+                "predict_24_ms": _best(lambda: forest.predict(horizon), repeat),
+            },
+            "max_abs_diff": float(np.abs(forest.predict(X) - model.predict(X)).max()),
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--trees", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run(args.days, args.trees, args.repeat), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark of the global training-set loader.
+
+Compares the previous ORM path (one object per row, ``time.mktime`` and a
+list of dicts) with the chunked columnar conversion used by
+``ml_service.load_training_arrays`` on synthetic driver rows. The database
+round trips are not included; both paths receive the same rows.
+
+Usage:
+    python -m benchmarks.bench_train_loader [--rows 1000000 10000000] [--legacy-max 1000000] [--memory]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from app.services.ml_service import CITY_MAP, TRAIN_CHUNK_ROWS, _arrays_from_chunks, _chunk_arrays
+
+class _Measurement:
+    """Stands in for a loaded ``WeatherMeasurement`` ORM object."""
+    __slots__ = ("city", "timestamp", "temperature", "humidity", "wind_speed")
+
+    def __init__(self, city, timestamp, temperature, humidity, wind_speed):
+        self.city = city
+        self.timestamp = timestamp
+        self.temperature = temperature
+        self.humidity = humidity
+        self.wind_speed = wind_speed
+
+def _synthetic(n: int, chunk_rows: int):
+    """Yields chunks of numeric rows shaped like ``_training_query`` results."""
+    rng = np.random.default_rng(42)
+    start = 1.7e9
+    for offset in range(0, n, chunk_rows):
+        size = min(chunk_rows, n - offset)
+        ts = start + (offset + np.arange(size)) * 3600.0
+        block = np.column_stack([
+            ts, ts // 3600 % 24, rng.uniform(20, 100, size), rng.uniform(0, 30, size),
+            rng.integers(0, 3, size), rng.normal(10, 5, size),
+        ])
+        yield block.tolist()
+
+def columnar(n: int, chunk_rows: int):
+    """The current path: each driver chunk is converted to arrays as it arrives."""
+    return _arrays_from_chunks([_chunk_arrays(chunk) for chunk in _synthetic(n, chunk_rows)])
+
+def legacy(n: int, chunk_rows: int):
+    """The previous path: ORM objects for every row, then a list of dicts."""
+    names = {v: k for k, v in CITY_MAP.items()}
+    epoch = datetime(1970, 1, 1)
+    rows = [
+        _Measurement(names[int(r[4])], epoch + timedelta(seconds=r[0]), r[5], r[2], r[3])
+        for chunk in _synthetic(n, chunk_rows)
+        for r in chunk
+    ]
+    return pd.DataFrame([
+        {
+            "timestamp": int(time.mktime(r.timestamp.timetuple())),
+            "hour": r.timestamp.hour,
+            "humidity": r.humidity,
+            "wind_speed": r.wind_speed,
+            "temperature": r.temperature,
+            "city_code": CITY_MAP.get(r.city, -1),
+        }
+        for r in rows
+        if r.temperature is not None and r.city in CITY_MAP
+    ])
+
+def generate_only(n: int, chunk_rows: int):
+    """Only synthesizes the rows; both loaders include this cost."""
+    for _ in _synthetic(n, chunk_rows):
+        pass
+
+def measure(fn, n: int, chunk_rows: int, memory: bool) -> dict:
+    """
+    Returns the wall time of one run and, optionally, the peak traced memory of a second run.
+
+    Memory is traced in a separate run because tracemalloc slows allocation-heavy code down.
+    """
+    t0 = time.perf_counter()
+    fn(n, chunk_rows)
+    result = {"seconds": round(time.perf_counter() - t0, 3)}
+    if memory:
+        tracemalloc.start()
+        fn(n, chunk_rows)
+        result["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+        tracemalloc.stop()
+    return result
+
+def run(sizes, legacy_max: int, chunk_rows: int, memory: bool) -> list:
+    """
+    Runs the loaders for each table size.
+
+    Returns:
+        list: One result dict per size; the legacy path is skipped above ``legacy_max`` rows.
+    """
+    results = []
+    for n in sizes:
+        result = {"rows": n, "generate": measure(generate_only, n, chunk_rows, False)}
+        result["columnar"] = measure(columnar, n, chunk_rows, memory)
+        result["legacy"] = measure(legacy, n, chunk_rows, memory) if n <= legacy_max else "skipped"
+        results.append(result)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--legacy-max", type=int, default=1_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=TRAIN_CHUNK_ROWS)
+    parser.add_argument("--memory", action="store_true", help="also report peak memory (runs each loader twice)")
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.legacy_max, args.chunk_rows, args.memory), indent=2))
+
+if __name__ == "__main__":
+    main()
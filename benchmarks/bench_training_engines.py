@@ -0,0 +1,77 @@
+"""
+Benchmark of the training engines on per-city histories.
+
+Fits every engine in ``ENGINES`` on synthetic hourly histories of several
+lengths and reports fit time and held-out accuracy, then times training a
+batch of cities sequentially on one core against ``train_cities`` with the
+given CPU budget.
+
+Usage:
+    python -m benchmarks.bench_training_engines [--days 30 90 365] [--cities 8] [--cpu-budget 4]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from app.services import ml_service
+from app.services.ml_service import FEATURES, train_cities, train_model_for_city
+from app.services.training_engine import ENGINES, TRAIN_CPU_BUDGET, compare_engines
+from benchmarks.bench_model_artifact import _history
+
+def run_engines(days: list, n_jobs: int) -> list:
+    """
+    Compares every engine at each history length.
+
+    Returns:
+        list: One report per history length with the engines' MAE, R² and fit time.
+    """
+    report = []
+    for d in days:
+        df = _history(d)
+        report.append({"days": d, "engines": compare_engines(df[FEATURES], df["temperature"], list(ENGINES), n_jobs)})
+    return report
+
+def run_batch(cities: int, days: int, engine: str, cpu_budget: int) -> dict:
+    """
+    Times training ``cities`` models one by one on one core and concurrently within ``cpu_budget``.
+
+    Returns:
+        dict: Wall-clock seconds for both strategies.
+    """
+    frames = {f"Bench {i}": _history(days) for i in range(cities)}
+    with tempfile.TemporaryDirectory() as tmp:
+        ml_service.MODELS_DIR = tmp
+        os.environ["MODELS_DIR"] = tmp  # for spawned training pool processes
+        t0 = time.perf_counter()
+        for city, df in frames.items():
+            train_model_for_city(city, df, engine, {}, n_jobs=1)
+        sequential = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        train_cities(frames, engine, {}, cpu_budget)
+        concurrent = time.perf_counter() - t0
+    return {
+        "cities": cities,
+        "days": days,
+        "engine": engine,
+        "cpu_budget": cpu_budget,
+        "sequential_seconds": round(sequential, 3),
+        "concurrent_seconds": round(concurrent, 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 90, 365])
+    parser.add_argument("--cities", type=int, default=8)
+    parser.add_argument("--engine", default="random_forest", choices=sorted(ENGINES))
+    parser.add_argument("--cpu-budget", type=int, default=TRAIN_CPU_BUDGET)
+    args = parser.parse_args()
+    result = {
+        "cpus": os.cpu_count(),
+        "engines": run_engines(args.days, args.cpu_budget),
+        "batch": run_batch(args.cities, args.days[0], args.engine, args.cpu_budget),
+    }
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
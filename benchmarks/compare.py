@@ -0,0 +1,61 @@
+"""
+Compares two reports written by ``benchmarks.suite``.
+
+Prints every numeric timing found in both reports with the relative change,
+and exits with status 1 if any of them regressed by more than ``--threshold``.
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 0.2]
+"""
+import argparse
+import json
+import sys
+
+TIMING_SUFFIXES = ("_ms", "_seconds", "seconds", "ms")
+
+def _flatten(node, prefix: str = "") -> dict:
+    """Returns the timing leaves of a report as ``{"a.b.c": value}``."""
+    out = {}
+    for key, value in node.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            out.update(_flatten(value, path))
+        elif isinstance(value, (int, float)) and key.endswith(TIMING_SUFFIXES):
+            out[path] = float(value)
+    return out
+
+def compare(baseline: dict, candidate: dict) -> list:
+    """
+    Pairs the timings present in both reports.
+
+    Returns:
+        list: ``(path, baseline, candidate, change)`` tuples, where change is relative.
+    """
+    base = _flatten(baseline["results"])
+    cand = _flatten(candidate["results"])
+    rows = []
+    for path in sorted(base.keys() & cand.keys()):
+        change = (cand[path] - base[path]) / base[path] if base[path] else 0.0
+        rows.append((path, base[path], cand[path], change))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown that counts as a regression")
+    args = parser.parse_args()
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    print(f"baseline {baseline['meta']['commit']}  candidate {candidate['meta']['commit']}")
+    regressions = 0
+    for path, b, c, change in compare(baseline, candidate):
+        flag = "  REGRESSION" if change > args.threshold else ""
+        regressions += bool(flag)
+        print(f"{path:<60} {b:>12.3f} {c:>12.3f} {change:>+8.1%}{flag}")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
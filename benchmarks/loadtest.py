@@ -0,0 +1,250 @@
+"""
+Closed-loop load test of the API at many concurrent clients.
+
+Each client sends requests back to back for ``--duration`` seconds, picking
+the endpoint from a weighted mix of ``/analyze``, ``/metrics`` and
+``/health``. By default the app runs in this process and event loop
+through ``httpx.ASGITransport``, with the same offline setup as
+``benchmarks.suite``. In this mode a probe task also measures how late the
+loop wakes up from short sleeps, which exposes handlers that block it.
+With ``--url`` the load goes to a running server instead. The probe then
+only covers the load generator, so use the server's
+``meteomind_stage_seconds`` metrics to find where time goes.
+
+Every client count runs one round. Reports give throughput, status codes
+and p50/p95/p99/p999 latency per endpoint.
+
+Usage:
+    python -m benchmarks.loadtest [--clients 50 200 500] [--duration 20] [--cities 20]
+                                  [--mix analyze=0.7,metrics=0.2,health=0.1] [--url http://localhost:8000]
+                                  [--output load.json]
+"""
+import os
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import tempfile
+import time
+import httpx
+
+ENDPOINTS = ("analyze", "metrics", "health")
+
+def parse_mix(text: str) -> dict:
+    """Parses ``name=weight,...`` into normalized endpoint weights."""
+    weights = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r}, expected one of {', '.join(ENDPOINTS)}")
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("the mix needs a positive weight")
+    return {k: v / total for k, v in weights.items() if v > 0}
+
+def percentiles(samples: list) -> dict:
+    """Returns count, mean and tail latency percentiles in milliseconds."""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 3)
+
+    return {"n": len(ordered), "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3), "p50_ms": pct(50),
+            "p95_ms": pct(95), "p99_ms": pct(99), "p999_ms": pct(99.9), "max_ms": round(ordered[-1] * 1000, 3)}
+
+class LoopProbe:
+    """
+    Measures event loop stalls by sleeping for ``interval`` and timing the wake-up.
+
+    Any delay beyond the interval is time the loop spent running something
+    else without yielding; delays above ``threshold`` count as stalls.
+    """
+
+    def __init__(self, interval: float = 0.01, threshold: float = 0.05):
+        self.interval = interval
+        self.threshold = threshold
+        self.lags = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(loop.time() - t0 - self.interval, 0.0))
+
+    def start(self):
+        self.lags = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> dict:
+        """Stops probing and summarizes the observed lag."""
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        stalls = [lag for lag in self.lags if lag >= self.threshold]
+        return {
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "stalls": len(stalls),
+            "stalled_seconds": round(sum(stalls), 3),
+            "lag": percentiles(self.lags),
+        }
+
+def _request(client: httpx.AsyncClient, endpoint: str, city: str):
+    if endpoint == "analyze":
+        return client.post("/analyze", json={"city_name": city})
+    if endpoint == "metrics":
+        return client.get("/metrics")
+    return client.get("/health")
+
+async def run_round(client: httpx.AsyncClient, clients: int, duration: float, mix: dict, cities: list,
+                    probe: LoopProbe = None, seed: int = 0) -> dict:
+    """
+    Runs ``clients`` closed-loop clients for ``duration`` seconds.
+
+    Returns:
+        dict: Throughput and per-endpoint latency, status codes and errors, plus loop lag if probed.
+    """
+    names, weights = list(mix), list(mix.values())
+    samples = {name: [] for name in names}
+    statuses = {name: {} for name in names}
+    errors = {name: 0 for name in names}
+    deadline = time.perf_counter() + duration
+
+    async def one_client(i: int):
+        rng = random.Random(seed * 100003 + i)
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(names, weights)[0]
+            t0 = time.perf_counter()
+            try:
+                resp = await _request(client, endpoint, rng.choice(cities))
+            except Exception:
+                errors[endpoint] += 1
+                continue
+            samples[endpoint].append(time.perf_counter() - t0)
+            code = str(resp.status_code)
+            statuses[endpoint][code] = statuses[endpoint].get(code, 0) + 1
+
+    if probe is not None:
+        probe.start()
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one_client(i) for i in range(clients)))
+    wall = time.perf_counter() - t0
+    total = sum(len(s) for s in samples.values())
+    result = {
+        "clients": clients,
+        "seconds": round(wall, 3),
+        "rps": round(total / wall, 1),
+        "endpoints": {
+            name: {**percentiles(samples[name]), "rps": round(len(samples[name]) / wall, 1),
+                   "status": statuses[name], "errors": errors[name]}
+            for name in names
+        },
+    }
+    if probe is not None:
+        result["event_loop"] = await probe.stop()
+    return result
+
+async def _warm_up(client: httpx.AsyncClient, cities: list):
+    """Trains every city once so rounds measure steady-state traffic."""
+    sem = asyncio.Semaphore(8)
+
+    async def one(city):
+        async with sem:
+            await client.post("/analyze", json={"city_name": city, "wait": 300}, timeout=600)
+
+    await asyncio.gather(*(one(c) for c in cities))
+
+def _train_global_model():
+    """Fits a small global model on synthetic history so in-process `/metrics` requests hit a real model."""
+    import numpy as np
+    from benchmarks.suite import _history_frame
+    from app.services import ml_service
+    from app.services.training_engine import fit_and_evaluate
+
+    df = _history_frame(30)
+    X = df[ml_service.FEATURES].assign(city_code=np.arange(len(df)) % 4)[ml_service.GLOBAL_FEATURES]
+    model, metrics = fit_and_evaluate(X, df["temperature"], params={"n_estimators": 20})
+    ml_service._save_model(model, "global", metrics)
+
+async def run_remote(args, mix: dict, cities: list) -> list:
+    limits = httpx.Limits(max_connections=max(args.clients), max_keepalive_connections=max(args.clients))
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        if not args.cold:
+            await _warm_up(client, cities)
+        return [await run_round(client, n, args.duration, mix, cities, LoopProbe(threshold=args.stall_ms / 1000),
+                                seed=n) for n in args.clients]
+
+async def run_in_process(args, mix: dict, cities: list) -> list:
+    """Runs the rounds against ``app.main`` in this event loop with the offline setup of the suite."""
+    from benchmarks import suite
+    from app import main, worker
+    from app.services import history_store, ingest_service, ml_service, weather_service
+    from app.services.ingest_service import measurement_buffer
+
+    ingest_service.insert_measurements = suite._sink
+    worker.insert_measurements = suite._sink
+    await suite._setup(args.latency)
+    measurement_buffer.start()
+    rounds = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            ml_service.MODELS_DIR = tmp
+            os.environ["MODELS_DIR"] = tmp  # for spawned training pool processes
+            history_store.HISTORY_DIR = os.path.join(tmp, "history")
+            ml_service.registry.clear()
+            _train_global_model()
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=args.timeout) as client:
+                if not args.cold:
+                    await _warm_up(client, cities)
+                for n in args.clients:
+                    probe = LoopProbe(threshold=args.stall_ms / 1000)
+                    rounds.append(await run_round(client, n, args.duration, mix, cities, probe, seed=n))
+    finally:
+        await measurement_buffer.stop()
+        await weather_service.close_client()
+    return rounds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per round")
+    parser.add_argument("--cities", type=int, default=20, help="distinct cities requested from /analyze")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("analyze=0.7,metrics=0.2,health=0.1"))
+    parser.add_argument("--url", help="load a running server instead of the in-process app")
+    parser.add_argument("--latency", type=float, default=0.02, help="fake upstream latency in-process, in seconds")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--stall-ms", type=float, default=50.0, help="loop lag counted as a stall")
+    parser.add_argument("--cold", action="store_true", help="skip training the cities before the first round")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+    cities = [f"Load City {i}" for i in range(args.cities)]
+    # The app logs one httpx line per request at INFO, which would skew the measurement.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.url:
+        rounds = asyncio.run(run_remote(args, args.mix, cities))
+    else:
+        os.environ.setdefault("REDIS_URL", "")
+        rounds = asyncio.run(run_in_process(args, args.mix, cities))
+    report = {
+        "meta": {
+            "target": args.url or "in-process", "mix": args.mix, "cities": args.cities, "duration_s": args.duration,
+            "python": platform.python_version(), "cpus": os.cpu_count(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "rounds": rounds,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+if __name__ == "__main__":
+    main()
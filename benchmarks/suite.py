@@ -0,0 +1,228 @@
+"""
+Offline benchmark suite for the hot paths of the API and the worker.
+
+Everything runs in one process against the fake Open-Meteo app from
+``tests.fake_open_meteo``. Upstream calls go through ``httpx.ASGITransport``
+with a configurable latency and history size. Redis is disabled and
+database writes go to a no-op sink, so no network or service is needed.
+Models and stored histories are written to a temporary directory.
+
+Benchmarks:
+    analyze   ``POST /analyze`` latency, first request (training) and
+              repeated requests at several concurrency levels, served from
+              the forecast cache and with the caches bypassed.
+    predict   ``predict_temp`` and ``predict_horizon`` cost per call.
+    train     ``train_model_for_city`` time as history grows.
+    monitor   ``global_monitor_task`` body for growing city lists.
+
+Results are printed as JSON and optionally written to ``--output`` for
+comparison across commits with ``python -m benchmarks.compare``.
+
+Usage:
+    python -m benchmarks.suite [--scale small|medium|large] [--only analyze predict] [--latency 0.02]
+                               [--output results.json]
+"""
+import os
+
+os.environ.setdefault("REDIS_URL", "")
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import httpx
+from app.services import forecast_cache, history_store, ingest_service, ml_service, weather_service
+from tests.fake_open_meteo import create_app
+
+SCALES = {
+    "small": {"cities": [5, 20], "days": [30, 90], "concurrency": [1, 8], "requests": 40, "calls": 200},
+    "medium": {"cities": [20, 100], "days": [30, 90, 365], "concurrency": [1, 8, 32], "requests": 200, "calls": 1000},
+    "large": {"cities": [100, 500], "days": [90, 365, 730], "concurrency": [1, 32, 128], "requests": 1000,
+              "calls": 5000},
+}
+
+def _summary(samples: list) -> dict:
+    """Returns latency percentiles in milliseconds."""
+    ordered = sorted(samples)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 3)
+
+    return {"n": len(ordered), "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+            "p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99), "max_ms": round(ordered[-1] * 1000, 3)}
+
+def _history_frame(days: int):
+    """Builds a synthetic history DataFrame like ``parse_hourly`` returns."""
+    from benchmarks.bench_model_artifact import _history
+    return _history(days)
+
+async def _sink(rows):
+    return len(rows)
+
+async def _setup(latency: float, past_days: int = None):
+    """Points the shared HTTP client at a fresh fake upstream and resets the caches."""
+    upstream = create_app(latency=latency, past_days=past_days)
+    await weather_service.init_client(transport=httpx.ASGITransport(app=upstream))
+    weather_service._geo_cache.clear()
+    forecast_cache.clear_local()
+    return upstream
+
+async def _no_forecast(city: str):
+    return None
+
+async def bench_analyze(scale: dict, latency: float) -> dict:
+    """
+    Measures `/analyze` for a new city, then under concurrent repeated requests.
+
+    Repeated requests are measured twice per concurrency level. ``cached``
+    requests are answered from the forecast cache. ``uncached`` requests
+    bypass it and start with an empty geocoding cache, so each one geocodes,
+    fetches the current weather and predicts.
+    """
+    from app import main
+
+    await _setup(latency)
+    result = {"cached": {}, "uncached": {}}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as ac:
+        t0 = time.perf_counter()
+        resp = await ac.post("/analyze", json={"city_name": "Bench Town", "wait": 120})
+        result["first_request"] = {"status": resp.status_code, "ms": round((time.perf_counter() - t0) * 1000, 3)}
+
+        async def measure(concurrency: int, cached: bool) -> dict:
+            sem = asyncio.Semaphore(concurrency)
+            samples = []
+
+            async def one():
+                async with sem:
+                    if not cached:
+                        weather_service._geo_cache.clear()
+                    t = time.perf_counter()
+                    r = await ac.post("/analyze", json={"city_name": "Bench Town"})
+                    samples.append(time.perf_counter() - t)
+                    return r.status_code
+
+            forecast_cache.clear_local()
+            t0 = time.perf_counter()
+            statuses = await asyncio.gather(*(one() for _ in range(scale["requests"])))
+            wall = time.perf_counter() - t0
+            errors = sum(s != 200 for s in statuses)
+            return {**_summary(samples), "rps": round(len(samples) / wall, 1), "errors": errors}
+
+        for concurrency in scale["concurrency"]:
+            result["cached"][f"concurrency_{concurrency}"] = await measure(concurrency, cached=True)
+            get_forecast, forecast_cache.get_forecast = forecast_cache.get_forecast, _no_forecast
+            try:
+                result["uncached"][f"concurrency_{concurrency}"] = await measure(concurrency, cached=False)
+            finally:
+                forecast_cache.get_forecast = get_forecast
+    await weather_service.close_client()
+    return result
+
+def bench_predict(scale: dict) -> dict:
+    """Measures single-row and 24-hour predictions per model size."""
+    result = {}
+    for days in scale["days"]:
+        city = f"Predict {days}"
+        ml_service.train_model_for_city(city, _history_frame(days))
+        ml_service.predict_horizon(city, 0, 24, 50, 5)
+        single, horizon = [], []
+        for i in range(scale["calls"]):
+            t = time.perf_counter()
+            ml_service.predict_temp(i * 3600, 50, 5, city)
+            single.append(time.perf_counter() - t)
+            t = time.perf_counter()
+            ml_service.predict_horizon(city, i * 3600, 24, 50, 5)
+            horizon.append(time.perf_counter() - t)
+        result[f"days_{days}"] = {"predict_temp": _summary(single), "predict_horizon": _summary(horizon)}
+    return result
+
+def bench_train(scale: dict) -> dict:
+    """Measures per-city training time as the history grows."""
+    result = {}
+    for days in scale["days"]:
+        df = _history_frame(days)
+        t0 = time.perf_counter()
+        ml_service.train_model_for_city(f"Train {days}", df)
+        result[f"days_{days}"] = {"rows": len(df), "seconds": round(time.perf_counter() - t0, 3)}
+    return result
+
+async def bench_monitor(scale: dict, latency: float) -> dict:
+    """Measures the global monitor task body cold (training every city) and warm."""
+    from app import worker
+
+    result = {}
+    for n in scale["cities"]:
+        upstream = await _setup(latency, past_days=scale["days"][0])
+        cities = [f"Monitor {n}-{i}" for i in range(n)]
+        runs = {}
+        for phase in ("cold", "warm"):
+            t0 = time.perf_counter()
+            await worker._monitor_cities(cities)
+            runs[f"{phase}_seconds"] = round(time.perf_counter() - t0, 3)
+        runs["upstream_requests"] = dict(upstream.state.requests)
+        result[f"cities_{n}"] = runs
+        await weather_service.close_client()
+    return result
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+def run(scale_name: str, only: list, latency: float) -> dict:
+    """
+    Runs the selected benchmarks in an isolated model directory.
+
+    Returns:
+        dict: Run metadata and one result object per benchmark.
+    """
+    from app import worker
+
+    scale = SCALES[scale_name]
+    report = {
+        "meta": {
+            "commit": _git_commit(), "scale": scale_name, "latency_s": latency, "python": platform.python_version(),
+            "cpus": os.cpu_count(), "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": {},
+    }
+    ingest_service.insert_measurements = _sink
+    worker.insert_measurements = _sink
+    with tempfile.TemporaryDirectory() as tmp:
+        ml_service.MODELS_DIR = tmp
+        os.environ["MODELS_DIR"] = tmp  # for spawned training pool processes
+        history_store.HISTORY_DIR = os.path.join(tmp, "history")
+        ml_service.registry.clear()
+        if "predict" in only:
+            report["results"]["predict"] = bench_predict(scale)
+        if "train" in only:
+            report["results"]["train"] = bench_train(scale)
+        if "analyze" in only:
+            report["results"]["analyze"] = worker._run(bench_analyze(scale, latency))
+        if "monitor" in only:
+            report["results"]["monitor"] = worker._run(bench_monitor(scale, latency))
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--only", nargs="+", choices=["analyze", "predict", "train", "monitor"],
+                        default=["analyze", "predict", "train", "monitor"])
+    parser.add_argument("--latency", type=float, default=0.02, help="fake upstream latency per request in seconds")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+    report = run(args.scale, args.only, args.latency)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+if __name__ == "__main__":
+    main()
@@ -15,10 +15,25 @@ city = st.text_input("Enter City Name", "London")
 run = st.button("Analyze")
 if run and city:
     try:
-        with httpx.Client() as c:
-            resp = c.post("http://web:8000/analyze", json={"city_name": city}, timeout=60)
-        st.session_state["analysis"] = resp.json()
-        st.switch_page("pages/1_City_Intelligence.py")
+        known = st.session_state.setdefault("analyses", {})
+        headers = {"If-None-Match": known[city][0]} if city in known else {}
+        with httpx.Client(base_url="http://web:8000", timeout=60) as c, st.spinner("Analyzing..."):
+            resp = c.post("/analyze", json={"city_name": city, "wait": 20}, headers=headers)
+            while resp.status_code == 202:
+                job = c.get(resp.json()["status_url"], params={"wait": 20}).json()
+                if job["status"] == "failed":
+                    break
+                if job["status"] == "succeeded":
+                    resp = c.post("/analyze", json={"city_name": city})
+        if resp.status_code == 304:
+            st.session_state["analysis"] = known[city][1]
+            st.switch_page("pages/1_City_Intelligence.py")
+        elif resp.status_code == 200:
+            known[city] = (resp.headers.get("etag"), resp.json())
+            st.session_state["analysis"] = known[city][1]
+            st.switch_page("pages/1_City_Intelligence.py")
+        else:
+            st.error(resp.json().get("detail", "analysis failed") if resp.status_code != 202 else "training failed")
     except Exception as e:
         st.error(str(e))
 
@@ -3,20 +3,22 @@ sys.path.append('/app')
 import streamlit as st
 import altair as alt
 import pandas as pd
-from dashboard.utils import get_data
+from dashboard.utils import get_cities, get_data
 
 st.set_page_config(page_title="Analytics", page_icon="bar_chart", layout="wide")
 
 st.title("📊 Historical Analytics")
 
-df = get_data()
+st.sidebar.header("Filter Data")
+cities = get_cities()
+selected_cities = st.sidebar.multiselect("Select Cities", cities, default=cities)
+days = st.sidebar.slider("Days", 1, 365, 30)
+points = st.sidebar.select_slider("Points per city", [100, 250, 500, 1000, 2000], value=500)
 
-if not df.empty:
-    st.sidebar.header("Filter Data")
-    cities = df["city"].unique().tolist()
-    selected_cities = st.sidebar.multiselect("Select Cities", cities, default=cities)
+df = get_data(tuple(selected_cities), days, points) if selected_cities else pd.DataFrame()
 
-    filtered_df = df[df["city"].isin(selected_cities)]
+if not df.empty:
+    filtered_df = df
 
     st.subheader("Temperature Comparison")
     chart = (
@@ -1,29 +1,36 @@
 import sys
 sys.path.append('/app')
-import os
 import json
+import httpx
 import streamlit as st
-import redis
+from dashboard.utils import API_URL, get_monitor
 
 st.set_page_config(page_title="Global Monitor", page_icon="globe", layout="wide")
 
-rurl = os.getenv("REDIS_URL", "redis://redis:6379/0")
-r = redis.Redis.from_url(rurl)
-keys = [k.decode() for k in r.keys("city_intel:*")]
+def render(placeholder, cities):
+    with placeholder.container():
+        if not cities:
+            st.info("No cached cities yet.")
+            return
+        cols = st.columns(3)
+        for i, data in enumerate(sorted(cities.values(), key=lambda d: d.get("city") or "")):
+            preds = data.get("predictions") or []
+            latest = preds[-1]["temperature"] if preds else "n/a"
+            cols[i % 3].metric(data.get("city"), f"{latest} °C")
 
 st.title("Global Monitor")
-if not keys:
-    st.info("No cached cities yet.")
-else:
-    cols = st.columns(3)
-    i = 0
-    for key in keys:
-        raw = r.get(key)
-        if not raw:
-            continue
-        data = json.loads(raw)
-        city = data.get("city")
-        preds = data.get("predictions") or []
-        latest = preds[-1]["temperature"] if preds else "n/a"
-        cols[i % 3].metric(city, f"{latest} °C")
-        i += 1
+live = st.sidebar.toggle("Live updates", value=False)
+cities = {d["city"]: d for d in get_monitor()}
+placeholder = st.empty()
+render(placeholder, cities)
+
+if live:
+    try:
+        with httpx.stream("GET", f"{API_URL}/stream", timeout=httpx.Timeout(60, read=None)) as resp:
+            for line in resp.iter_lines():
+                if line.startswith("data: "):
+                    data = json.loads(line[len("data: "):])
+                    cities[data["city"]] = data
+                    render(placeholder, cities)
+    except Exception as e:
+        st.error(f"Live updates disconnected: {e}")
@@ -1,16 +1,50 @@
 import os
+from datetime import datetime, timedelta
+import httpx
 import pandas as pd
-import psycopg2
 import streamlit as st
 
-def get_data():
-    dsn = os.getenv("DATABASE_URL", "postgresql://meteo:meteo_pass@db/meteo_mind")
+API_URL = os.getenv("API_URL", "http://web:8000")
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_cities():
+    try:
+        resp = httpx.get(f"{API_URL}/analytics/cities", timeout=30)
+        resp.raise_for_status()
+        return resp.json()["cities"]
+    except Exception as e:
+        st.error(f"Connection error: {e}")
+        return []
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_data(cities: tuple, days: int = 30, points: int = 500):
+    end = datetime.utcnow().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    params = {
+        "city": list(cities),
+        "start": (end - timedelta(days=days)).isoformat(),
+        "end": end.isoformat(),
+        "points": points,
+    }
     try:
-        conn = psycopg2.connect(dsn)
-        query = "SELECT city, timestamp, temperature, humidity, wind_speed FROM weather_measurements ORDER BY timestamp DESC"
-        df = pd.read_sql(query, conn)
-        conn.close()
-        return df
+        resp = httpx.get(f"{API_URL}/analytics", params=params, timeout=30)
+        resp.raise_for_status()
+        series = resp.json()["series"]
     except Exception as e:
         st.error(f"Connection error: {e}")
         return pd.DataFrame()
+    frames = [pd.DataFrame(cols).assign(city=city) for city, cols in series.items()]
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    df["timestamp"] = pd.to_datetime(df["timestamp"], unit="s")
+    return df
+
+@st.cache_data(ttl=30, show_spinner=False)
+def get_monitor():
+    try:
+        resp = httpx.get(f"{API_URL}/monitor", params={"field": ["predictions", "generated_at"]}, timeout=30)
+        resp.raise_for_status()
+        return resp.json()["cities"]
+    except Exception as e:
+        st.error(f"Connection error: {e}")
+        return []
@@ -0,0 +1,40 @@
+"""
+Alembic environment of the MeteoMind database.
+
+Migrations run against ``DATABASE_URL`` with the async engine used by the
+app. ``alembic upgrade head --sql`` renders them as SQL without a database.
+"""
+import asyncio
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.core.db import DATABASE_URL
+from app.models.weather import Base
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+target_metadata = Base.metadata
+
+def run_migrations_offline():
+    """Emits the migrations as SQL."""
+    context.configure(url=DATABASE_URL, target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+def _run(connection):
+    context.configure(connection=connection, target_metadata=target_metadata)
+    with context.begin_transaction():
+        context.run_migrations()
+
+async def run_migrations_online():
+    """Applies the migrations over an async connection."""
+    engine = create_async_engine(DATABASE_URL)
+    async with engine.connect() as conn:
+        await conn.run_sync(_run)
+    await engine.dispose()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_migrations_online())
@@ -0,0 +1,31 @@
+"""Initial schema: the weather_measurements table as the former ``create_all`` built it
+
+Databases created by an earlier version, which built this table at
+startup, match this revision. Mark them with ``alembic stamp 0001`` and
+then run ``alembic upgrade head``.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "weather_measurements",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("city", sa.String(100), nullable=False),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.Column("temperature", sa.Float(), nullable=False),
+        sa.Column("humidity", sa.Float(), nullable=False),
+        sa.Column("wind_speed", sa.Float(), nullable=False),
+    )
+
+def downgrade():
+    op.drop_table("weather_measurements")
@@ -0,0 +1,68 @@
+"""Unique (city, timestamp) measurements, a BRIN index on timestamp, rollup tables
+
+Measurements stored more than once for the same city and timestamp are
+deleted first, keeping the earliest row, so the unique constraint can be
+added to an existing table.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def _rollup_table(name: str):
+    op.create_table(
+        name,
+        sa.Column("city", sa.String(100), primary_key=True),
+        sa.Column("bucket", sa.DateTime(), primary_key=True),
+        sa.Column("samples", sa.Integer(), nullable=False),
+        sa.Column("temperature_avg", sa.Float(), nullable=False),
+        sa.Column("temperature_min", sa.Float(), nullable=False),
+        sa.Column("temperature_max", sa.Float(), nullable=False),
+        sa.Column("humidity_avg", sa.Float(), nullable=False),
+        sa.Column("wind_speed_avg", sa.Float(), nullable=False),
+    )
+    op.create_index(f"ix_{name}_bucket", name, ["bucket"])
+
+def _delete_duplicates():
+    if op.get_context().dialect.name == "postgresql":
+        op.execute(
+            "DELETE FROM weather_measurements AS d USING weather_measurements AS k "
+            "WHERE d.city = k.city AND d.timestamp = k.timestamp AND d.id > k.id"
+        )
+    else:
+        op.execute(
+            "DELETE FROM weather_measurements WHERE id NOT IN "
+            "(SELECT min(id) FROM weather_measurements GROUP BY city, timestamp)"
+        )
+
+def upgrade():
+    _delete_duplicates()
+    with op.batch_alter_table("weather_measurements") as batch:
+        batch.create_unique_constraint("uq_weather_measurements_city_timestamp", ["city", "timestamp"])
+    op.create_index("ix_weather_measurements_timestamp_brin", "weather_measurements", ["timestamp"],
+                    postgresql_using="brin")
+    _rollup_table("weather_rollup_hourly")
+    _rollup_table("weather_rollup_daily")
+    op.create_table(
+        "rollup_state",
+        sa.Column("name", sa.String(32), primary_key=True),
+        sa.Column("last_id", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+
+def downgrade():
+    op.drop_table("rollup_state")
+    op.drop_index("ix_weather_rollup_daily_bucket", table_name="weather_rollup_daily")
+    op.drop_table("weather_rollup_daily")
+    op.drop_index("ix_weather_rollup_hourly_bucket", table_name="weather_rollup_hourly")
+    op.drop_table("weather_rollup_hourly")
+    op.drop_index("ix_weather_measurements_timestamp_brin", table_name="weather_measurements")
+    with op.batch_alter_table("weather_measurements") as batch:
+        batch.drop_constraint("uq_weather_measurements_city_timestamp", type_="unique")
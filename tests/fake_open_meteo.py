@@ -0,0 +1,115 @@
+"""
+A local stand-in for the Open-Meteo geocoding and forecast APIs.
+
+The app serves deterministic data for any city and location, supports
+multi-location requests like the real forecast endpoint, and can add an
+artificial latency per request. Tests mount it through
+``httpx.ASGITransport``; benchmarks can also serve it with uvicorn:
+
+    python -m tests.fake_open_meteo --port 8099 --latency 0.05
+
+and point the app at it with ``OPEN_METEO_GEOCODING_URL`` and
+``OPEN_METEO_FORECAST_URL``.
+"""
+import argparse
+import asyncio
+import time
+import zlib
+from fastapi import FastAPI, HTTPException, Request
+
+def _city_coords(name: str) -> tuple:
+    """Derives stable pseudo coordinates from a city name."""
+    h = zlib.crc32(name.casefold().encode())
+    return round((h % 14000) / 100 - 70, 4), round((h // 14000 % 36000) / 100 - 180, 4)
+
+def _hourly(lat: float, lon: float, start: int, hours: int) -> dict:
+    """Builds a smooth, location-dependent hourly series starting at ``start``."""
+    times, temps, hums, winds = [], [], [], []
+    base = 15 - abs(lat) / 5
+    for i in range(hours):
+        ts = start + i * 3600
+        hour = ts // 3600 % 24
+        times.append(time.strftime("%Y-%m-%dT%H:%M", time.gmtime(ts)))
+        temps.append(round(base + 6 * ((hour - 14) % 24 < 12) - 3 + (lon % 3), 1))
+        hums.append(50 + (hour * 7 + int(lat)) % 40)
+        winds.append(round(3 + (hour + int(lon)) % 10 * 0.8, 1))
+    return {"time": times, "temperature_2m": temps, "relative_humidity_2m": hums, "wind_speed_10m": winds}
+
+def create_app(latency: float = 0.0, unknown_cities=("Atlantis",), forecast_days: int = 7,
+               past_days: int = None) -> FastAPI:
+    """
+    Creates the fake Open-Meteo application.
+
+    Args:
+        latency (float): Seconds to sleep before answering each request.
+        unknown_cities (tuple): City names the geocoder reports as not found.
+        forecast_days (int): Future days included in hourly responses unless the request sets them.
+        past_days (int): Past days in hourly responses regardless of the
+            request, to scale history payloads; None follows the request.
+
+    Returns:
+        FastAPI: The application. ``app.state.requests`` counts requests per path.
+    """
+    app = FastAPI()
+    app.state.requests = {}
+    unknown = {c.casefold() for c in unknown_cities}
+
+    async def _tick(path: str):
+        app.state.requests[path] = app.state.requests.get(path, 0) + 1
+        if latency:
+            await asyncio.sleep(latency)
+
+    @app.get("/v1/search")
+    async def search(name: str, count: int = 1, language: str = "en"):
+        await _tick("/v1/search")
+        if name.casefold() in unknown:
+            return {"generationtime_ms": 0.1}
+        lat, lon = _city_coords(name)
+        return {"results": [{"name": name, "latitude": lat, "longitude": lon}]}
+
+    @app.get("/v1/forecast")
+    async def forecast(request: Request):
+        await _tick("/v1/forecast")
+        q = request.query_params
+        try:
+            lats = [float(x) for x in q["latitude"].split(",")]
+            lons = [float(x) for x in q["longitude"].split(",")]
+        except (KeyError, ValueError):
+            raise HTTPException(status_code=400, detail="invalid coordinates")
+        if len(lats) != len(lons):
+            raise HTTPException(status_code=400, detail="latitude and longitude lengths differ")
+        now = int(time.time()) // 3600 * 3600
+        days_back = int(q.get("past_days", 0)) if past_days is None else past_days
+        items = []
+        for lat, lon in zip(lats, lons):
+            item = {"latitude": lat, "longitude": lon, "timezone": "UTC"}
+            if "current" in q:
+                series = _hourly(lat, lon, now, 1)
+                item["current"] = {
+                    "time": series["time"][0],
+                    "temperature_2m": series["temperature_2m"][0],
+                    "relative_humidity_2m": series["relative_humidity_2m"][0],
+                    "wind_speed_10m": series["wind_speed_10m"][0],
+                }
+            if "hourly" in q:
+                start = now // 86400 * 86400 - days_back * 86400
+                days_ahead = int(q.get("forecast_days", forecast_days))
+                item["hourly"] = _hourly(lat, lon, start, (days_back + days_ahead) * 24)
+            items.append(item)
+        return items[0] if len(items) == 1 else items
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the fake Open-Meteo API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--past-days", type=int, default=None)
+    args = parser.parse_args()
+    import uvicorn
+    uvicorn.run(create_app(latency=args.latency, past_days=args.past_days), host=args.host, port=args.port,
+                log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+In-memory stand-in for the subset of ``redis.asyncio.Redis`` the app uses.
+
+Values are stored as bytes like the real client returns them. Expiry
+arguments are accepted and ignored.
+"""
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.zsets = {}
+        self.published = []
+
+    @staticmethod
+    def _bytes(value):
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = self._bytes(value)
+        return True
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(k, None) is not None for k in keys)
+
+    async def mget(self, keys):
+        return [self.data.get(k) for k in keys]
+
+    async def zadd(self, key, mapping):
+        zset = self.zsets.setdefault(key, {})
+        added = sum(m not in zset for m in mapping)
+        zset.update({self._bytes(m): float(s) for m, s in mapping.items()})
+        return added
+
+    async def zrange(self, key, start, end, withscores=False):
+        items = sorted(self.zsets.get(key, {}).items(), key=lambda kv: (kv[1], kv[0]))
+        items = items[start:] if end == -1 else items[start:end + 1]
+        return items if withscores else [m for m, _ in items]
+
+    async def zrem(self, key, *members):
+        zset = self.zsets.get(key, {})
+        return sum(zset.pop(self._bytes(m), None) is not None for m in members)
+
+    async def zremrangebyscore(self, key, low, high):
+        zset = self.zsets.get(key, {})
+        low, high = float(low), float(high)
+        drop = [m for m, s in zset.items() if low <= s <= high]
+        for m in drop:
+            del zset[m]
+        return len(drop)
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.redis, name)
+
+        def queue(*args, **kwargs):
+            self.calls.append((method, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self):
+        results = [await method(*args, **kwargs) for method, args, kwargs in self.calls]
+        self.calls = []
+        return results
@@ -0,0 +1,45 @@
+from datetime import datetime
+import numpy as np
+from fastapi.testclient import TestClient
+from app import main
+from app.services import analytics_service
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50)
+    y[437] = 25.0
+    idx = analytics_service.lttb(x, y, 50)
+    assert len(idx) == 50
+    assert idx[0] == 0 and idx[-1] == 999
+    assert 437 in idx
+    assert np.all(np.diff(idx) > 0)
+    assert len(analytics_service.lttb(x[:10], y[:10], 50)) == 10
+
+def test_pick_source_uses_coarsest_sufficient_table():
+    assert analytics_service._pick_source(60)[0] == "raw"
+    assert analytics_service._pick_source(5 * 3600)[0] == "hourly"
+    assert analytics_service._pick_source(3 * 86400)[0] == "daily"
+
+def test_analytics_endpoint_caches_by_query(monkeypatch):
+    calls = []
+
+    async def fake_fetch(cities, start, end, points, method):
+        calls.append((cities, start, end, points, method))
+        return {"source": "hourly", "series": {"Oslo": {"timestamp": [0.0], "temperature": [1.0]}}}
+
+    monkeypatch.setattr(analytics_service, "fetch_series", fake_fetch)
+    monkeypatch.setattr(analytics_service, "get_redis", lambda: None)
+    analytics_service._cache.clear()
+    client = TestClient(main.app)
+    params = {"city": ["Oslo", "Lima"], "start": "2025-01-01T00:00:00", "end": "2025-02-01T00:00:00", "points": 200}
+    first = client.get("/analytics", params=params)
+    second = client.get("/analytics", params={**params, "city": ["Lima", "Oslo"]})
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert len(calls) == 1
+    assert calls[0][1:] == (datetime(2025, 1, 1), datetime(2025, 2, 1), 200, "bucket")
+    shifted = client.get("/analytics", params={**params, "start": "2025-01-01T00:00:00+02:00"})
+    assert shifted.status_code == 200
+    assert calls[-1][1:3] == (datetime(2024, 12, 31, 22), datetime(2025, 2, 1))
+    bad = client.get("/analytics", params={**params, "end": "2024-12-01T00:00:00"})
+    assert bad.status_code == 422
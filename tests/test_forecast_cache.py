@@ -0,0 +1,48 @@
+import asyncio
+import json
+import time
+import httpx
+from app import main
+from app.services import forecast_cache
+from tests.fake_redis import FakeRedis
+
+def test_monitor_lists_tracked_cities_with_projection(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(forecast_cache, "get_redis", lambda: fake)
+    forecast_cache.clear_local()
+
+    async def scenario():
+        for city in ["Oslo", "Lima", "Quito"]:
+            await forecast_cache.store_forecast({"city": city, "predictions": [{"hour": 1}], "metrics": {"mae": 1}})
+        fake.data.pop(forecast_cache.forecast_key("Quito"))
+        fake.zsets["monitor:cities"][b"Stale"] = time.time() - 2 * forecast_cache.FORECAST_HARD_TTL
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as ac:
+            full = await ac.get("/monitor")
+            slim = await ac.get("/monitor", params={"field": ["predictions"]})
+        return full, slim
+
+    full, slim = asyncio.run(scenario())
+    assert full.json()["count"] == 2
+    assert [c["city"] for c in full.json()["cities"]] == ["Lima", "Oslo"]
+    assert full.json()["cities"][0]["metrics"] == {"mae": 1}
+    assert slim.json()["cities"][1] == {"city": "Oslo", "predictions": [{"hour": 1}]}
+    assert sorted(fake.zsets["monitor:cities"]) == [b"lima", b"oslo"]
+
+def test_monitor_is_empty_without_redis(monkeypatch):
+    monkeypatch.setattr(forecast_cache, "get_redis", lambda: None)
+    assert json.loads(asyncio.run(forecast_cache.list_forecasts())) == {"count": 0, "cities": []}
+
+def test_forecast_lookup_ignores_case_and_spacing(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(forecast_cache, "get_redis", lambda: fake)
+    forecast_cache.clear_local()
+
+    async def scenario():
+        stored = await forecast_cache.store_forecast({"city": "New York", "predictions": []})
+        local = await forecast_cache.get_forecast("new york")
+        forecast_cache.clear_local()
+        return stored, local, await forecast_cache.get_forecast("  NEW   york ")
+
+    stored, local, remote = asyncio.run(scenario())
+    assert local["etag"] == remote["etag"] == stored["etag"]
+    assert list(fake.data) == ["city_intel:new york"]
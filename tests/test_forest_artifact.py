@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from app.services import ml_service
+from app.services.forest_artifact import ForestPredictor, export_forest, load_forest
+
+def _frame(n, seed):
+    rng = np.random.default_rng(seed)
+    ts = 1.7e9 + np.arange(n) * 3600 + rng.integers(-900, 900, n)
+    return pd.DataFrame({
+        "timestamp": ts,
+        "hour": (ts // 3600) % 24,
+        "humidity": rng.uniform(20, 100, n),
+        "wind_speed": rng.uniform(0, 30, n),
+    })
+
+def test_forest_artifact_matches_sklearn(tmp_path):
+    X = _frame(400, 0)
+    y = np.sin(X["timestamp"] / 86400 * 2 * np.pi) * 5 + X["humidity"] / 10
+    model = RandomForestRegressor(n_estimators=30, random_state=42).fit(X, y)
+    path = str(tmp_path / "city.forest")
+    assert export_forest(model, path)
+    forest = load_forest(path)
+    assert isinstance(forest._a["threshold"], np.memmap)
+    X_new = _frame(300, 1)
+    X_new.loc[:10, "humidity"] = X.loc[:10, "humidity"].to_numpy()
+    np.testing.assert_allclose(forest.predict(X_new), model.predict(X_new), rtol=1e-5, atol=1e-4)
+    assert list(forest.feature_names_in_) == list(X.columns)
+
+def test_export_skips_unsupported_estimators(tmp_path):
+    model = LinearRegression().fit([[0.0], [1.0]], [0.0, 1.0])
+    assert not export_forest(model, str(tmp_path / "linear.forest"))
+    assert not (tmp_path / "linear.forest").exists()
+
+def test_city_models_are_served_from_forest_artifact(tmp_path, monkeypatch):
+    monkeypatch.setattr(ml_service, "MODELS_DIR", str(tmp_path))
+    X = _frame(48, 2)
+    df = X.assign(temperature=np.linspace(0, 10, 48))
+    assert ml_service.train_model_for_city("Forest City", df)
+    assert (tmp_path / "forest-city.forest").exists()
+    model, metrics = ml_service.load_model_for_city("Forest City")
+    assert isinstance(model, ForestPredictor)
+    assert len(ml_service.predict_horizon("Forest City", 1.7e9, 24, 50.0, 5.0)) == 24
@@ -0,0 +1,87 @@
+import asyncio
+import numpy as np
+import pandas as pd
+from app.services import history_store, weather_service
+
+HOUR = 3600
+NOW = 1_760_000_000 // HOUR * HOUR
+
+def _frame(start: int, hours: int) -> pd.DataFrame:
+    ts = np.arange(start, start + hours * HOUR, HOUR, dtype=np.int64)
+    return pd.DataFrame({
+        "timestamp": ts,
+        "hour": ((ts // HOUR) % 24).astype(np.int32),
+        "humidity": np.full(hours, 60, dtype=np.float32),
+        "wind_speed": np.full(hours, 3, dtype=np.float32),
+        "temperature": (ts // HOUR % 17).astype(np.float32),
+    })
+
+def test_append_keeps_only_new_observed_hours(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_store, "HISTORY_DIR", str(tmp_path))
+    first = _frame(NOW - 47 * HOUR, 48 + 24)
+    first.loc[3, "temperature"] = np.nan
+    appended = history_store.append("Oslo", first, until=NOW)
+    assert len(appended) == 47
+    assert history_store.high_water_mark("Oslo") == NOW
+    appended = history_store.append("Oslo", _frame(NOW - 10 * HOUR, 14), until=NOW + 3 * HOUR)
+    assert list(appended["timestamp"]) == [NOW + HOUR, NOW + 2 * HOUR, NOW + 3 * HOUR]
+    window = history_store.read("Oslo", days=1, until=NOW + 3 * HOUR)
+    assert list(window.columns) == list(weather_service.parse_hourly({}).columns)
+    assert window["timestamp"].iloc[0] == NOW + 3 * HOUR - 24 * HOUR
+    assert len(window) == 25
+    assert window["hour"].tolist() == ((window["timestamp"] // HOUR) % 24).tolist()
+    assert not window["temperature"].to_numpy().flags.writeable
+    assert history_store.read("Unknown City").empty
+
+def test_torn_append_is_ignored_and_repaired(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_store, "HISTORY_DIR", str(tmp_path))
+    history_store.append("Lima", _frame(NOW - 9 * HOUR, 10), until=NOW)
+    with open(history_store._path("Lima", "timestamp"), "ab") as f:
+        f.write(np.int64(NOW + HOUR).tobytes())
+    assert len(history_store.read("Lima", until=NOW + HOUR)) == 10
+    history_store.append("Lima", _frame(NOW + HOUR, 2), until=NOW + 2 * HOUR)
+    window = history_store.read("Lima", until=NOW + 2 * HOUR)
+    assert window["timestamp"].tolist()[-3:] == [NOW, NOW + HOUR, NOW + 2 * HOUR]
+    assert window["temperature"].iloc[-1] == (NOW + 2 * HOUR) // HOUR % 17
+
+def test_old_hours_are_compacted_past_the_retention(tmp_path, monkeypatch):
+    monkeypatch.setattr(history_store, "HISTORY_DIR", str(tmp_path))
+    monkeypatch.setattr(history_store, "HISTORY_RETENTION_DAYS", 1)
+    monkeypatch.setattr(weather_service, "HISTORY_PAST_DAYS", 1)
+    history_store.append("Quito", _frame(NOW - 10 * 24 * HOUR, 10 * 24 + 1), until=NOW)
+    assert history_store._rows("Quito") == 25
+    assert history_store.read("Quito", days=30, until=NOW)["timestamp"].iloc[0] == NOW - 24 * HOUR
+
+def test_sync_fetches_only_hours_after_the_high_water_mark(tmp_path, monkeypatch):
+    import httpx
+    from tests.fake_open_meteo import create_app
+
+    monkeypatch.setattr(history_store, "HISTORY_DIR", str(tmp_path))
+    monkeypatch.setattr(weather_service, "get_redis", lambda: None)
+    calls = []
+    fetch = weather_service.fetch_historical_training_data_batch
+
+    async def recording_fetch(locations, past_days=30, forecast_days=None):
+        calls.append((len(locations), past_days, forecast_days))
+        return await fetch(locations, past_days, forecast_days)
+
+    monkeypatch.setattr(weather_service, "fetch_historical_training_data_batch", recording_fetch)
+    located = {"Oslo": {"lat": 59.9, "lon": 10.7}, "Perth": {"lat": -31.9, "lon": 115.8}}
+
+    async def scenario():
+        await weather_service.init_client(transport=httpx.ASGITransport(app=create_app()))
+        try:
+            first = await history_store.sync_histories(located, days=5)
+            second = await history_store.sync_histories(located, days=5)
+        finally:
+            await weather_service.close_client()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert calls == [(2, 5, 1), (2, 0, 1)]
+    window, appended = first["Oslo"]
+    assert 5 * 24 <= len(window) <= 5 * 24 + 1
+    assert len(appended) >= len(window)
+    window, appended = second["Oslo"]
+    assert appended.empty
+    assert window["timestamp"].tolist() == first["Oslo"][0]["timestamp"].tolist()
@@ -0,0 +1,45 @@
+import asyncio
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from app.services import ingest_service
+
+def test_history_rows_drop_future_and_incomplete_hours():
+    df = pd.DataFrame({
+        "timestamp": np.array([0, 3600, 7200], dtype=np.int64),
+        "hour": np.array([0, 1, 2], dtype=np.int32),
+        "humidity": np.array([80, np.nan, 70], dtype=np.float32),
+        "wind_speed": np.array([3, 4, 5], dtype=np.float32),
+        "temperature": np.array([12.3, 2.5, 3.5], dtype=np.float32),
+    })
+    rows = ingest_service.history_rows("Oslo", df, until=3600)
+    assert len(rows) == 1
+    assert rows[0] == {
+        "city": "Oslo", "timestamp": datetime(1970, 1, 1), "temperature": 12.3, "humidity": 80.0, "wind_speed": 3.0,
+    }
+
+def test_buffer_flushes_by_size_and_on_stop(monkeypatch):
+    batches = []
+
+    async def fake_insert(rows):
+        batches.append(rows)
+        return len(rows)
+
+    monkeypatch.setattr(ingest_service, "insert_measurements", fake_insert)
+    buffer = ingest_service.MeasurementBuffer(flush_rows=2, flush_interval=60)
+    current = {"time": "2025-12-03T15:00", "temperature": 5.0, "humidity": 60.0, "wind_speed": 3.0}
+
+    async def main():
+        buffer.start()
+        buffer.add(ingest_service.current_row("Oslo", current))
+        buffer.add(ingest_service.current_row("Oslo", {**current, "humidity": None}))
+        assert batches == []
+        buffer.add(ingest_service.current_row("Lima", current))
+        await asyncio.sleep(0)
+        buffer.add(ingest_service.current_row("Quito", current))
+        await buffer.stop()
+
+    asyncio.run(main())
+    assert [[r["city"] for r in b] for b in batches] == [["Oslo", "Lima"], ["Quito"]]
+    assert batches[0][0]["timestamp"] == datetime(2025, 12, 3, 15)
+    assert buffer.flushed == 3
@@ -1,6 +1,7 @@
 import pytest
 from httpx import AsyncClient, ASGITransport
 from app.main import app
+import json
 import pandas as pd
 
 @pytest.mark.asyncio
@@ -30,3 +31,261 @@ async def test_analyze_mocked(monkeypatch):
     assert js["city"] == "Warsaw"
     assert len(js["predictions"]) == 24
     assert "metrics" in js
+
+def test_analyze_skips_history_when_model_exists(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app import main
+    from app.services import ml_service
+
+    monkeypatch.setattr(ml_service, "MODELS_DIR", str(tmp_path))
+    df = pd.DataFrame({
+        "timestamp": list(range(1, 13)),
+        "hour": list(range(12)),
+        "humidity": [60.0] * 12,
+        "wind_speed": [3.0] * 12,
+        "temperature": [5.0 + i for i in range(12)],
+    })
+    assert ml_service.train_model_for_city("Warsaw", df)
+
+    async def fake_coords(city_name: str):
+        return {"lat": 52.0, "lon": 21.0, "name": city_name}
+
+    async def fake_current(lat: float, lon: float):
+        return {"time": "2025-12-03T00:00", "temperature": 5.0, "humidity": 60.0, "wind_speed": 3.0}
+
+    async def no_hist(city: str, lat: float, lon: float):
+        raise AssertionError("history must not be fetched when a model exists")
+
+    monkeypatch.setattr(main, "get_coordinates", fake_coords)
+    monkeypatch.setattr(main, "fetch_current_weather", fake_current)
+    monkeypatch.setattr(main.training_jobs.history_store, "load_history", no_hist)
+    monkeypatch.setattr(main.forecast_cache, "get_redis", lambda: None)
+    main.forecast_cache.clear_local()
+    resp = TestClient(main.app).post("/analyze", json={"city_name": "Warsaw"})
+    assert resp.status_code == 200
+    assert len(resp.json()["predictions"]) == 24
+
+def test_analyze_trains_new_city_once_in_background(tmp_path, monkeypatch):
+    import asyncio
+    from app import main
+    from app.services import ml_service, training_jobs
+
+    monkeypatch.setattr(ml_service, "MODELS_DIR", str(tmp_path))
+    monkeypatch.setattr(training_jobs, "get_redis", lambda: None)
+    monkeypatch.setattr(main.forecast_cache, "get_redis", lambda: None)
+    main.forecast_cache.clear_local()
+    monkeypatch.setattr(training_jobs, "_pool", None)
+    monkeypatch.setattr(training_jobs, "JOB_POLL_INTERVAL", 0.01)
+    history_calls = []
+
+    async def fake_coords(city_name: str):
+        return {"lat": 52.0, "lon": 21.0, "name": city_name}
+
+    async def fake_current(lat: float, lon: float):
+        return {"time": "2025-12-03T00:00", "temperature": 5.0, "humidity": 60.0, "wind_speed": 3.0}
+
+    async def fake_hist(city: str, lat: float, lon: float):
+        history_calls.append((lat, lon))
+        await asyncio.sleep(0.05)
+        return pd.DataFrame({
+            "timestamp": list(range(1, 25)),
+            "hour": list(range(24)),
+            "humidity": [60.0] * 24,
+            "wind_speed": [3.0] * 24,
+            "temperature": [5.0 + i % 5 for i in range(24)],
+        })
+
+    async def fake_fit(city, df):
+        return await asyncio.to_thread(ml_service.train_model_for_city, city, df, None, {"n_estimators": 10})
+
+    monkeypatch.setattr(main, "get_coordinates", fake_coords)
+    monkeypatch.setattr(main, "fetch_current_weather", fake_current)
+    monkeypatch.setattr(training_jobs.history_store, "load_history", fake_hist)
+    monkeypatch.setattr(training_jobs, "_fit_in_pool", fake_fit)
+
+    async def scenario():
+        async with AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as ac:
+            first, second = await asyncio.gather(
+                ac.post("/analyze", json={"city_name": "Gdansk"}),
+                ac.post("/analyze", json={"city_name": "Gdansk"}),
+            )
+            job_id = first.json()["job"]["id"]
+            status = await ac.get(f"/jobs/{job_id}", params={"wait": 10})
+            ready = await ac.post("/analyze", json={"city_name": "Gdansk"})
+            missing = await ac.get("/jobs/unknown")
+        return first, second, status, ready, missing
+
+    first, second, status, ready, missing = asyncio.run(scenario())
+    assert first.status_code == second.status_code == 202
+    assert first.headers["location"] == f"/jobs/{first.json()['job']['id']}"
+    assert second.json()["job"]["id"] == first.json()["job"]["id"]
+    assert status.json()["status"] == "succeeded"
+    assert ready.status_code == 200 and len(ready.json()["predictions"]) == 24
+    assert len(history_calls) == 1
+    assert missing.status_code == 404
+
+def test_analyze_rejects_non_numeric_wait():
+    from fastapi.testclient import TestClient
+    from app import main
+
+    resp = TestClient(main.app).post("/analyze", json={"city_name": "London", "wait": "abc"})
+    assert resp.status_code == 422
+
+def test_lock_is_retried_when_it_expires_before_reading_the_holder(monkeypatch):
+    import asyncio
+    from app.services import training_jobs
+    from tests.fake_redis import FakeRedis
+
+    class ExpiringRedis(FakeRedis):
+        async def get(self, key):
+            if self.data.pop(key, None) == b"job-a":
+                return None
+            return await super().get(key)
+
+    redis = ExpiringRedis()
+    monkeypatch.setattr(training_jobs, "get_redis", lambda: redis)
+    monkeypatch.setattr(training_jobs, "_locks", {})
+    redis.data[training_jobs.lock_key("Lodz")] = b"job-a"
+    assert asyncio.run(training_jobs._acquire("Lodz", "job-b")) is None
+    assert redis.data[training_jobs.lock_key("Lodz")] == b"job-b"
+
+def test_submit_never_takes_over_a_lock_held_by_another_job(monkeypatch):
+    import asyncio
+    from app.services import training_jobs
+    from tests.fake_redis import FakeRedis
+
+    redis = FakeRedis()
+    started = []
+
+    async def fake_run_job(job, lat, lon, fit):
+        started.append(job["id"])
+
+    monkeypatch.setattr(training_jobs, "get_redis", lambda: redis)
+    monkeypatch.setattr(training_jobs, "_locks", {})
+    monkeypatch.setattr(training_jobs, "run_job", fake_run_job)
+    coords = {"lat": 1.0, "lon": 2.0}
+    redis.data[training_jobs.lock_key("Torun")] = b"other-node"
+
+    async def scenario():
+        unknown = await training_jobs.submit("Torun", coords)
+        redis.data[training_jobs.job_key("other-node")] = json.dumps({"id": "other-node", "status": "failed"}).encode()
+        finished = await training_jobs.submit("Torun", coords)
+        await asyncio.gather(*training_jobs._tasks)
+        return unknown, finished
+
+    unknown, finished = asyncio.run(scenario())
+    assert unknown["id"] == finished["id"] == "other-node"
+    assert redis.data[training_jobs.lock_key("Torun")] == b"other-node"
+    assert started == []
+    assert [k for k in redis.data if k.startswith("job:")] == [training_jobs.job_key("other-node")]
+
+def test_analyze_serves_cache_and_revalidates_stale_entries(monkeypatch):
+    import asyncio
+    import time
+    from app import main
+    from app.services import forecast_cache
+
+    from tests.fake_redis import FakeRedis
+
+    fake_redis = FakeRedis()
+    computed = []
+
+    async def fake_compute(city_name, wait=0):
+        computed.append(city_name)
+        return {"city": city_name, "predictions": [], "metrics": {}, "generated_at": time.time()}
+
+    monkeypatch.setattr(forecast_cache, "get_redis", lambda: fake_redis)
+    monkeypatch.setattr(forecast_cache, "FORECAST_LOCAL_TTL", 0)
+    monkeypatch.setattr(main, "_compute_analysis", fake_compute)
+    forecast_cache.clear_local()
+    stale = {
+        "city": "Riga", "predictions": [], "metrics": {},
+        "generated_at": time.time() - 2 * forecast_cache.FORECAST_SOFT_TTL,
+    }
+    fake_redis.data[forecast_cache.forecast_key("Riga")] = json.dumps(stale).encode()
+
+    async def scenario():
+        async with AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as ac:
+            first = await ac.post("/analyze", json={"city_name": "Riga"})
+            second = await ac.post("/analyze", json={"city_name": "Riga"})
+            await asyncio.gather(*forecast_cache._tasks)
+            fresh = await ac.post("/analyze", json={"city_name": "Riga"})
+            cond = await ac.post(
+                "/analyze", json={"city_name": "Riga"}, headers={"If-None-Match": fresh.headers["etag"]},
+            )
+        return first, second, fresh, cond
+
+    first, second, fresh, cond = asyncio.run(scenario())
+    assert first.headers["x-cache"] == second.headers["x-cache"] == "STALE"
+    assert first.json()["generated_at"] == stale["generated_at"]
+    assert computed == ["Riga"]
+    assert fresh.headers["x-cache"] == "HIT" and fresh.json()["generated_at"] > stale["generated_at"]
+    assert "max-age=" in fresh.headers["cache-control"]
+    assert cond.status_code == 304 and cond.content == b""
+
+def test_analyze_batch_streams_per_city_results(tmp_path, monkeypatch):
+    import asyncio
+    import time
+    from app import main
+    from app.services import forecast_cache, ml_service, training_jobs
+    from tests.fake_redis import FakeRedis
+
+    monkeypatch.setattr(ml_service, "MODELS_DIR", str(tmp_path))
+    fake_redis = FakeRedis()
+    monkeypatch.setattr(forecast_cache, "get_redis", lambda: fake_redis)
+    monkeypatch.setattr(training_jobs, "get_redis", lambda: None)
+    forecast_cache.clear_local()
+    df = pd.DataFrame({
+        "timestamp": list(range(1, 13)),
+        "hour": list(range(12)),
+        "humidity": [60.0] * 12,
+        "wind_speed": [3.0] * 12,
+        "temperature": [5.0 + i for i in range(12)],
+    })
+    assert ml_service.train_model_for_city("Krakow", df, params={"n_estimators": 10})
+    cached = {"city": "Riga", "predictions": [], "metrics": {}, "generated_at": time.time()}
+    fake_redis.data[forecast_cache.forecast_key("Riga")] = json.dumps(cached).encode()
+    batch_calls = []
+
+    async def fake_coords(city_name: str):
+        if city_name == "Gdansk":
+            await asyncio.sleep(0.2)
+        return None if city_name == "Atlantis" else {"lat": 50.0, "lon": 20.0, "name": city_name}
+
+    async def fake_current_batch(locations):
+        batch_calls.append(len(locations))
+        return [{"time": "2025-12-03T00:00", "temperature": 5.0, "humidity": 60.0, "wind_speed": 3.0}] * len(locations)
+
+    async def fake_submit(city, coords):
+        return {"id": "job-1", "city": city, "status": "queued", "error": None}
+
+    async def fake_wait(job_id, timeout):
+        return None
+
+    monkeypatch.setattr(main, "get_coordinates", fake_coords)
+    monkeypatch.setattr(main, "fetch_current_weather_batch", fake_current_batch)
+    monkeypatch.setattr(training_jobs, "submit", fake_submit)
+    monkeypatch.setattr(training_jobs, "wait", fake_wait)
+
+    async def scenario():
+        async with AsyncClient(transport=ASGITransport(app=main.app), base_url="http://test") as ac:
+            cities = ["Riga", "Gdansk", "Krakow", "Atlantis", "Poznan", "Riga"]
+            resp = await ac.post("/analyze/batch", json={"cities": cities})
+            invalid = [
+                await ac.post("/analyze/batch", json=body)
+                for body in ({"cities": []}, ["Riga"], {"cities": ["Riga"], "wait": "abc"})
+            ]
+        return resp, invalid
+
+    resp, invalid = asyncio.run(scenario())
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    by_city = {line["city"]: line for line in lines}
+    assert len(lines) == 5 and lines[0]["city"] == "Riga" and lines[-1]["city"] == "Gdansk"
+    assert by_city["Riga"]["cache"] == "HIT"
+    assert by_city["Krakow"]["status"] == 200 and len(by_city["Krakow"]["result"]["predictions"]) == 24
+    assert by_city["Atlantis"]["status"] == 504
+    assert by_city["Gdansk"]["status"] == 202 and by_city["Gdansk"]["job"]["id"] == "job-1"
+    assert by_city["Poznan"]["status"] == 202
+    assert batch_calls == [2, 1]
+    assert [r.status_code for r in invalid] == [422, 422, 422]
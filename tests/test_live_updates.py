@@ -0,0 +1,51 @@
+import asyncio
+import json
+from app.services import forecast_cache, live_updates
+from app.services.live_updates import Subscriber
+
+def test_live_updates_conflate_and_stream_per_city(monkeypatch):
+    monkeypatch.setattr(forecast_cache, "get_redis", lambda: None)
+    monkeypatch.setattr(live_updates, "get_redis", lambda: None)
+
+    async def scenario():
+        async def snapshot():
+            return ['{"city": "Oslo", "v": 0}']
+
+        async def failing_snapshot():
+            raise ConnectionError("cache down")
+
+        live_updates.sse_stream(["Oslo"], failing_snapshot)
+        assert live_updates.hub.stats()["subscribers"] == 0
+        failing = live_updates.sse_stream(["Oslo"], failing_snapshot)
+        await failing.__anext__()
+        try:
+            await failing.__anext__()
+        except ConnectionError:
+            pass
+        assert live_updates.hub.stats()["subscribers"] == 0
+        stream = live_updates.sse_stream(["Oslo", "Lima"], snapshot, heartbeat=0.05)
+        events = [await stream.__anext__(), await stream.__anext__()]
+        for v in (1, 2):
+            await forecast_cache.store_forecast({"city": "Oslo", "v": v})
+        await forecast_cache.store_forecast({"city": "Quito", "v": 1})
+        await forecast_cache.store_forecast({"city": "Lima", "v": 1})
+        stats = live_updates.hub.stats()
+        events += [await stream.__anext__() for _ in range(3)]
+        await stream.aclose()
+        return events, stats
+
+    events, stats = asyncio.run(scenario())
+    assert events[0].startswith("retry:")
+    assert json.loads(events[1].split("data: ")[1])["v"] == 0
+    received = [json.loads(e.split("data: ")[1]) for e in events[2:4]]
+    assert [(p["city"], p["v"]) for p in received] == [("Oslo", 2), ("Lima", 1)]
+    assert events[4] == ": keepalive\n\n"
+    assert stats["conflated"] == 1 and stats["subscribers"] == 1
+    assert live_updates.hub.stats()["subscribers"] == 0
+
+def test_subscriber_drops_oldest_when_full():
+    sub = Subscriber(max_size=2)
+    for city in ["A", "B", "C"]:
+        sub.offer(city, city)
+    assert sub.dropped == 1
+    assert asyncio.run(sub.get(0.01)) == ("B", "B")
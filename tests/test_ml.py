@@ -1,6 +1,8 @@
 import os
 import pandas as pd
-from app.services.ml_service import train_model_for_city, load_model_for_city, predict_temp
+from app.services import ml_service
+from app.services.ml_service import train_model_for_city, load_model_for_city, predict_temp, predict_horizon
+from app.services.model_registry import ModelRegistry
 
 def test_train_and_predict_city_model(tmp_path, monkeypatch):
     monkeypatch.setenv("MODELS_DIR", str(tmp_path))
@@ -30,3 +32,160 @@ def test_train_and_load_city_model(tmp_path, monkeypatch):
     model, metrics = load_model_for_city("TestCity")
     assert model is not None
     assert metrics is not None
+
+def test_predict_horizon_matches_single_predictions(tmp_path, monkeypatch):
+    monkeypatch.setattr(ml_service, "MODELS_DIR", str(tmp_path))
+    df = pd.DataFrame({
+        "timestamp": [1,2,3,4,5,6,7,8,9,10,11,12],
+        "hour": [0,1,2,3,4,5,6,7,8,9,10,11],
+        "humidity": [50]*12,
+        "wind_speed": [5]*12,
+        "temperature": [10,11,12,13,14,15,16,17,18,19,20,21],
+    })
+    assert train_model_for_city("HorizonCity", df)
+    preds = predict_horizon("HorizonCity", 0, 24, 50, 5)
+    assert len(preds) == 24
+    assert preds[0]["timestamp"] == 3600 and preds[-1]["hour"] == 24
+    for p in preds[:3]:
+        assert abs(p["temperature"] - predict_temp(p["timestamp"], 50, 5, "HorizonCity")) < 1e-9
+
+def test_registry_reuses_model_until_artifact_changes(tmp_path):
+    from sklearn.dummy import DummyRegressor
+    import joblib
+    reg = ModelRegistry(max_size=1)
+    path_a, path_b = str(tmp_path / "a.joblib"), str(tmp_path / "b.joblib")
+    joblib.dump(DummyRegressor().fit([[0]], [1.0]), path_a)
+    joblib.dump(DummyRegressor().fit([[0]], [2.0]), path_b)
+    first, _ = reg.get(path_a, str(tmp_path / "a.metrics.json"))
+    again, _ = reg.get(path_a, str(tmp_path / "a.metrics.json"))
+    assert first is again
+    reg.get(path_b, str(tmp_path / "b.metrics.json"))
+    assert reg.stats()["size"] == 1
+    assert reg.get(path_a, str(tmp_path / "a.metrics.json"))[0] is not first
+    assert reg.get(str(tmp_path / "missing.joblib"), "") == (None, None)
+
+def test_training_chunks_build_float32_features():
+    rows = [(1.7e9, 3.0, None, 2.0, 1, 5.5), (1.7e9 + 3600, 4.0, 50.0, 2.0, -1, 6.0)]
+    X, y = ml_service._arrays_from_chunks([ml_service._chunk_arrays(rows), ml_service._chunk_arrays([rows[0]])])
+    assert X.shape == (3, len(ml_service.GLOBAL_FEATURES)) and X.dtype == "float32"
+    assert y.tolist() == [5.5, 6.0, 5.5]
+    assert pd.isna(X[0, 2])
+    empty_X, empty_y = ml_service._arrays_from_chunks([])
+    assert empty_X.shape == (0, 5) and len(empty_y) == 0
+
+def test_training_query_can_read_rollups():
+    from sqlalchemy.dialects import postgresql
+    sql = str(ml_service._training_query(None, 100, "daily").compile(dialect=postgresql.dialect()))
+    assert "FROM weather_rollup_daily" in sql
+    assert "temperature_avg IS NOT NULL" in sql
+    assert "ORDER BY weather_rollup_daily.bucket DESC" in sql
+
+def test_hist_gradient_boosting_engine_reports_fit_time(tmp_path, monkeypatch):
+    monkeypatch.setattr(ml_service, "MODELS_DIR", str(tmp_path))
+    df = pd.DataFrame({
+        "timestamp": list(range(40)),
+        "hour": [i % 24 for i in range(40)],
+        "humidity": [50]*40,
+        "wind_speed": [5]*40,
+        "temperature": [10 + i % 7 for i in range(40)],
+    })
+    assert train_model_for_city("BoostCity", df, engine="hist_gradient_boosting", params={"max_iter": 20})
+    model, metrics = load_model_for_city("BoostCity")
+    assert metrics["engine"] == "hist_gradient_boosting"
+    assert metrics["params"]["max_iter"] == 20
+    assert metrics["fit_seconds"] >= 0
+    assert not os.path.exists(tmp_path / "boostcity.forest")
+    assert predict_temp(3, 50, 5, "BoostCity") is not None
+
+def test_train_cities_splits_cpu_budget(tmp_path, monkeypatch):
+    from app.services.training_engine import plan_pool
+    monkeypatch.setattr(ml_service, "MODELS_DIR", str(tmp_path))
+    monkeypatch.setenv("MODELS_DIR", str(tmp_path))
+    assert plan_pool(3, 8) == (3, 2)
+    assert plan_pool(10, 4) == (4, 1)
+    df = pd.DataFrame({
+        "timestamp": list(range(12)),
+        "hour": list(range(12)),
+        "humidity": [50]*12,
+        "wind_speed": [5]*12,
+        "temperature": list(range(10, 22)),
+    })
+    params = {"n_estimators": 10}
+    results = ml_service.train_cities({"Pool A": df, "Pool B": df, "Pool C": df.head(3)}, params=params, cpu_budget=2)
+    assert results == {"Pool A": True, "Pool B": True, "Pool C": False}
+    assert load_model_for_city("Pool B")[1]["params"]["n_jobs"] == 1
+
+def test_incremental_retraining_skips_warm_starts_and_refits(tmp_path, monkeypatch):
+    monkeypatch.setattr(ml_service, "MODELS_DIR", str(tmp_path))
+    monkeypatch.setenv("MODELS_DIR", str(tmp_path))
+    monkeypatch.setattr(ml_service, "RETRAIN_WARM_TREES", 5)
+    monkeypatch.setenv("RETRAIN_WARM_TREES", "5")
+
+    def frame(hours):
+        return pd.DataFrame({
+            "timestamp": [i * 3600 for i in range(hours)],
+            "hour": [i % 24 for i in range(hours)],
+            "humidity": [50]*hours,
+            "wind_speed": [5]*hours,
+            "temperature": [10 + i % 7 for i in range(hours)],
+        })
+
+    params = {"n_estimators": 10}
+    assert ml_service.train_cities({"Warm City": frame(48)}, params=params, incremental=True) == {"Warm City": True}
+    metrics = load_model_for_city("Warm City")[1]
+    assert metrics["mode"] == "full" and metrics["trained_until"] == 47 * 3600
+    assert ml_service.plan_retrain("Warm City", frame(48), params=params) == "skip"
+    assert ml_service.plan_retrain("Warm City", frame(50), params=params) == "skip"
+    assert ml_service.plan_retrain("Warm City", frame(60), params={"n_estimators": 20}) == "full"
+    assert ml_service.train_cities({"Warm City": frame(60)}, params=params, incremental=True) == {"Warm City": True}
+    model, metrics = load_model_for_city("Warm City")
+    assert metrics["mode"] == "warm" and metrics["rows"] == 12
+    assert metrics["params"]["n_estimators"] == 15 and metrics["trained_until"] == 59 * 3600
+    assert predict_temp(3600, 50, 5, "Warm City") is not None
+    later = metrics["full_fit_at"] + ml_service.RETRAIN_FULL_EVERY_HOURS * 3600
+    assert ml_service.plan_retrain("Warm City", frame(72), params=params, now=later) == "full"
+    boost = {"max_iter": 20}
+    assert train_model_for_city("Boost City", frame(48), engine="hist_gradient_boosting", params=boost)
+    assert ml_service.plan_retrain("Boost City", frame(50), engine="hist_gradient_boosting", params=boost) == "skip"
+    assert ml_service.plan_retrain("Boost City", frame(60), engine="hist_gradient_boosting", params=boost) == "full"
+    monkeypatch.setattr(ml_service, "RETRAIN_INCREMENTAL", False)
+    assert ml_service.plan_retrain("Warm City", frame(62), params=params) == "skip"
+    assert ml_service.plan_retrain("Warm City", frame(72), params=params) == "full"
+
+def test_inference_executor_coalesces_concurrent_requests(tmp_path, monkeypatch):
+    import asyncio
+    import pytest
+    from app.services.inference import InferenceExecutor
+    monkeypatch.setattr(ml_service, "MODELS_DIR", str(tmp_path))
+    df = pd.DataFrame({
+        "timestamp": list(range(12)),
+        "hour": list(range(12)),
+        "humidity": [50]*12,
+        "wind_speed": [5]*12,
+        "temperature": list(range(10, 22)),
+    })
+    assert train_model_for_city("Batch City", df, params={"n_estimators": 10})
+    executor = InferenceExecutor(window_ms=50, max_rows=10_000, workers=2)
+
+    async def burst():
+        return await asyncio.gather(*(
+            executor.predict_horizon("Batch City", i * 3600, 24, 40 + i, 5) for i in range(10)
+        ))
+
+    results = asyncio.run(burst())
+    stats = executor.stats()
+    assert stats["batches"] == 1 and stats["max_batch"] == 10 and stats["queue_depth"] == 0
+    for i, preds in enumerate(results):
+        assert preds == predict_horizon("Batch City", i * 3600, 24, 40 + i, 5)
+
+    small = InferenceExecutor(window_ms=1000, max_rows=48, workers=1)
+
+    async def flushed_by_size():
+        return await asyncio.gather(*(small.predict_horizon("Batch City", 0, 24, 50, 5) for _ in range(4)))
+
+    assert len(asyncio.run(flushed_by_size())) == 4
+    assert small.stats()["batches"] == 2
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(executor.predict_horizon("Unknown City", 0, 24, 50, 5))
+    executor.close()
+    small.close()
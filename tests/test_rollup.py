@@ -0,0 +1,58 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+from sqlalchemy.dialects import postgresql
+from app.services import rollup_service
+
+class FakeSession:
+    """Plays the raw table as a set of committed ids and records the ids each rollup range scans."""
+
+    def __init__(self, db: dict):
+        self.db = db
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get(self, model, name):
+        return self.db["state"].get(name)
+
+    async def execute(self, stmt, params=None):
+        if params is not None:
+            self.db["scanned"] |= {i for i in self.db["committed"] if params["low"] < i <= params["high"]}
+            self.db["horizons"].append(params["horizon"])
+            return SimpleNamespace(rowcount=1)
+        compiled = stmt.compile(dialect=postgresql.dialect())
+        if "last_id" in compiled.params:
+            self.db["state"][compiled.params["name"]] = SimpleNamespace(last_id=compiled.params["last_id"])
+            return SimpleNamespace(rowcount=1)
+        return SimpleNamespace(scalar=lambda: max(self.db["committed"], default=None))
+
+    async def commit(self):
+        pass
+
+def test_refresh_rescans_ids_committed_out_of_order(monkeypatch):
+    db = {"state": {}, "committed": {1, 2, 3, 4, 5, 6, 8, 9, 10}, "scanned": set(), "horizons": []}
+    monkeypatch.setattr(rollup_service, "AsyncSessionLocal", lambda: FakeSession(db))
+    monkeypatch.setattr(rollup_service, "ROLLUP_LAG_IDS", 5)
+    monkeypatch.setattr(rollup_service, "RAW_RETENTION_DAYS", 0)
+    asyncio.run(rollup_service.refresh_rollup("hourly"))
+    assert 7 not in db["scanned"] and db["state"]["hourly"].last_id == 10
+    db["committed"].add(7)
+    asyncio.run(rollup_service.refresh_rollup("hourly"))
+    assert 7 in db["scanned"]
+    assert db["state"]["hourly"].last_id == 10
+    assert db["horizons"] == [datetime.min, datetime.min]
+
+def test_purge_deletes_only_whole_rolled_up_days():
+    horizon = rollup_service.purge_horizon(30)
+    assert (horizon.hour, horizon.minute, horizon.second, horizon.microsecond) == (0, 0, 0, 0)
+    assert rollup_service.purge_horizon(0) == datetime.min
+    compiled = rollup_service._purge_statement(horizon, 42).compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+    assert "NOT (EXISTS (SELECT" in sql
+    assert "date_trunc(%(date_trunc_1)s, weather_measurements.timestamp)" in sql
+    assert compiled.params["timestamp_1"] == horizon and compiled.params["id_1"] == 42
+    assert "WHERE excluded.bucket >= :horizon" in str(rollup_service._rollup_sql("daily"))
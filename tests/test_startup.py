@@ -0,0 +1,86 @@
+import io
+import os
+import sys
+import json
+import subprocess
+from contextlib import redirect_stdout
+from fastapi.testclient import TestClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_BUDGET = float(os.getenv("IMPORT_BUDGET", "4"))
+HEAVY_MODULES = ("sklearn", "pandas", "joblib", "celery", "app.worker")
+
+def test_api_import_stays_light_and_within_budget():
+    code = (
+        "import sys, time, json; t0 = time.perf_counter(); import app.main; "
+        f"print(json.dumps([time.perf_counter() - t0, [m for m in {HEAVY_MODULES!r} if m in sys.modules]]))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    seconds, loaded = json.loads(out.stdout.strip().splitlines()[-1])
+    assert loaded == []
+    assert seconds < IMPORT_BUDGET
+
+def test_ready_reports_database_and_redis(monkeypatch):
+    from app import main
+
+    async def ok():
+        return None
+
+    async def down():
+        raise ConnectionRefusedError()
+
+    monkeypatch.setattr(main, "get_redis", lambda: None)
+    client = TestClient(main.app)
+    monkeypatch.setattr(main, "ping_db", ok)
+    resp = client.get("/ready")
+    assert resp.status_code == 200
+    assert resp.json()["checks"]["database"] == "ok"
+    monkeypatch.setattr(main, "ping_db", down)
+    resp = client.get("/ready")
+    assert resp.status_code == 503
+    assert resp.json()["status"] == "not ready"
+    assert resp.json()["checks"]["database"] == "error: ConnectionRefusedError"
+    assert client.get("/health").json() == {"status": "ok"}
+
+def test_migrations_create_every_model_table_and_index():
+    from alembic import command
+    from alembic.config import Config
+    from app.models.weather import Base
+
+    buf = io.StringIO()
+    with redirect_stdout(buf):
+        command.upgrade(Config(os.path.join(ROOT, "alembic.ini")), "head", sql=True)
+    sql = buf.getvalue()
+    for table in Base.metadata.tables.values():
+        assert f"CREATE TABLE {table.name} " in sql
+        for index in table.indexes:
+            assert f"CREATE INDEX {index.name} " in sql
+    assert "USING brin (timestamp)" in sql
+    assert "CONSTRAINT uq_weather_measurements_city_timestamp UNIQUE (city, timestamp)" in sql
+
+def test_migrated_schema_matches_the_models():
+    import importlib.util
+    from datetime import datetime
+    import sqlalchemy as sa
+    from alembic.autogenerate import compare_metadata
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+    from app.models.weather import Base
+
+    def load(name):
+        spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, "migrations", "versions", name + ".py"))
+        migration = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(migration)
+        return migration
+
+    row = {"city": "Oslo", "timestamp": datetime(2026, 1, 1), "temperature": 1.0, "humidity": 80.0, "wind_speed": 3.0}
+    with sa.create_engine("sqlite://").begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            load("0001_initial_schema").upgrade()
+            measurements = sa.table("weather_measurements", *(sa.column(c) for c in row))
+            conn.execute(measurements.insert(), [row, {**row, "temperature": 2.0}, {**row, "city": "Lima"}])
+            load("0002_measurement_constraint_and_rollups").upgrade()
+        kept = conn.execute(sa.text("SELECT city, temperature FROM weather_measurements ORDER BY id")).all()
+        diff = compare_metadata(MigrationContext.configure(conn, opts={"compare_type": True}), Base.metadata)
+    assert kept == [("Oslo", 1.0), ("Lima", 1.0)]
+    assert diff == []
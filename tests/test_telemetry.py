@@ -0,0 +1,92 @@
+import asyncio
+import json
+import time
+import httpx
+from app import main
+from app.core import telemetry
+from app.services import weather_service
+from tests.fake_redis import FakeRedis
+
+def test_histogram_renders_cumulative_buckets():
+    reg = telemetry.Registry()
+    hist = reg.histogram("demo_seconds", "Demo.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        hist.observe(value, "x")
+    name, kind, _, samples = hist.collect()
+    assert kind == "histogram"
+    buckets = {s[1]["le"]: s[2] for s in samples if s[0] == "demo_seconds_bucket"}
+    assert buckets == {"0.1": 1, "1.0": 2, "+Inf": 3}
+    assert ("demo_seconds_count", {"stage": "x"}, 3) in samples
+
+def test_ops_metrics_exposes_stages_upstream_and_worker_snapshots(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(telemetry, "get_redis", lambda: fake)
+    monkeypatch.setattr(weather_service, "get_redis", lambda: None)
+    monkeypatch.setattr(weather_service, "_retry_delay", lambda i, r=None: 0)
+    weather_service._geo_cache.clear()
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"results": [{"latitude": 1.0, "longitude": 2.0, "name": "Metricsville"}]})
+
+    worker_families = [("meteomind_celery_task_seconds", "histogram", "Duration of Celery tasks in seconds.",
+                        [("meteomind_celery_task_seconds_count", {"task": "app.worker.global_monitor_task"}, 1)])]
+
+    async def scenario():
+        await weather_service.init_client(transport=httpx.MockTransport(handler))
+        assert await weather_service.get_coordinates("Metricsville")
+        await weather_service.close_client()
+        fake.data["telemetry:worker-1"] = json.dumps(worker_families).encode()
+        fake.zsets[telemetry.SNAPSHOT_INDEX] = {b"worker-1": time.time()}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as ac:
+            return await ac.get("/ops/metrics")
+
+    resp = asyncio.run(scenario())
+    assert resp.status_code == 200 and resp.headers["content-type"].startswith("text/plain")
+    body = resp.text
+    assert 'meteomind_stage_seconds_count{stage="geocode",process="' in body
+    assert 'meteomind_upstream_requests_total{host="geocoding-api.open-meteo.com",status="503"' in body
+    assert 'meteomind_upstream_retries_total{host="geocoding-api.open-meteo.com"' in body
+    assert 'meteomind_cache_hit_ratio{cache="model_registry"' in body
+    assert 'meteomind_celery_task_seconds_count{task="app.worker.global_monitor_task",process="worker-1"} 1' in body
+    assert body.count("# TYPE meteomind_celery_task_seconds histogram") == 1
+
+def test_pool_training_job_records_train_stage_in_the_api_process(tmp_path, monkeypatch):
+    import pandas as pd
+    from app.services import ml_service, training_jobs
+
+    def train_count():
+        samples = telemetry.STAGE_SECONDS.collect()[3]
+        return next((v for n, labels, v in samples
+                     if n == "meteomind_stage_seconds_count" and labels == {"stage": "train"}), 0)
+
+    monkeypatch.setattr(ml_service, "MODELS_DIR", str(tmp_path))
+    monkeypatch.setenv("MODELS_DIR", str(tmp_path))
+    monkeypatch.setattr(training_jobs, "_pool", None)
+    monkeypatch.setattr(training_jobs, "get_redis", lambda: None)
+    df = pd.DataFrame({
+        "timestamp": list(range(12)),
+        "hour": list(range(12)),
+        "humidity": [50.0] * 12,
+        "wind_speed": [5.0] * 12,
+        "temperature": [10.0 + i for i in range(12)],
+    })
+
+    async def fake_history(city, lat, lon):
+        return df
+
+    monkeypatch.setattr(training_jobs.history_store, "load_history", fake_history)
+    before = train_count()
+    job = {"id": "job-t", "city": "Metric City", "status": "queued", "error": None}
+
+    async def scenario():
+        try:
+            return await training_jobs.run_job(job, 1.0, 2.0, training_jobs._fit_in_pool)
+        finally:
+            await training_jobs.close_jobs()
+
+    assert asyncio.run(scenario())["status"] == "succeeded"
+    assert train_count() == before + 1
@@ -0,0 +1,151 @@
+import asyncio
+import httpx
+from app.services import weather_service
+from tests.fake_open_meteo import create_app
+from tests.fake_redis import FakeRedis
+
+def _run_with_transport(handler, coro_fn):
+    async def main():
+        await weather_service.init_client(transport=httpx.MockTransport(handler))
+        try:
+            return await coro_fn()
+        finally:
+            await weather_service.close_client()
+    return asyncio.run(main())
+
+def test_get_json_retries_on_5xx_and_reuses_client(monkeypatch):
+    monkeypatch.setattr(weather_service, "HTTP_BACKOFF", 0.001)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"ok": True})
+
+    async def fetch():
+        client = await weather_service.get_client()
+        js = await weather_service._get_json("http://upstream/x", {})
+        assert await weather_service.get_client() is client
+        return js
+
+    assert _run_with_transport(handler, fetch) == {"ok": True}
+    assert len(calls) == 2
+
+def test_client_of_another_running_loop_is_closed_when_replaced():
+    import threading
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        old = asyncio.run_coroutine_threadsafe(weather_service.init_client(), loop).result()
+
+        async def replace():
+            client = await weather_service.get_client()
+            await weather_service.close_client()
+            return client
+
+        new = asyncio.run(replace())
+        assert new is not old and old.is_closed and new.is_closed
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+def test_get_json_gives_up_after_retries(monkeypatch):
+    monkeypatch.setattr(weather_service, "HTTP_BACKOFF", 0.001)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(429, headers={"Retry-After": "0"})
+
+    js = _run_with_transport(handler, lambda: weather_service._get_json("http://upstream/x", {}, retries=3))
+    assert js is None
+    assert len(calls) == 3
+
+def test_get_coordinates_caches_hits_and_misses(monkeypatch):
+    monkeypatch.setattr(weather_service, "get_redis", lambda: None)
+    weather_service._geo_cache.clear()
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.params["name"])
+        if request.url.params["name"] == "Atlantis":
+            return httpx.Response(200, json={})
+        return httpx.Response(200, json={"results": [{"latitude": 51.5, "longitude": -0.1, "name": "London"}]})
+
+    async def lookups():
+        first = await weather_service.get_coordinates("London")
+        second = await weather_service.get_coordinates("  london ")
+        missing = [await weather_service.get_coordinates("Atlantis") for _ in range(2)]
+        return first, second, missing
+
+    before = weather_service.geocode_cache_stats()
+    first, second, missing = _run_with_transport(handler, lookups)
+    after = weather_service.geocode_cache_stats()
+    assert first == second == {"lat": 51.5, "lon": -0.1, "name": "London"}
+    assert missing == [None, None]
+    assert calls == ["London", "Atlantis"]
+    assert after["memory_hits"] - before["memory_hits"] == 2
+    assert after["negative_hits"] - before["negative_hits"] == 1
+
+def test_history_is_cached_for_the_current_hour(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(weather_service, "get_redis", lambda: fake)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"hourly": {
+            "time": ["2025-12-03T00:00", "2025-12-03T01:00"],
+            "temperature_2m": [1.0, 2.0],
+            "relative_humidity_2m": [80, 81],
+            "wind_speed_10m": [3.0, 4.0],
+        }})
+
+    async def fetch_twice():
+        a = await weather_service.fetch_historical_training_data(52.2297, 21.0122)
+        b = await weather_service.fetch_historical_training_data(52.2301, 21.0119)
+        return a, b
+
+    a, b = _run_with_transport(handler, fetch_twice)
+    assert len(calls) == 1
+    assert len(a) == len(b) == 2
+    assert list(fake.data)[0].startswith("hist:52.23:21.01:")
+
+def test_parse_hourly_uses_utc_epochs_and_compact_dtypes():
+    df = weather_service.parse_hourly({
+        "time": ["1970-01-01T00:00", "2025-12-03T15:00", "2025-12-03T16:00"],
+        "temperature_2m": [1.5, None, 2.5],
+        "relative_humidity_2m": [80, 81, 82],
+        "wind_speed_10m": [3.0, 4.0, 5.0],
+    })
+    assert df["timestamp"].tolist() == [0, 1764774000, 1764777600]
+    assert df["hour"].tolist() == [0, 15, 16]
+    assert str(df["hour"].dtype) == "int32"
+    assert str(df["temperature"].dtype) == "float32"
+    assert df["temperature"].isna().tolist() == [False, True, False]
+
+def test_batch_fetches_split_per_location(monkeypatch):
+    monkeypatch.setattr(weather_service, "get_redis", lambda: None)
+    monkeypatch.setattr(weather_service, "OPEN_METEO_BATCH_SIZE", 50)
+    fake = create_app()
+    locations = [(40 + i / 10, i / 10) for i in range(120)]
+
+    async def fetch():
+        await weather_service.init_client(transport=httpx.ASGITransport(app=fake))
+        try:
+            current = await weather_service.fetch_current_weather_batch(locations)
+            history = await weather_service.fetch_historical_training_data_batch(locations, past_days=2)
+            single = await weather_service.fetch_current_weather(*locations[7])
+        finally:
+            await weather_service.close_client()
+        return current, history, single
+
+    current, history, single = asyncio.run(fetch())
+    assert fake.state.requests["/v1/forecast"] == 3 + 3 + 1
+    assert len(current) == len(history) == 120
+    assert current[7] == single
+    assert all(len(df) == (2 + 7) * 24 for df in history)
+    assert history[0]["temperature"].tolist() != history[119]["temperature"].tolist()
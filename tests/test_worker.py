@@ -0,0 +1,65 @@
+import asyncio
+import time
+from app import worker
+
+def test_load_cities_from_env_and_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("GLOBAL_MONITOR_CITIES", " Paris, Rome,,Paris ")
+    assert worker._load_cities("GLOBAL_MONITOR_CITIES", ["London"]) == ["Paris", "Rome"]
+    path = tmp_path / "cities.txt"
+    path.write_text("# capitals\nOslo\nLima\n")
+    monkeypatch.setenv("GLOBAL_MONITOR_CITIES_FILE", str(path))
+    assert worker._load_cities("GLOBAL_MONITOR_CITIES", ["London"]) == ["Oslo", "Lima"]
+    monkeypatch.delenv("GLOBAL_MONITOR_CITIES")
+    monkeypatch.delenv("GLOBAL_MONITOR_CITIES_FILE")
+    assert worker._load_cities("GLOBAL_MONITOR_CITIES", ["London"]) == ["London"]
+
+def test_fan_out_overlaps_cities_and_isolates_failures(monkeypatch):
+    monkeypatch.setattr(worker, "MONITOR_CONCURRENCY", 10)
+    done = []
+
+    async def slow_city(city):
+        await asyncio.sleep(0.1)
+        if city == "bad":
+            raise RuntimeError("boom")
+        done.append(city)
+
+    cities = [f"c{i}" for i in range(10)] + ["bad"]
+    t0 = time.perf_counter()
+    worker._run(worker._fan_out(cities, slow_city))
+    assert time.perf_counter() - t0 < 0.5
+    assert sorted(done) == sorted(cities[:-1])
+
+def test_monitor_cities_batches_upstream_calls(tmp_path, monkeypatch):
+    import httpx
+    from app.services import forecast_cache, history_store, ml_service, weather_service
+    from tests.fake_open_meteo import create_app
+
+    from tests.fake_redis import FakeRedis
+
+    cache = FakeRedis()
+    fake = create_app()
+    ingested = []
+
+    async def fake_insert(rows):
+        ingested.extend(rows)
+        return len(rows)
+
+    monkeypatch.setattr(worker, "insert_measurements", fake_insert)
+    monkeypatch.setattr(forecast_cache, "get_redis", lambda: cache)
+    monkeypatch.setattr(ml_service, "MODELS_DIR", str(tmp_path))
+    monkeypatch.setenv("MODELS_DIR", str(tmp_path))
+    monkeypatch.setattr(history_store, "HISTORY_DIR", str(tmp_path / "history"))
+    monkeypatch.setattr(weather_service, "get_redis", lambda: None)
+    weather_service._geo_cache.clear()
+    cities = ["Oslo", "Lima", "Quito", "Atlantis", "Perth"]
+
+    async def main():
+        await weather_service.init_client(transport=httpx.ASGITransport(app=fake))
+        await worker._monitor_cities(cities)
+
+    worker._run(main())
+    assert fake.state.requests["/v1/forecast"] == 2
+    assert sorted(cache.data) == sorted(forecast_cache.forecast_key(c) for c in cities if c != "Atlantis")
+    assert sorted(cache.zsets["monitor:cities"]) == sorted(c.lower().encode() for c in cities if c != "Atlantis")
+    assert {r["city"] for r in ingested} == set(cities) - {"Atlantis"}
+    assert max(r["timestamp"] for r in ingested).timestamp() <= time.time() + 3600